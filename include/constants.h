@@ -11,6 +11,12 @@
 #define TILE_WIDTH 8
 #define TILE_SIZE 32
 
+// Sprite spans
+#define SPRITE_EMPTY 0x01
+#define SPRITE_OPAQUE 0x02
+#define SPAN_START(span) ((span) >> 4)
+#define SPAN_LENGTH(span) ((span) & 0x0f)
+
 // Palette
 #define PAL_LENGTH 8
 
@@ -10,10 +10,27 @@
 #include "entity.h"
 
 
+typedef struct {
+    uint8_t *flags;
+    uint16_t (*rows)[TILE_WIDTH + 1];
+    uint8_t *spans;
+} SpriteSpans_t;
+
+typedef struct {
+    uint16_t *cells;
+    int num_cells;
+    uint16_t (*fills)[4];
+    int num_fills;
+    int w;
+} MapCells_t;
+
+
 void DRAW_fill_screen(uint32_t);
 void DRAW_entity(EntityGeneric_t*, bool);
 void DRAW_tile(uint8_t[], uint32_t, uint32_t, uint32_t[]);
-void DRAW_map(uint8_t[2][SCREEN_TILES], uint8_t[][TILE_SIZE], uint32_t[][PAL_LENGTH]);
+void DRAW_tile_spans(uint8_t[], SpriteSpans_t*, int, uint32_t, uint32_t, uint32_t[]);
+void DRAW_map(uint8_t[2][SCREEN_TILES], uint8_t[][TILE_SIZE], SpriteSpans_t*, uint32_t[][PAL_LENGTH]);
+void DRAW_map_cells(uint8_t[2][SCREEN_TILES], MapCells_t*, uint8_t[][TILE_SIZE], SpriteSpans_t*, uint32_t[][PAL_LENGTH]);
 void DRAW_line(int, int, int, int);
 void DRAW_apply_blur();
 void DRAW_desaturate(float);
@@ -6,6 +6,7 @@
 
 // Local
 #include "constants.h"
+#include "draw.h"
 #include "vector.h"
 
 typedef struct {
@@ -17,6 +18,7 @@ typedef struct {
 
 extern const LevelData_t m_Levels[];
 extern uint8_t (*LevelMaps[])[2][1000];
+extern MapCells_t LevelCells[];
 
 void LoadLevelEntities(int level);
 
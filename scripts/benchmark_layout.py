@@ -0,0 +1,284 @@
+# Standard library imports
+import argparse
+import os
+import random
+import shlex
+import statistics
+import struct
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Local imports
+from csprite.display import DisplayTable
+from csprite.layout import layout_tiles, tile_usage
+from csprite.map import H_TILES, HEADER_FORMAT, VERSION, W_TILES, Map, MapGenerator
+from csprite.sprite import SPRITE_PIXELS, Spritesheet
+
+
+# Constants
+CC = os.environ.get("CC", "gcc")
+SPRITESHEET = "assets/backgrounds/background.4bpp"
+MAP_DIR = "assets/maps"
+ENGINE_SOURCES = ["src/draw.c", "src/colour.c", "src/utils.c"]
+N_PALETTES = 256
+HOT_TILES = 16
+HOT_USAGE = 0.9
+PERCENTILES = [50, 90, 99]
+
+DRIVER_HEADER = """
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+
+#include "draw.h"
+
+
+"""
+
+DRIVER = """
+// Defined by window.c, which is left out to run without a window
+const int RENDER_WIDTH = TILES_X * TILE_WIDTH;
+const int RENDER_HEIGHT = TILES_Y * TILE_WIDTH;
+
+uint32_t BENCH_PAL[{n_palettes}][PAL_LENGTH];
+
+
+static long long now_ns()
+{{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000000000LL + ts.tv_nsec;
+}}
+
+
+int main(int argc, char **argv)
+{{
+    int iterations = atoi(argv[1]);
+    int i, j;
+    SpriteSpans_t spans = {{
+        {name}_FLAGS,
+        {name}_SPAN_ROWS,
+        {name}_SPANS
+    }};
+
+    for (i = 0; i < {n_palettes} * PAL_LENGTH; i++)
+    {{
+        BENCH_PAL[i / PAL_LENGTH][i % PAL_LENGTH] = 0xFF000000 | (i * 2654435761u);
+    }}
+
+{maps}
+    return 0;
+}}
+"""
+
+DRIVER_MAP = """
+    for (j = 0; j < iterations / 10 + 1; j++)
+    {{
+        DRAW_map({map}[0], {name}, &spans, BENCH_PAL);
+    }}
+    for (j = 0; j < iterations; j++)
+    {{
+        long long start = now_ns();
+        DRAW_map({map}[0], {name}, &spans, BENCH_PAL);
+        printf("{map} %lld\\n", now_ns() - start);
+    }}
+"""
+
+
+def synthetic_assets(
+    n_tiles: int,
+    n_maps: int,
+    seed: int
+) -> tuple[Spritesheet, MapGenerator]:
+    """
+    Random spritesheet and maps whose cells mostly use a few tiles that are
+    scattered through the sheet
+    """
+    rng = random.Random(seed)
+    data = bytearray([0, 0, 1])
+    for idx in range(n_tiles):
+        label = f"TILE_{idx}".encode()
+        data += bytes([len(label)]) + label
+        data += bytes([rng.randrange(256) for _ in range(SPRITE_PIXELS // 2)])
+
+    maps = MapGenerator()
+    for idx in range(n_maps):
+        hot = rng.sample(range(n_tiles), min(HOT_TILES, n_tiles))
+        cells = [
+            rng.choice(hot) if rng.random() < HOT_USAGE else rng.randrange(n_tiles)
+            for _ in range(W_TILES * H_TILES)
+        ]
+        header = bytes(VERSION) + struct.pack(HEADER_FORMAT, W_TILES, H_TILES, 1)
+        maps.maps.append(
+            Map(f"level_{idx + 1}", header + bytes(cells) + bytes(len(cells)))
+        )
+
+    return Spritesheet("background", bytes(data)), maps
+
+
+def repo_assets() -> tuple[Spritesheet, MapGenerator]:
+    """
+    Background spritesheet and maps of the game
+    """
+    maps = MapGenerator()
+    for file in sorted(os.listdir(MAP_DIR)):
+        if file.endswith(".map"):
+            maps.parse_map(f"{MAP_DIR}/{file}")
+
+    return Spritesheet("background", Path(SPRITESHEET).read_bytes()), maps
+
+
+def generate_driver(spritesheet: Spritesheet, maps: MapGenerator) -> str:
+    """
+    Generate c source drawing every map with DRAW_map and printing times
+    """
+    for map in maps.maps:
+        if map.ctype != "uint8_t":
+            raise ValueError(f"{map.name} indexes do not fit DRAW_map")
+
+    arrays = [spritesheet, *spritesheet.spans.tables, *maps.maps]
+    output = DRIVER_HEADER
+    output += "".join([symbol.generate_array() + "\n" for symbol in arrays])
+    output += DRIVER.format(
+        n_palettes=N_PALETTES,
+        name=spritesheet.name,
+        maps="".join([
+            DRIVER_MAP.format(map=map.name, name=spritesheet.name)
+            for map in maps.maps
+        ])
+    )
+
+    return output
+
+
+def run_driver(
+    source: str,
+    directory: Path,
+    variant: str,
+    iterations: int
+) -> dict[str, list[int]]:
+    """
+    Compile and run driver, returning frame times in nanoseconds per map
+    """
+    cflags = subprocess.run(
+        ["pkg-config", "--cflags", "sdl2"],
+        capture_output=True,
+        text=True
+    ).stdout
+    (directory / f"{variant}.c").write_text(source)
+    binary = directory / variant
+    subprocess.run(
+        [
+            CC, "-O2", "-Iinclude", *shlex.split(cflags),
+            "-o", str(binary), str(directory / f"{variant}.c"),
+            *ENGINE_SOURCES, "-lm"
+        ],
+        check=True
+    )
+    output = subprocess.run(
+        [str(binary), str(iterations)],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+
+    timings = {}
+    for line in output.splitlines():
+        name, ns = line.split()
+        timings.setdefault(name, []).append(int(ns))
+
+    return timings
+
+
+def percentiles(timings: list[int]) -> list[float]:
+    """
+    PERCENTILES of `timings` in microseconds
+    """
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return [cuts[p - 1] / 1000 for p in PERCENTILES]
+
+
+def benchmark(
+    spritesheet: Spritesheet,
+    maps: MapGenerator,
+    iterations: int,
+    weights: dict[str, float] | None = None
+) -> None:
+    """
+    Time DRAW_map with the file order and the usage order of tiles
+    """
+    usage = tile_usage(maps.maps, len(spritesheet.sprites), weights)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        original = run_driver(
+            generate_driver(spritesheet, maps), directory, "original", iterations
+        )
+        before, after = layout_tiles(maps, spritesheet, weights)
+        reordered = run_driver(
+            generate_driver(spritesheet, maps), directory, "layout", iterations
+        )
+
+    table = DisplayTable("Tile layout")
+    table.w = 56
+    table.add_row("Tiles", len(usage))
+    table.add_row("Hot span", f"{before} -> {after} B")
+    table.draw()
+
+    print(f"DRAW_map percentiles {' / '.join([f'p{p}' for p in PERCENTILES])} (us)")
+    for name in original:
+        table = DisplayTable(name)
+        table.w = 56
+        for variant, timings in [("Original", original), ("Layout", reordered)]:
+            table.add_row(
+                variant,
+                " / ".join([f"{value:.1f}" for value in percentiles(timings[name])])
+            )
+        table.draw()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark DRAW_map with file ordered and usage ordered tiles"
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=None,
+        metavar="TILES",
+        help="use a random sheet of TILES tiles (at most 256) instead of assets/"
+    )
+    parser.add_argument(
+        "--maps",
+        type=int,
+        default=4,
+        help="number of synthetic maps (default 4)"
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=1000,
+        help="timed frames per map and layout (default 1000)"
+    )
+    parser.add_argument(
+        "--layout-weight",
+        action="append",
+        default=[],
+        metavar="MAP=WEIGHT",
+        help="weight tile usage of a map, e.g. LEVEL_1_MAP=4 (repeatable)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    weights = {}
+    for weight in args.layout_weight:
+        name, _, value = weight.partition("=")
+        weights[name.upper()] = float(value)
+
+    if args.synthetic is not None:
+        spritesheet, maps = synthetic_assets(args.synthetic, args.maps, args.seed)
+    else:
+        spritesheet, maps = repo_assets()
+
+    benchmark(spritesheet, maps, args.iterations, weights)
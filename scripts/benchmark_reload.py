@@ -0,0 +1,257 @@
+# Standard library imports
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Local imports
+from csprite.display import DisplayTable
+from csprite.graphics import GraphicsGenerator
+from csprite.map import MapGenerator
+from csprite.pack import PackGenerator
+from csprite.palette import PaletteGenerator
+from csprite.sprite import SPRITE_PIXELS, SpriteGenerator
+
+
+# Constants
+CC = os.environ.get("CC", "gcc")
+VERSION = [0, 0, 1]
+LIBRARY = "libgraphics.so"
+LOADERS = {"dlopen": "libloader.so", "gpak": "libgpak.so"}
+PACK_NAME = "graphics.gpak"
+PERCENTILES = [50, 90, 99]
+
+
+def synthetic_spritesheet(filename: str, n: int, rng: random.Random) -> None:
+    """
+    Write `.4bpp` spritesheet of `n` random sprites with transparent gaps
+    """
+    data = bytearray(VERSION)
+    for idx in range(n):
+        label = f"SPRITE_{idx}".encode()
+        data += bytes([len(label)]) + label
+        data += bytes([
+            rng.choice([0x00, 0x0F, 0xF0, rng.randrange(256)])
+            for _ in range(SPRITE_PIXELS // 2)
+        ])
+
+    Path(filename).write_bytes(data)
+
+
+def build(directory: Path, sheets: int, sprites: int, seed: int) -> int:
+    """
+    Generate and compile library and loaders for a synthetic asset set.
+    Returns the number of symbols.
+    """
+    rng = random.Random(seed)
+    sprite = SpriteGenerator(spans=True)
+    for idx in range(sheets):
+        filename = str(directory / f"sheet{idx}.4bpp")
+        synthetic_spritesheet(filename, sprites, rng)
+        sprite.parse_spritesheet(filename)
+
+    graphics = GraphicsGenerator(
+        sprite,
+        SpriteGenerator(),
+        SpriteGenerator(),
+        PaletteGenerator(),
+        MapGenerator()
+    )
+    (directory / "include/assets").mkdir(parents=True)
+    (directory / "lib").mkdir()
+    graphics.generate_header(str(directory / "include/assets/graphics.h"))
+    graphics.generate_src(str(directory / "loader.c"))
+    graphics.generate_lib_header(str(directory / "lib/graphics.h"))
+    graphics.generate_lib_src(str(directory / "lib/graphics.c"))
+
+    pack = PackGenerator(graphics)
+    pack.generate_pack(str(directory / PACK_NAME))
+    pack.generate_src(str(directory / "gpak.c"), PACK_NAME)
+
+    flags = ["-O2", "-shared", "-fPIC"]
+    subprocess.run(
+        [CC, *flags, "-o", LIBRARY, "lib/graphics.c", "-Ilib"],
+        cwd=directory,
+        check=True
+    )
+    sources = {"dlopen": "loader.c", "gpak": "gpak.c"}
+    for name, output in LOADERS.items():
+        subprocess.run(
+            [
+                CC, *flags, "-o", output, sources[name], "-Iinclude", "-ldl",
+                f"-Wl,-rpath,{directory}"
+            ],
+            cwd=directory,
+            check=True
+        )
+
+    return sum([len(symbols) for _, symbols in graphics.sections])
+
+
+def measure(directory: Path, iterations: int) -> dict[str, list[int]]:
+    """
+    Time dlopen, symbol resolution, init and reload in nanoseconds.
+
+    Runs in its own process, since `dlopen` reuses an already loaded
+    library of the same name. dlopen and dlsym are called through ctypes,
+    so their timings include roughly a microsecond of call overhead each.
+    """
+    os.chdir(directory)
+    libdl = ctypes.CDLL(ctypes.util.find_library("dl"))
+    libdl.dlopen.restype = ctypes.c_void_p
+    libdl.dlopen.argtypes = [ctypes.c_char_p, ctypes.c_int]
+    libdl.dlsym.restype = ctypes.c_void_p
+    libdl.dlsym.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+    libdl.dlclose.argtypes = [ctypes.c_void_p]
+
+    path = str(directory / LIBRARY).encode()
+    symbols = [
+        line.split()[-1].split("[")[0].encode()
+        for line in (directory / "lib/graphics.h").read_text().splitlines()
+        if line.startswith("extern ")
+    ]
+
+    timings = {"dlopen": [], "dlsym": []}
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        handle = libdl.dlopen(path, os.RTLD_NOW)
+        timings["dlopen"].append(time.perf_counter_ns() - start)
+        if handle is None:
+            raise FileNotFoundError(LIBRARY)
+
+        start = time.perf_counter_ns()
+        for symbol in symbols:
+            libdl.dlsym(handle, symbol)
+        timings["dlsym"].append(time.perf_counter_ns() - start)
+        libdl.dlclose(handle)
+
+    for name, loader in LOADERS.items():
+        lib = ctypes.CDLL(str(directory / loader))
+        start = time.perf_counter_ns()
+        if lib.GRAPHICS_init() != 0:
+            raise RuntimeError(f"GRAPHICS_init failed in {loader}")
+        timings[f"{name} init"] = [time.perf_counter_ns() - start]
+
+        timings[f"{name} reload"] = []
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            if lib.GRAPHICS_reload() != 0:
+                raise RuntimeError(f"GRAPHICS_reload failed in {loader}")
+            timings[f"{name} reload"].append(time.perf_counter_ns() - start)
+
+    return timings
+
+
+def percentiles(timings: list[int]) -> list[float]:
+    """
+    PERCENTILES of `timings` in microseconds
+    """
+    if len(timings) == 1:
+        return [timings[0] / 1000] * len(PERCENTILES)
+
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return [cuts[p - 1] / 1000 for p in PERCENTILES]
+
+
+def benchmark(
+    sheets: list[int],
+    sprites: int,
+    iterations: int,
+    seed: int
+) -> list[dict]:
+    """
+    Benchmark graphics loading for synthetic asset sets of increasing size
+    """
+    results = []
+    for n in sheets:
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            n_symbols = build(directory, n, sprites, seed)
+            output = subprocess.run(
+                [
+                    sys.executable, __file__,
+                    "--measure", str(directory),
+                    "--iterations", str(iterations)
+                ],
+                check=True,
+                capture_output=True,
+                text=True
+            )
+            results.append({
+                "sheets": n,
+                "sprites": n * sprites,
+                "symbols": n_symbols,
+                "library_bytes": (directory / LIBRARY).stat().st_size,
+                "pack_bytes": (directory / PACK_NAME).stat().st_size,
+                "percentiles": {
+                    phase: percentiles(timings)
+                    for phase, timings in json.loads(output.stdout).items()
+                }
+            })
+
+    return results
+
+
+def report(results: list[dict]) -> None:
+    """
+    Draw a table of percentiles for every asset set
+    """
+    for result in results:
+        table = DisplayTable(f"{result['sheets']} sheets, {result['sprites']} sprites")
+        table.w = 56
+        table.add_row("Symbols", result["symbols"])
+        table.add_row(LIBRARY, f"{result['library_bytes']} B")
+        table.add_row(PACK_NAME, f"{result['pack_bytes']} B")
+        for phase, values in result["percentiles"].items():
+            table.add_row(
+                f"{phase} (us)",
+                " / ".join([f"{value:.1f}" for value in values])
+            )
+        table.draw()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark GRAPHICS_init/GRAPHICS_reload of generated loaders"
+    )
+    parser.add_argument(
+        "--sheets",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16, 64],
+        help="spritesheets in each synthetic asset set (default 1 4 16 64)"
+    )
+    parser.add_argument(
+        "--sprites",
+        type=int,
+        default=64,
+        help="sprites per spritesheet (default 64)"
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=200,
+        help="timed iterations of each phase (default 200)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", default=None, help="also write results to file")
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        print(json.dumps(measure(Path(args.measure), args.iterations)))
+        sys.exit()
+
+    results = benchmark(args.sheets, args.sprites, args.iterations, args.seed)
+    print(f"Percentiles {' / '.join([f'p{p}' for p in PERCENTILES])}")
+    report(results)
+    if args.json is not None:
+        Path(args.json).write_text(json.dumps(results, indent=4))
@@ -1,13 +1,46 @@
 # Standard library imports
+import argparse
+import glob
 import os
+import tempfile
 from pathlib import Path
 
 # Local imports
+from csprite.cache import AssetCache, hash_files
 from csprite.display import DisplayTable
 from csprite.sprite import SpriteGenerator
-from csprite.palette import PaletteGenerator
+from csprite.palette import DesaturateVariant, FadeVariant, PaletteGenerator
 from csprite.map import MapGenerator
+from csprite.metasprite import MetaspriteGenerator
 from csprite.graphics import GraphicsGenerator
+from csprite.layout import layout_tiles
+from csprite.pack import PackGenerator
+from csprite.references import ReferenceGraph
+
+
+# Constants
+PACK_NAME = "graphics.gpak"
+ASSET_DIRS = [
+    "assets/sprites",
+    "assets/backgrounds",
+    "assets/fonts",
+    "assets/palettes",
+    "assets/maps",
+    "assets/metasprites"
+]
+OUTPUT_FILES = [
+    "include/assets/sprite.h",
+    "include/assets/background.h",
+    "include/assets/font.h",
+    "include/assets/palette.h",
+    "include/assets/map.h",
+    "include/assets/metasprite.h",
+    "include/assets/graphics.h",
+    "src/assets/graphics.c",
+    "src/lib/graphics.h",
+    "src/lib/graphics.c"
+]
+PACK_FILES = [f"build/{PACK_NAME}", "src/assets/gpak.c"]
 
 
 def generate_sprites() -> SpriteGenerator:
@@ -36,9 +69,9 @@ def generate_sprites() -> SpriteGenerator:
 
 def generate_backgrounds() -> SpriteGenerator:
     """
-    Generate background headers
+    Generate background headers, with the opaque span tables `DRAW_map` uses
     """
-    sprite_generator = SpriteGenerator()
+    sprite_generator = SpriteGenerator(spans=True)
     for file in os.listdir("assets/backgrounds"):
         if not file.endswith(".4bpp"):
             continue
@@ -50,6 +83,9 @@ def generate_backgrounds() -> SpriteGenerator:
 
         sprites = sprite_generator.spritesheets[-1].sprites
         table.add_row("Tiles", len(sprites))
+
+        before, after = sprite_generator.spritesheets[-1].spans.pixel_tests
+        table.add_row("Pixel tests", f"{before} -> {after}")
         table.draw()
 
     Path("include/assets").mkdir(parents=True, exist_ok=True)
@@ -86,7 +122,10 @@ def generate_palettes() -> PaletteGenerator:
     """
     Generate palette headers
     """
-    palette_generator = PaletteGenerator()
+    palette_generator = PaletteGenerator([
+        DesaturateVariant(steps=4, amount=0.8),
+        FadeVariant(steps=4)
+    ])
     for file in os.listdir("assets/palettes"):
         if not file.endswith(".pal"):
             continue
@@ -99,6 +138,8 @@ def generate_palettes() -> PaletteGenerator:
         palettes = palette_generator.palettes[-1]
         for label, colours in zip(palettes.labels, palettes.colours):
             table.add_palette(label, colours)
+        for variant in palettes.variants:
+            table.add_row(variant.variant.name.capitalize(), variant.variant.steps)
         table.draw()
 
     Path("include/assets").mkdir(parents=True, exist_ok=True)
@@ -129,17 +170,282 @@ def generate_maps() -> MapGenerator:
     return map_generator
 
 
-def generate_assets() -> None:
+def generate_metasprites(
+    sprite: SpriteGenerator,
+    palette: PaletteGenerator
+) -> MetaspriteGenerator:
     """
-    Generate c header files from binary assets
+    Generate metasprite headers
+    """
+    metasprite_generator = MetaspriteGenerator()
+    for file in os.listdir("assets/metasprites"):
+        if not file.endswith(".meta"):
+            continue
+        table = DisplayTable(file)
+        metasprite_generator.parse_metasprite(
+            f"assets/metasprites/{file}",
+            sprite.spritesheets,
+            palette.palettes
+        )
+
+        metasprite = metasprite_generator.metasprites[-1]
+        table.add_row("Version", '.'.join([f"{i}" for i in metasprite.version]))
+        table.add_row("Size", f"{metasprite.w}x{metasprite.h}")
+        table.add_row("Parts", len(metasprite.parts))
+        table.draw()
+
+    Path("include/assets").mkdir(parents=True, exist_ok=True)
+    metasprite_generator.generate_header("include/assets/metasprite.h")
+
+    return metasprite_generator
+
+
+def strip_assets(
+    sprite: SpriteGenerator,
+    background: SpriteGenerator,
+    font: SpriteGenerator,
+    palette: PaletteGenerator,
+    map: MapGenerator,
+    metasprite: MetaspriteGenerator
+) -> None:
+    """
+    Strip sprites and palettes not referenced by maps, metasprites or c
+    sources
+    """
+    spritesheet = next(
+        i for i in background.spritesheets if i.name == "BACKGROUND_SPRITE"
+    )
+    palette_group = next(
+        i for i in palette.palettes if i.name == "BACKGROUND_PAL"
+    )
+
+    graph = ReferenceGraph()
+    graph.add_maps(map, spritesheet, palette_group)
+    graph.add_metasprites(metasprite)
+    graph.add_sources(
+        sorted(glob.glob("src/*.c")),
+        [
+            *sprite.spritesheets,
+            *background.spritesheets,
+            *font.spritesheets,
+            *palette.palettes
+        ]
+    )
+    report = graph.strip(
+        [sprite, background, font],
+        palette,
+        map,
+        spritesheet,
+        palette_group
+    )
+
+    table = DisplayTable("Stripped assets")
+    table.w = 44
+    for name, before, after in report:
+        table.add_row(name, f"{before} -> {after} B")
+    table.add_row("Removed", f"{sum([b - a for _, b, a in report])} B")
+    table.draw()
+
+    sprite.generate_header("include/assets/sprite.h")
+    background.generate_header("include/assets/background.h")
+    font.generate_header("include/assets/font.h")
+    palette.generate_header("include/assets/palette.h")
+    map.generate_header("include/assets/map.h")
+
+
+def layout_assets(
+    sprite: SpriteGenerator,
+    background: SpriteGenerator,
+    font: SpriteGenerator,
+    palette: PaletteGenerator,
+    map: MapGenerator,
+    weights: dict[str, float] | None = None
+) -> None:
+    """
+    Reorder background tiles by map usage so the most used sit together
+    """
+    spritesheet = next(
+        i for i in background.spritesheets if i.name == "BACKGROUND_SPRITE"
+    )
+
+    graph = ReferenceGraph()
+    graph.add_sources(
+        sorted(glob.glob("src/*.c")),
+        [
+            *sprite.spritesheets,
+            *background.spritesheets,
+            *font.spritesheets,
+            *palette.palettes
+        ]
+    )
+    pinned = graph.pinned(spritesheet.name)
+    before, after = layout_tiles(map, spritesheet, weights, pinned)
+
+    table = DisplayTable("Tile layout")
+    table.add_row("Pinned tiles", len(pinned))
+    table.add_row("Hot span", f"{before} -> {after} B")
+    table.draw()
+
+    background.generate_header("include/assets/background.h")
+    map.generate_header("include/assets/map.h")
+
+
+def classify_maps(background: SpriteGenerator, map: MapGenerator) -> None:
+    """
+    List map cells that need drawing and merge solid cells into fills
+    """
+    spritesheet = next(
+        i for i in background.spritesheets if i.name == "BACKGROUND_SPRITE"
+    )
+    map.classify(spritesheet)
+
+    for map_cells in map.cells:
+        table = DisplayTable(map_cells.map.name)
+        n_cells = map_cells.map.w * map_cells.map.h
+        table.add_row("Cells drawn", f"{n_cells} -> {len(map_cells.cells)}")
+        table.add_row("Empty cells", map_cells.n_empty)
+        table.add_row("Fill runs", len(map_cells.fills))
+        table.draw()
+
+    map.generate_header("include/assets/map.h")
+
+
+def pack_assets(graphics: GraphicsGenerator) -> None:
+    """
+    Write assets into a memory-mapped pack and generate its loader
     """
-    sprite = generate_sprites()
-    background = generate_backgrounds()
-    font = generate_fonts()
-    palette = generate_palettes()
-    map = generate_maps()
+    pack = PackGenerator(graphics)
 
-    graphics = GraphicsGenerator(sprite, background, font, palette, map)
+    Path("build").mkdir(parents=True, exist_ok=True)
+    entries = pack.generate_pack(f"build/{PACK_NAME}")
+    pack.generate_src("src/assets/gpak.c", PACK_NAME)
+
+    table = DisplayTable(PACK_NAME)
+    table.w = 44
+    table.add_row("Entries", len(entries))
+    table.add_row("Size", f"{Path('build', PACK_NAME).stat().st_size} B")
+    table.draw()
+
+
+def input_files(sources: bool) -> list[str]:
+    """
+    Files the generated output depends on
+    """
+    files = [
+        os.path.join(directory, file)
+        for directory in ASSET_DIRS
+        for file in os.listdir(directory)
+    ]
+    if sources:
+        files.extend(glob.glob("src/*.c"))
+
+    return files
+
+
+def write_headers(
+    sprite: SpriteGenerator,
+    background: SpriteGenerator,
+    font: SpriteGenerator,
+    palette: PaletteGenerator,
+    map: MapGenerator,
+    metasprite: MetaspriteGenerator
+) -> None:
+    """
+    Generate headers of generators restored from the cache
+    """
+    Path("include/assets").mkdir(parents=True, exist_ok=True)
+    sprite.generate_header("include/assets/sprite.h")
+    background.generate_header("include/assets/background.h")
+    font.generate_header("include/assets/font.h")
+    palette.generate_header("include/assets/palette.h")
+    map.generate_header("include/assets/map.h")
+    metasprite.generate_header("include/assets/metasprite.h")
+
+
+def restore_outputs(files: dict[str, bytes]) -> None:
+    """
+    Write generated files restored from the cache. Each is written next to
+    its target and moved into place, so a running game keeps its mapping of
+    the previous pack
+    """
+    for filename, data in files.items():
+        path = Path(filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def report_cache(cache: AssetCache) -> None:
+    """
+    Print and record cache hits and misses of this build
+    """
+    table = DisplayTable("Asset cache")
+    table.add_row("Hits", cache.hits)
+    table.add_row("Misses", cache.misses)
+    table.draw()
+
+    cache.save_stats()
+
+
+def generate_assets(
+    strip: bool = False,
+    pack: bool = False,
+    layout: bool = False,
+    weights: dict[str, float] | None = None,
+    cache: AssetCache | None = None
+) -> None:
+    """
+    Generate c header files from binary assets
+    """
+    generators = None
+    if cache is not None:
+        # Generator options like palette variants and span tables are set in
+        # this script, so it is part of the key like the csprite sources
+        key = cache.key(
+            hash_files(input_files(strip or layout)),
+            Path(__file__).read_bytes(),
+            strip,
+            layout,
+            sorted((weights or {}).items())
+        )
+        outputs_key = cache.key(key, pack)
+        files = cache.get_object(outputs_key)
+        if files is not None:
+            restore_outputs(files)
+            report_cache(cache)
+            return
+        generators = cache.get_object(key)
+
+    if generators is not None:
+        sprite, background, font, palette, map, metasprite = generators
+        write_headers(sprite, background, font, palette, map, metasprite)
+    else:
+        sprite = generate_sprites()
+        background = generate_backgrounds()
+        font = generate_fonts()
+        palette = generate_palettes()
+        map = generate_maps()
+        metasprite = generate_metasprites(sprite, palette)
+
+        if strip:
+            strip_assets(sprite, background, font, palette, map, metasprite)
+        if layout:
+            layout_assets(sprite, background, font, palette, map, weights)
+        classify_maps(background, map)
+
+        if cache is not None:
+            cache.put_object(
+                key, (sprite, background, font, palette, map, metasprite)
+            )
+
+    graphics = GraphicsGenerator(sprite, background, font, palette, map, metasprite)
 
     Path("include/assets").mkdir(parents=True, exist_ok=True)
     graphics.generate_header("include/assets/graphics.h")
@@ -151,6 +457,64 @@ def generate_assets() -> None:
     graphics.generate_lib_header("src/lib/graphics.h")
     graphics.generate_lib_src("src/lib/graphics.c")
 
+    if pack:
+        pack_assets(graphics)
+
+    if cache is not None:
+        outputs = OUTPUT_FILES + (PACK_FILES if pack else [])
+        cache.put_object(
+            outputs_key,
+            {filename: Path(filename).read_bytes() for filename in outputs}
+        )
+        report_cache(cache)
+
 
 if __name__ == "__main__":
-    generate_assets()
+    parser = argparse.ArgumentParser(description=generate_assets.__doc__)
+    parser.add_argument(
+        "--strip",
+        action="store_true",
+        help="drop sprites and palettes not referenced by maps or c sources"
+    )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help=f"also write build/{PACK_NAME} and a loader that maps it"
+    )
+    parser.add_argument(
+        "--layout",
+        action="store_true",
+        help="order background tiles by how often maps use them"
+    )
+    parser.add_argument(
+        "--layout-weight",
+        action="append",
+        default=[],
+        metavar="MAP=WEIGHT",
+        help="weight tile usage of a map, e.g. LEVEL_1_MAP=4 (repeatable)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always regenerate, without the shared build cache"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="shared build cache directory, defaults to $CSPRITE_CACHE. Entries "
+        "are unpickled, so only trusted builds may write to it"
+    )
+    args = parser.parse_args()
+
+    weights = {}
+    for weight in args.layout_weight:
+        name, _, value = weight.partition("=")
+        weights[name.upper()] = float(value)
+
+    generate_assets(
+        strip=args.strip,
+        pack=args.pack,
+        layout=args.layout,
+        weights=weights,
+        cache=None if args.no_cache else AssetCache(args.cache_dir)
+    )
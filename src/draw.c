@@ -111,16 +111,71 @@ void DRAW_tile(
 }
 
 
+/**
+ * Draw 8x8 tile using its precomputed opaque spans, copying each run of
+ * opaque pixels without testing every pixel for transparency
+ *
+ * @param tile      tile to be rendered
+ * @param spans     opaque span tables of the tile's spritesheet
+ * @param idx       index of tile in spritesheet
+ * @param x         x coordinate to render tile
+ * @param y         y coordinate to render tile
+ * @param palette   palette to colour tile with
+**/
+void DRAW_tile_spans(
+    uint8_t tile[],
+    SpriteSpans_t *spans,
+    int idx,
+    uint32_t x,
+    uint32_t y,
+    uint32_t palette[]
+)
+{
+    int i, j, s = 0;
+    uint8_t flags = spans->flags[idx];
+    if (flags & SPRITE_EMPTY)
+    {
+        return;
+    }
+
+    for (j = 0; j < TILE_WIDTH; j++)
+    {
+        uint32_t *row = &m_Pixels[x + RENDER_WIDTH * (y + j)];
+        uint8_t *pixels = &tile[(TILE_WIDTH * j) / 2];
+        if (flags & SPRITE_OPAQUE)
+        {
+            for (i = 0; i < TILE_WIDTH / 2; i++)
+            {
+                row[2 * i] = palette[(pixels[i] & 0b01110000) >> 4];
+                row[2 * i + 1] = palette[pixels[i] & 0b00000111];
+            }
+            continue;
+        }
+
+        for (s = spans->rows[idx][j]; s < spans->rows[idx][j + 1]; s++)
+        {
+            int end = SPAN_START(spans->spans[s]) + SPAN_LENGTH(spans->spans[s]);
+            for (i = SPAN_START(spans->spans[s]); i < end; i++)
+            {
+                row[i] = palette[(pixels[i / 2] >> (4 * (1 - i % 2))) & 0b00000111];
+            }
+        }
+    }
+}
+
+
 /**
  * Draw map of tiles
  *
  * @param map           map to draw
  * @param spritesheet   spritesheet to use for map
+ * @param spans         opaque span tables of spritesheet
  * @param palette       palettes to use for map
 **/
 void DRAW_map(
     uint8_t map[2][SCREEN_TILES],
     uint8_t spritesheet[][TILE_SIZE],
+    SpriteSpans_t *spans,
     uint32_t palette[][PAL_LENGTH]
 )
 {
@@ -130,8 +185,10 @@ void DRAW_map(
     {
         for (i = 0; i < TILES_X; i++)
         {
-            DRAW_tile(
+            DRAW_tile_spans(
                 spritesheet[map[0][i + j * TILES_X]],
+                spans,
+                map[0][i + j * TILES_X],
                 TILE_WIDTH * i,
                 TILE_WIDTH * j,
                 palette[map[1][i + j * TILES_X]]
@@ -141,6 +198,69 @@ void DRAW_map(
 }
 
 
+/**
+ * Draw map by filling runs of solid colour cells and then drawing only
+ * the cells with detail, skipping empty cells. The map holds SCREEN_TILES
+ * cells of any width, cell indexes are decoded with that width and cells
+ * off screen are skipped.
+ *
+ * @param map           map to draw
+ * @param cells         detailed cells, solid fills and width of map
+ * @param spritesheet   spritesheet to use for map
+ * @param spans         opaque span tables of spritesheet
+ * @param palette       palettes to use for map
+**/
+void DRAW_map_cells(
+    uint8_t map[2][SCREEN_TILES],
+    MapCells_t *cells,
+    uint8_t spritesheet[][TILE_SIZE],
+    SpriteSpans_t *spans,
+    uint32_t palette[][PAL_LENGTH]
+)
+{
+    int i, j, k;
+    for (k = 0; k < cells->num_fills; k++)
+    {
+        uint16_t *fill = cells->fills[k];
+        uint32_t colour = palette[fill[2]][fill[3]];
+        int x = fill[0] % cells->w;
+        int y = fill[0] / cells->w;
+        if (x >= TILES_X || y >= TILES_Y)
+        {
+            continue;
+        }
+        int length = fill[1] < TILES_X - x ? fill[1] : TILES_X - x;
+        for (j = 0; j < TILE_WIDTH; j++)
+        {
+            uint32_t *row = &m_Pixels[TILE_WIDTH * x + RENDER_WIDTH * (TILE_WIDTH * y + j)];
+            for (i = 0; i < TILE_WIDTH * length; i++)
+            {
+                row[i] = colour;
+            }
+        }
+    }
+
+    for (k = 0; k < cells->num_cells; k++)
+    {
+        uint16_t idx = cells->cells[k];
+        int x = idx % cells->w;
+        int y = idx / cells->w;
+        if (x >= TILES_X || y >= TILES_Y)
+        {
+            continue;
+        }
+        DRAW_tile_spans(
+            spritesheet[map[0][idx]],
+            spans,
+            map[0][idx],
+            TILE_WIDTH * x,
+            TILE_WIDTH * y,
+            palette[map[1][idx]]
+        );
+    }
+}
+
+
 /**
  * Draw line between (xs, ys) and (xe, ye) on pixel grid
  *
@@ -2,6 +2,7 @@
 #include <stdint.h>
 
 // Local
+#include "assets/map.h"
 #include "flag.h"
 #include "graphics.h"
 #include "levels.h"
@@ -16,6 +17,38 @@ uint8_t (*LevelMaps[])[2][1000] = {
 };
 
 
+MapCells_t LevelCells[] = {
+    {
+        LEVEL_1_MAP_CELLS,
+        LEVEL_1_MAP_N_CELLS,
+        LEVEL_1_MAP_FILLS,
+        LEVEL_1_MAP_N_FILLS,
+        LEVEL_1_MAP_W
+    },
+    {
+        LEVEL_2_MAP_CELLS,
+        LEVEL_2_MAP_N_CELLS,
+        LEVEL_2_MAP_FILLS,
+        LEVEL_2_MAP_N_FILLS,
+        LEVEL_2_MAP_W
+    },
+    {
+        LEVEL_3_MAP_CELLS,
+        LEVEL_3_MAP_N_CELLS,
+        LEVEL_3_MAP_FILLS,
+        LEVEL_3_MAP_N_FILLS,
+        LEVEL_3_MAP_W
+    },
+    {
+        LEVEL_4_MAP_CELLS,
+        LEVEL_4_MAP_N_CELLS,
+        LEVEL_4_MAP_FILLS,
+        LEVEL_4_MAP_N_FILLS,
+        LEVEL_4_MAP_W
+    },
+};
+
+
 const LevelData_t m_Levels[] = {
     {
         .level = 1,
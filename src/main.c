@@ -51,6 +51,12 @@ int main(int argc, char* args[])
     SpriteAnimation_t flag_animation;
     ANIMATION_start(&flag_animation, 0.1, 2);
 
+    SpriteSpans_t background_spans = {
+        .flags = BACKGROUND_SPRITE_FLAGS,
+        .rows = BACKGROUND_SPRITE_SPAN_ROWS,
+        .spans = BACKGROUND_SPRITE_SPANS
+    };
+
     bool win;
     int i, j;
     char msg[64] = {};
@@ -80,7 +86,13 @@ int main(int argc, char* args[])
         }
 
         DRAW_fill_screen(ARGB(0xff, 0x00, 0x00, 0x00));
-        DRAW_map(*LevelMaps[level], BACKGROUND_SPRITE, BACKGROUND_PAL);
+        DRAW_map_cells(
+            *LevelMaps[level],
+            &LevelCells[level],
+            BACKGROUND_SPRITE,
+            &background_spans,
+            BACKGROUND_PAL
+        );
 
         if (!win)
         {
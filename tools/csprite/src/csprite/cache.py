@@ -0,0 +1,271 @@
+# Standard library imports
+import argparse
+import functools
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import typing as t
+from pathlib import Path
+
+# Local imports
+from csprite.display import DisplayTable
+
+
+# Constants
+CACHE_ENV = "CSPRITE_CACHE"
+DEFAULT_DIRECTORY = Path.home() / ".cache" / "csprite"
+DEFAULT_MAX_BYTES = 256 * 2**20
+OBJECTS_DIR = "objects"
+STATS_FILE = "stats.json"
+DIRECTORY_MODE = 0o700
+PACKAGE_DIR = Path(__file__).parent
+
+
+@functools.cache
+def generator_version() -> str:
+    """
+    Hash of the csprite sources, so any change to the generator misses
+    """
+    digest = hashlib.sha256()
+    for path in sorted(PACKAGE_DIR.rglob("*")):
+        if path.suffix not in (".py", ".txt"):
+            continue
+        digest.update(str(path.relative_to(PACKAGE_DIR)).encode())
+        digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def hash_files(filenames: list[str]) -> str:
+    """
+    Hash names and contents of `filenames`
+    """
+    digest = hashlib.sha256()
+    for filename in sorted(filenames):
+        digest.update(Path(filename).as_posix().encode() + b"\0")
+        digest.update(Path(filename).read_bytes())
+
+    return digest.hexdigest()
+
+
+# Content-addressed store shared by every checkout on the machine. Entries are
+# keyed by a hash of their inputs, the generator version and options, written
+# through a temporary file and a rename, and evicted least recently used first.
+# Entries are unpickled, so the directory must only be writable by trusted
+# builds. It is created readable by its owner alone.
+class AssetCache():
+    def __init__(
+        self,
+        directory: str | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        self._directory = Path(
+            directory or os.environ.get(CACHE_ENV) or DEFAULT_DIRECTORY
+        )
+        self._max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @property
+    def objects(self) -> Path:
+        return self._directory / OBJECTS_DIR
+
+    def _mkdir(self, directory: Path) -> None:
+        """
+        Create `directory` inside the cache, creating the cache owner-only
+        """
+        if not self._directory.is_dir():
+            self._directory.parent.mkdir(parents=True, exist_ok=True)
+            self._directory.mkdir(mode=DIRECTORY_MODE, exist_ok=True)
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, *parts: t.Any) -> str:
+        """
+        Key for a result derived from `parts` by this generator version
+        """
+        digest = hashlib.sha256(generator_version().encode())
+        for part in parts:
+            part = part if isinstance(part, bytes) else repr(part).encode()
+            digest.update(len(part).to_bytes(8, "little") + part)
+
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.objects / key[:2] / key
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Stored bytes for `key`, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store `data` under `key`, evicting old entries if over size
+        """
+        path = self._path(key)
+        self._mkdir(path.parent)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        self.evict()
+
+    def get_object(self, key: str) -> t.Any | None:
+        """
+        Stored object for `key`, or None on a miss
+        """
+        data = self.get(key)
+        if data is None:
+            return None
+
+        try:
+            return pickle.loads(data)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Written by a different interpreter, treat as a miss
+            self.hits -= 1
+            self.misses += 1
+            return None
+
+    def put_object(self, key: str, obj: t.Any) -> None:
+        """
+        Store `obj` under `key`
+        """
+        self.put(key, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def entries(self) -> list[tuple[Path, int, float]]:
+        """
+        Path, size and last use of every entry, least recently used first
+        """
+        entries = []
+        for path in self.objects.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self, max_bytes: int | None = None) -> int:
+        """
+        Remove least recently used entries until the store fits in
+        `max_bytes`. Returns the number of bytes removed.
+        """
+        max_bytes = self._max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum([size for _, size, _ in entries])
+
+        removed = 0
+        for path, size, _ in entries:
+            if total - removed <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            removed += size
+
+        return removed
+
+    def clean(self) -> int:
+        """
+        Remove every entry and the statistics. Returns bytes removed.
+        """
+        removed = self.evict(0)
+        (self._directory / STATS_FILE).unlink(missing_ok=True)
+
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        """
+        Hits and misses recorded by every build
+        """
+        try:
+            return json.loads((self._directory / STATS_FILE).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"hits": 0, "misses": 0}
+
+    def save_stats(self) -> None:
+        """
+        Add hits and misses of this build to the recorded statistics
+        """
+        stats = self.stats()
+        stats["hits"] += self.hits
+        stats["misses"] += self.misses
+
+        self._mkdir(self._directory)
+        fd, tmp = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp, self._directory / STATS_FILE)
+
+        self.hits = 0
+        self.misses = 0
+
+
+def run() -> None:
+    """
+    Show statistics of the shared csprite build cache or clean it up
+    """
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument(
+        "command",
+        choices=["stats", "clean", "prune"],
+        help="show statistics, remove every entry or evict down to --max-size"
+    )
+    parser.add_argument(
+        "--directory",
+        default=None,
+        help=f"cache directory, defaults to ${CACHE_ENV} or {DEFAULT_DIRECTORY}"
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // 2**20,
+        help=f"size limit in MiB (default {DEFAULT_MAX_BYTES // 2**20})"
+    )
+    args = parser.parse_args()
+
+    cache = AssetCache(args.directory, args.max_size * 2**20)
+    table = DisplayTable("Asset cache")
+    table.w = 44
+    if args.command == "clean":
+        table.add_row("Removed", f"{cache.clean()} B")
+    elif args.command == "prune":
+        table.add_row("Removed", f"{cache.evict()} B")
+
+    entries = cache.entries()
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    table.add_row("Directory", str(cache.directory)[-(table.w // 2 - 2):])
+    table.add_row("Entries", len(entries))
+    table.add_row("Size", f"{sum([size for _, size, _ in entries])} B")
+    table.add_row("Hits", stats["hits"])
+    table.add_row("Misses", stats["misses"])
+    if lookups:
+        table.add_row("Hit rate", f"{100 * stats['hits'] / lookups:.1f}%")
+    table.draw()
+
+
+if __name__ == "__main__":
+    run()
@@ -1,9 +1,11 @@
 # Standard library
 from importlib import resources
 from string import Template
+import typing as t
 
 # Local imports
 from csprite.map import MapGenerator
+from csprite.metasprite import MetaspriteGenerator
 from csprite.palette import PaletteGenerator
 from csprite.sprite import SpriteGenerator
 from csprite.shared import generate_comment, write_comment
@@ -11,6 +13,7 @@ from csprite import templates
 
 
 TEMPLATE_FILE = resources.files(templates) / "graphics.txt"
+SYMBOL_TABLE = "GRAPHICS_SYMBOLS"
 
 
 class GraphicsGenerator():
@@ -20,13 +23,39 @@ class GraphicsGenerator():
         background: SpriteGenerator,
         font: SpriteGenerator,
         palette: PaletteGenerator,
-        map: MapGenerator
+        map: MapGenerator,
+        metasprite: MetaspriteGenerator | None = None
     ) -> None:
         self._sprite = sprite
         self._background = background
         self._font = font
         self._palette = palette
         self._map = map
+        self._metasprite = metasprite
+
+    @property
+    def sections(self) -> list[tuple[str, list[t.Any]]]:
+        """Generated symbols grouped by section, in output order"""
+        sections = [
+            ("Sprites", self._sprite.spritesheets),
+            ("Backgrounds", self._background.spritesheets),
+            ("Fonts", self._font.spritesheets),
+            (
+                "Sprite spans",
+                self._sprite.span_tables
+                + self._background.span_tables
+                + self._font.span_tables
+            ),
+            ("Palettes", self._palette.palettes),
+            ("Palette variants", self._palette.variants),
+            ("Maps", self._map.maps),
+            ("Map chunks", self._map.chunk_tables),
+            ("Map cells", self._map.cell_tables)
+        ]
+        if self._metasprite is not None:
+            sections.append(("Metasprites", self._metasprite.metasprites))
+
+        return sections
 
     def generate_header(self, filename: str) -> None:
         """
@@ -49,35 +78,44 @@ class GraphicsGenerator():
                 "\n\n"
             ])
 
-            write_comment(f, "Sprites")
-            for spritesheet in self._sprite.spritesheets:
-                f.write(f"extern {spritesheet.pointer};\n")
-            f.write("\n\n")
-
-            write_comment(f, "Backgrounds")
-            for spritesheet in self._background.spritesheets:
-                f.write(f"extern {spritesheet.pointer};\n")
-            f.write("\n\n")
-
-            write_comment(f, "Fonts")
-            for spritesheet in self._font.spritesheets:
-                f.write(f"extern {spritesheet.pointer};\n")
-            f.write("\n\n")
-
-            write_comment(f, "Palettes")
-            for palette in self._palette.palettes:
-                f.write(f"extern {palette.pointer};\n")
-            f.write("\n\n")
-
-            write_comment(f, "Maps")
-            for map in self._map.maps:
-                f.write(f"extern {map.pointer};\n")
+            f.write("\n\n".join([
+                generate_comment(section)
+                + "".join([f"extern {symbol.pointer};\n" for symbol in symbols])
+                for section, symbols in self.sections
+            ]))
 
             f.writelines([
                 "\n\n",
                 f"#endif // {header_def}"
             ])
 
+    def generate_definitions(self) -> tuple[str, list[list[str]]]:
+        """
+        Generate NULL pointer definitions and (symbol, cast) pairs to load
+        """
+        definitions = []
+        symbol_list = []
+        for section, symbols in self.sections:
+            definition = generate_comment(section)
+            for symbol in symbols:
+                definition += f"{symbol.pointer} = NULL;\n"
+                symbol_list.append([symbol.name, symbol.cast])
+            definitions.append(definition)
+
+        return "\n\n".join(definitions), symbol_list
+
+    def generate_symbol_table(self) -> str:
+        """
+        Generate string of every definition, so a built library describes
+        its own arrays
+        """
+        output = f"const char {SYMBOL_TABLE}[] =\n"
+        for _, symbols in self.sections:
+            output += "".join([f'    "{i.definition};\\n"\n' for i in symbols])
+        output += '    "";\n'
+
+        return output
+
     def generate_src(self, filename: str) -> None:
         """
         Generate source file from binary data
@@ -85,37 +123,7 @@ class GraphicsGenerator():
         with TEMPLATE_FILE.open("r") as f:
             template = Template(f.read())
 
-        definitions = ""
-        symbol_list = []
-
-        definitions += generate_comment("Sprites")
-        for spritesheet in self._sprite.spritesheets:
-            definitions += f"{spritesheet.pointer} = NULL;\n"
-            symbol_list.append([spritesheet.name, spritesheet.cast])
-        definitions += "\n\n"
-
-        definitions += generate_comment("Backgrounds")
-        for spritesheet in self._background.spritesheets:
-            definitions += f"{spritesheet.pointer} = NULL;\n"
-            symbol_list.append([spritesheet.name, spritesheet.cast])
-        definitions += "\n\n"
-
-        definitions += generate_comment("Fonts")
-        for spritesheet in self._font.spritesheets:
-            definitions += f"{spritesheet.pointer} = NULL;\n"
-            symbol_list.append([spritesheet.name, spritesheet.cast])
-        definitions += "\n\n"
-
-        definitions += generate_comment("Palettes")
-        for palette in self._palette.palettes:
-            definitions += f"{palette.pointer} = NULL;\n"
-            symbol_list.append([palette.name, palette.cast])
-        definitions += "\n\n"
-
-        definitions += generate_comment("Maps")
-        for map in self._map.maps:
-            definitions += f"{map.pointer} = NULL;\n"
-            symbol_list.append([map.name, map.cast])
+        definitions, symbol_list = self.generate_definitions()
 
         symbols = '\n'.join([
             (
@@ -144,11 +152,9 @@ class GraphicsGenerator():
             f.write("\n")
             f.write("#include <stdint.h>\n")
             f.write("\n\n")
-            f.write("\n".join([f"extern {i.definition};\n" for i in self._sprite.spritesheets]))
-            f.write("\n".join([f"extern {i.definition};\n" for i in self._background.spritesheets]))
-            f.write("\n".join([f"extern {i.definition};\n" for i in self._font.spritesheets]))
-            f.write("\n".join([f"extern {i.definition};\n" for i in self._palette.palettes]))
-            f.write("\n".join([f"extern {i.definition};\n" for i in self._map.maps]))
+            f.write(f"extern const char {SYMBOL_TABLE}[];\n\n")
+            for _, symbols in self.sections:
+                f.write("\n".join([f"extern {i.definition};\n" for i in symbols]))
 
     def generate_lib_src(self, filename: str) -> None:
         """
@@ -160,8 +166,7 @@ class GraphicsGenerator():
             f.write('#include "graphics.h"\n')
             f.write("#include <stdint.h>\n")
             f.write("\n\n")
-            f.write("\n".join([i.generate_arrays() for i in self._sprite.spritesheets]))
-            f.write("\n".join([i.generate_arrays() for i in self._background.spritesheets]))
-            f.write("\n".join([i.generate_arrays() for i in self._font.spritesheets]))
-            f.write("\n".join([i.generate_array() for i in self._palette.palettes]))
-            f.write("\n".join([i.generate_array() for i in self._map.maps]))
+            f.write(self.generate_symbol_table())
+            f.write("\n")
+            for _, symbols in self.sections:
+                f.write("\n".join([i.generate_array() for i in symbols]))
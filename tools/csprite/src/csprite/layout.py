@@ -0,0 +1,84 @@
+# Local imports
+from csprite.map import Map, MapGenerator
+from csprite.sprite import SPRITE_PIXELS, Spritesheet
+
+
+# Constants
+HOT_FRACTION = 0.9
+
+
+def tile_usage(
+    maps: list[Map],
+    n_tiles: int,
+    weights: dict[str, float] | None = None
+) -> list[float]:
+    """
+    Number of cells using each tile across `maps`, weighted by map name
+    """
+    weights = weights or {}
+    usage = [0.0] * n_tiles
+    for map in maps:
+        weight = weights.get(map.name, 1.0)
+        for idx in map.data:
+            if idx < n_tiles:
+                usage[idx] += weight
+
+    return usage
+
+
+def usage_order(usage: list[float], pinned: set[int] | None = None) -> list[int]:
+    """
+    Old index of every new index, most used tiles first.
+
+    Ties keep file order and `pinned` tiles keep their index, since c code
+    refers to them by literal index.
+    """
+    pinned = pinned or set()
+    free = iter(sorted(
+        [i for i in range(len(usage)) if i not in pinned],
+        key=lambda i: -usage[i]
+    ))
+
+    return [i if i in pinned else next(free) for i in range(len(usage))]
+
+
+def hot_span(usage: list[float], order: list[int] | None = None) -> int:
+    """
+    Bytes of spritesheet spanned by the most used tiles that together make
+    up HOT_FRACTION of all usage, when laid out in `order`
+    """
+    order = order or list(range(len(usage)))
+    total = sum(usage)
+    if total == 0:
+        return 0
+
+    position = {old: new for new, old in enumerate(order)}
+    covered = 0.0
+    hot = []
+    for idx in sorted(range(len(usage)), key=lambda i: -usage[i]):
+        hot.append(position[idx])
+        covered += usage[idx]
+        if covered >= HOT_FRACTION * total:
+            break
+
+    return (max(hot) - min(hot) + 1) * SPRITE_PIXELS // 2
+
+
+def layout_tiles(
+    maps: MapGenerator,
+    spritesheet: Spritesheet,
+    weights: dict[str, float] | None = None,
+    pinned: set[int] | None = None
+) -> tuple[int, int]:
+    """
+    Reorder `spritesheet` so the most used tiles sit together and rewrite
+    map indexes to match. Returns hot span in bytes before and after.
+    """
+    usage = tile_usage(maps.maps, len(spritesheet.sprites), weights)
+    order = usage_order(usage, pinned)
+    before, after = hot_span(usage), hot_span(usage, order)
+
+    spritesheet.select(order)
+    maps.remap(tiles={old: new for new, old in enumerate(order)})
+
+    return before, after
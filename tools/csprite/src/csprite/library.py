@@ -0,0 +1,115 @@
+# Standard library imports
+import ctypes
+import math
+import re
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from csprite.graphics import SYMBOL_TABLE, GraphicsGenerator
+
+
+# Constants
+DEFINITION = re.compile(r"(\w+) (\w+)((?:\[\d+\])+)")
+DIMENSION = re.compile(r"\[(\d+)\]")
+CTYPES = {
+    "uint8_t": ctypes.c_uint8,
+    "uint16_t": ctypes.c_uint16,
+    "uint32_t": ctypes.c_uint32
+}
+SUFFIXES = {"sprites": "_SPRITE", "palettes": "_PAL", "maps": "_MAP"}
+
+
+def parse_definitions(table: str) -> dict[str, tuple[str, tuple[int, ...]]]:
+    """
+    Parse (ctype, shape) of every definition in a symbol table
+    """
+    definitions = {}
+    for ctype, name, dimensions in DEFINITION.findall(table):
+        if ctype not in CTYPES:
+            raise ValueError(f"Symbol {name} has unsupported type {ctype}")
+        shape = tuple([int(i) for i in DIMENSION.findall(dimensions)])
+        definitions[name] = (ctype, shape)
+
+    return definitions
+
+
+class GraphicsLibrary():
+    def __init__(self, filename: str) -> None:
+        path = Path(filename)
+        if not path.is_file():
+            raise FileNotFoundError(filename)
+
+        # ctypes never unloads a library, so views stay valid for the process
+        self._lib = ctypes.CDLL(str(path.resolve()))
+        try:
+            table = ctypes.c_char.in_dll(self._lib, SYMBOL_TABLE)
+        except ValueError:
+            raise AttributeError(
+                f"{filename} has no {SYMBOL_TABLE}, regenerate it with csprite"
+            ) from None
+        self._definitions = parse_definitions(
+            ctypes.string_at(ctypes.addressof(table)).decode()
+        )
+        self._arrays = {}
+
+    @property
+    def definitions(self) -> dict[str, tuple[str, tuple[int, ...]]]:
+        return self._definitions
+
+    @property
+    def sprites(self) -> dict[str, np.ndarray]:
+        return self._select(SUFFIXES["sprites"])
+
+    @property
+    def palettes(self) -> dict[str, np.ndarray]:
+        return self._select(SUFFIXES["palettes"])
+
+    @property
+    def maps(self) -> dict[str, np.ndarray]:
+        return self._select(SUFFIXES["maps"])
+
+    def _select(self, suffix: str) -> dict[str, np.ndarray]:
+        return {
+            name: self.array(name)
+            for name in self._definitions
+            if name.endswith(suffix)
+        }
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Read-only view of array `name` in the library's memory
+        """
+        if name not in self._definitions:
+            raise AttributeError(f"Library has no symbol {name}")
+
+        if name not in self._arrays:
+            ctype, shape = self._definitions[name]
+            data = (CTYPES[ctype] * math.prod(shape)).in_dll(self._lib, name)
+            array = np.ctypeslib.as_array(data).reshape(shape)
+            array.flags.writeable = False
+            self._arrays[name] = array
+
+        return self._arrays[name]
+
+    def compare(self, graphics: GraphicsGenerator) -> list[str]:
+        """
+        Names of symbols that differ between the library and `graphics`,
+        including symbols missing from either
+        """
+        expected = {
+            symbol.name: symbol
+            for _, symbols in graphics.sections
+            for symbol in symbols
+        }
+
+        different = sorted(set(expected) ^ set(self._definitions))
+        for name, symbol in expected.items():
+            if name not in self._definitions:
+                continue
+            if self.array(name).tobytes() != symbol.as_bytes():
+                different.append(name)
+
+        return different
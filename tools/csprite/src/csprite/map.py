@@ -1,14 +1,45 @@
 # Standard library imports
+import array
 import os
+import struct
+import sys
+import typing as t
 from pathlib import Path
 
 # Local
-from csprite.shared import chunks
+from csprite.shared import chunks, pack_values
+from csprite.sprite import Spritesheet, solid_colour
 
 
 # Constants
 W_TILES = 40
 H_TILES = 25
+SCREEN_TILES = W_TILES * H_TILES
+VERSION_NIBBLE = [0, 0, 1]
+VERSION = [0, 0, 2]
+VERSION_CHUNKED = [0, 0, 3]
+HEADER_FORMAT = "<HHB"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+CHUNK_HEADER_FORMAT = "<HHBB"
+CHUNK_HEADER_SIZE = struct.calcsize(CHUNK_HEADER_FORMAT)
+INDEX_TYPECODES = {1: "B", 2: "H"}
+HEX_BYTE = [f"0x{i:02X}" for i in range(2**8)]
+
+
+def format_indexes(indexes: t.Sequence[int], ctype: str, indent: int = 12) -> str:
+    """
+    Format indexes as rows of c hex literals
+    """
+    output = ""
+    if ctype == "uint8_t":
+        for row in chunks(indexes, 8):
+            output += indent * ' ' + ", ".join(map(HEX_BYTE.__getitem__, row)) + ",\n"
+    else:
+        digits = 4 if ctype == "uint16_t" else 8
+        for row in chunks(indexes, 8):
+            output += indent * ' ' + ", ".join([f"0x{i:0{digits}X}" for i in row]) + ",\n"
+
+    return output
 
 
 class Map():
@@ -20,6 +51,8 @@ class Map():
         self._name = name
         self._data = data
         self._version = [int(i) for i in self._data[:3]]
+        self.w = W_TILES
+        self.h = H_TILES
         self._parse_map()
 
     @property
@@ -30,25 +63,58 @@ class Map():
     def name(self) -> str:
         return f"{self._name.upper()}_MAP"
 
+    @property
+    def ctype(self) -> str:
+        """Smallest c type able to hold every tile and palette index"""
+        return self._ctype
+
+    @property
+    def nbytes(self) -> int:
+        """Size of generated map data"""
+        return 2 * self.w * self.h * (1 if self.ctype == "uint8_t" else 2)
+
     @property
     def definition(self) -> str:
         return (
-            f"uint8_t {self._name.upper()}_MAP"
-            f"[1][2][{H_TILES * W_TILES}]"
+            f"{self.ctype} {self._name.upper()}_MAP"
+            f"[1][2][{self.h * self.w}]"
         )
 
     @property
     def pointer(self) -> str:
-        return f"uint8_t (*{self._name.upper()}_MAP)[1][2][{H_TILES * W_TILES}]"
+        return f"{self.ctype} (*{self._name.upper()}_MAP)[1][2][{self.h * self.w}]"
 
     @property
     def cast(self) -> str:
-        return f"(uint8_t (*)[1][2][{H_TILES * W_TILES}])"
+        return f"({self.ctype} (*)[1][2][{self.h * self.w}])"
 
     def _parse_map(self) -> None:
         """
         Parse map data into tile and palette indexes
         """
+        if self._version == VERSION_NIBBLE:
+            self._parse_nibble_map()
+        elif self._version == VERSION:
+            self._parse_indexed_map()
+        elif self._version == VERSION_CHUNKED:
+            self._parse_chunked_map()
+        else:
+            raise AttributeError(
+                f"Unsupported .map version {'.'.join(map(str, self._version))}"
+            )
+        self._update_ctype()
+
+    def _update_ctype(self) -> None:
+        """
+        Find the smallest c type able to hold every index, once indexes change
+        """
+        largest = max(max(self.data, default=0), max(self.palette_data, default=0))
+        self._ctype = "uint8_t" if largest < 2**8 else "uint16_t"
+
+    def _parse_nibble_map(self) -> None:
+        """
+        Parse fixed size map with tile and palette indexes packed into nibbles
+        """
         offset = 3
         data = []
         for j in range(H_TILES):
@@ -74,22 +140,122 @@ class Map():
         self.data = data
         self.palette_data = palette_data
 
+    def _parse_indexed_map(self) -> None:
+        """
+        Parse map with stored dimensions and byte or word wide indexes
+        """
+        offset = 3
+        self.w, self.h, index_size = struct.unpack_from(
+            HEADER_FORMAT, self._data, offset
+        )
+        if index_size not in INDEX_TYPECODES:
+            raise AttributeError(f"Unsupported .map index size {index_size}")
+
+        offset += HEADER_SIZE
+        n_bytes = self.w * self.h * index_size
+        self.data = self._extract_indexes(offset, n_bytes, index_size)
+        self.palette_data = self._extract_indexes(offset + n_bytes, n_bytes, index_size)
+
+    def _parse_chunked_map(self) -> None:
+        """
+        Parse chunked map into full tile and palette indexes
+        """
+        offset = 3
+        self.w, self.h, chunk_tiles, index_size = struct.unpack_from(
+            CHUNK_HEADER_FORMAT, self._data, offset
+        )
+        if index_size not in INDEX_TYPECODES:
+            raise AttributeError(f"Unsupported .map index size {index_size}")
+
+        offset += CHUNK_HEADER_SIZE
+        chunks_x = -(-self.w // chunk_tiles)
+        chunks_y = -(-self.h // chunk_tiles)
+        offsets = array.array("I")
+        offsets.frombytes(self._data[offset:offset + 4 * chunks_x * chunks_y])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+
+        typecode = INDEX_TYPECODES[index_size]
+        data = array.array(typecode, bytes(self.w * self.h * index_size))
+        palette_data = array.array(typecode, bytes(self.w * self.h * index_size))
+        n_bytes = chunk_tiles**2 * index_size
+        for idx, chunk_offset in enumerate(offsets):
+            if chunk_offset == 0:
+                continue
+
+            x0 = (idx % chunks_x) * chunk_tiles
+            y0 = (idx // chunks_x) * chunk_tiles
+            tiles = self._extract_indexes(chunk_offset, n_bytes, index_size)
+            palettes = self._extract_indexes(chunk_offset + n_bytes, n_bytes, index_size)
+            cols = min(chunk_tiles, self.w - x0)
+            for row in range(min(chunk_tiles, self.h - y0)):
+                start = (y0 + row) * self.w + x0
+                data[start:start + cols] = tiles[row * chunk_tiles:row * chunk_tiles + cols]
+                palette_data[start:start + cols] = \
+                    palettes[row * chunk_tiles:row * chunk_tiles + cols]
+
+        self.data = data
+        self.palette_data = palette_data
+
+    def _extract_indexes(
+        self,
+        offset: int,
+        n_bytes: int,
+        index_size: int
+    ) -> array.array:
+        """
+        Read little-endian indexes from `.map` data without per-index decoding
+        """
+        indexes = array.array(INDEX_TYPECODES[index_size])
+        indexes.frombytes(self._data[offset:offset + n_bytes])
+        if sys.byteorder == "big":
+            indexes.byteswap()
+
+        return indexes
+
+    def remap(
+        self,
+        tiles: dict[int, int] | None = None,
+        palettes: dict[int, int] | None = None
+    ) -> None:
+        """
+        Rewrite tile and palette indexes using old -> new index mappings
+        """
+        if tiles is not None:
+            self.data = [tiles[i] for i in self.data]
+        if palettes is not None:
+            self.palette_data = [palettes[i] for i in self.palette_data]
+        self._update_ctype()
+
+    def generate_define(self) -> str:
+        """
+        Generate map dimension definitions
+        """
+        return (
+            f"#define {self.name}_W {self.w}\n"
+            f"#define {self.name}_H {self.h}\n"
+        )
+
+    def as_bytes(self) -> bytes:
+        """
+        Tile and palette indexes in c array layout
+        """
+        return pack_values([*self.data, *self.palette_data], self.ctype)
+
     def generate_array(self) -> str:
         """
         Format byte data into c array
         """
+        ctype = self.ctype
         output = (
-            f"uint8_t {self._name.upper()}_MAP[][2][{H_TILES * W_TILES}] = {{\n"
+            f"{ctype} {self._name.upper()}_MAP[][2][{self.h * self.w}] = {{\n"
         )
         output += "    {\n"
         output += "        {\n"
-        for row in chunks(self.data, 8):
-            output += 12 * ' ' + ", ".join([f"0x{i:02X}" for i in row]) + ",\n"
+        output += format_indexes(self.data, ctype)
         output += "        },\n"
         output += "        {\n"
-        for row in chunks(self.palette_data, 8):
-            output += 12 * ' ' + ", ".join([f"0x{i:02X}" for i in row]) + ",\n"
-
+        output += format_indexes(self.palette_data, ctype)
         output += "        },\n"
         output += "    },\n"
         output += "};\n"
@@ -97,14 +263,404 @@ class Map():
         return output
 
 
+class MapChunkIndex():
+    def __init__(self, chunks: "MapChunks") -> None:
+        self._chunks = chunks
+
+    @property
+    def name(self) -> str:
+        return f"{self._chunks.map.name}_CHUNK_INDEX"
+
+    @property
+    def ctype(self) -> str:
+        return "uint16_t" if len(self._chunks.chunks) <= 2**16 else "uint32_t"
+
+    @property
+    def definition(self) -> str:
+        return (
+            f"{self.ctype} {self.name}"
+            f"[{self._chunks.chunks_y}][{self._chunks.chunks_x}]"
+        )
+
+    @property
+    def pointer(self) -> str:
+        return (
+            f"{self.ctype} (*{self.name})"
+            f"[{self._chunks.chunks_y}][{self._chunks.chunks_x}]"
+        )
+
+    @property
+    def cast(self) -> str:
+        return f"({self.ctype} (*)[{self._chunks.chunks_y}][{self._chunks.chunks_x}])"
+
+    def as_bytes(self) -> bytes:
+        """
+        Chunk lookup in c array layout
+        """
+        return pack_values(self._chunks.index, self.ctype)
+
+    def generate_array(self) -> str:
+        """
+        Format chunk lookup into c array
+        """
+        output = f"{self.ctype} {self.name}[][{self._chunks.chunks_x}] = {{\n"
+        for row in chunks(self._chunks.index, self._chunks.chunks_x):
+            output += "    {\n"
+            output += format_indexes(row, self.ctype, 8)
+            output += "    },\n"
+        output += "};\n"
+
+        return output
+
+
+class MapChunks():
+    def __init__(self, map: Map, chunk_tiles: int) -> None:
+        self._map = map
+        self._chunk_tiles = chunk_tiles
+        self.chunks_x = -(-map.w // chunk_tiles)
+        self.chunks_y = -(-map.h // chunk_tiles)
+        self._split()
+        self._chunk_index = MapChunkIndex(self)
+
+    @property
+    def map(self) -> Map:
+        return self._map
+
+    @property
+    def chunks(self) -> list[tuple[int, ...]]:
+        return self._chunks
+
+    @property
+    def index(self) -> list[int]:
+        return self._index
+
+    @property
+    def chunk_index(self) -> MapChunkIndex:
+        return self._chunk_index
+
+    @property
+    def name(self) -> str:
+        return f"{self._map.name}_CHUNKS"
+
+    @property
+    def nbytes(self) -> int:
+        """Size of generated chunk data, including the chunk index"""
+        size = 1 if self._map.ctype == "uint8_t" else 2
+        index_size = 2 if self._chunk_index.ctype == "uint16_t" else 4
+        return (
+            2 * len(self._chunks) * self._chunk_tiles**2 * size
+            + len(self._index) * index_size
+        )
+
+    @property
+    def definition(self) -> str:
+        return (
+            f"{self._map.ctype} {self.name}"
+            f"[{len(self._chunks)}][2][{self._chunk_tiles**2}]"
+        )
+
+    @property
+    def pointer(self) -> str:
+        return (
+            f"{self._map.ctype} (*{self.name})"
+            f"[{len(self._chunks)}][2][{self._chunk_tiles**2}]"
+        )
+
+    @property
+    def cast(self) -> str:
+        return f"({self._map.ctype} (*)[{len(self._chunks)}][2][{self._chunk_tiles**2}])"
+
+    def _split(self) -> None:
+        """
+        Split map into padded chunks, sharing identical chunks
+        """
+        cs = self._chunk_tiles
+        w, h = self._map.w, self._map.h
+        unique: dict[tuple[int, ...], int] = {}
+        index = []
+        for cy in range(self.chunks_y):
+            for cx in range(self.chunks_x):
+                tiles = []
+                palettes = []
+                cols = min(cs, w - cx * cs)
+                padding = [0] * (cs - cols)
+                for row in range(cs):
+                    y = cy * cs + row
+                    if y < h:
+                        start = y * w + cx * cs
+                        tiles.extend(self._map.data[start:start + cols])
+                        tiles.extend(padding)
+                        palettes.extend(self._map.palette_data[start:start + cols])
+                        palettes.extend(padding)
+                    else:
+                        tiles.extend([0] * cs)
+                        palettes.extend([0] * cs)
+
+                chunk = tuple(tiles + palettes)
+                index.append(unique.setdefault(chunk, len(unique)))
+
+        self._chunks = list(unique)
+        self._index = index
+
+    def generate_define(self) -> str:
+        """
+        Generate chunk layout definitions
+        """
+        return (
+            f"#define {self._map.name}_CHUNK_TILES {self._chunk_tiles}\n"
+            f"#define {self._map.name}_CHUNKS_X {self.chunks_x}\n"
+            f"#define {self._map.name}_CHUNKS_Y {self.chunks_y}\n"
+        )
+
+    def as_bytes(self) -> bytes:
+        """
+        Unique chunks in c array layout
+        """
+        return pack_values(
+            [i for chunk in self._chunks for i in chunk],
+            self._map.ctype
+        )
+
+    def generate_array(self) -> str:
+        """
+        Format unique chunks into c array
+        """
+        ctype = self._map.ctype
+        n = self._chunk_tiles**2
+        output = f"{ctype} {self.name}[][2][{n}] = {{\n"
+        for chunk in self._chunks:
+            output += "    {\n"
+            output += "        {\n"
+            output += format_indexes(chunk[:n], ctype)
+            output += "        },\n"
+            output += "        {\n"
+            output += format_indexes(chunk[n:], ctype)
+            output += "        },\n"
+            output += "    },\n"
+        output += "};\n"
+
+        return output
+
+
+class MapFills():
+    def __init__(self, cells: "MapCells") -> None:
+        self._cells = cells
+
+    @property
+    def name(self) -> str:
+        return f"{self._cells.map.name}_FILLS"
+
+    @property
+    def definition(self) -> str:
+        return f"{self._cells.ctype} {self.name}[{max(len(self._cells.fills), 1)}][4]"
+
+    @property
+    def pointer(self) -> str:
+        return f"{self._cells.ctype} (*{self.name})[{max(len(self._cells.fills), 1)}][4]"
+
+    @property
+    def cast(self) -> str:
+        return f"({self._cells.ctype} (*)[{max(len(self._cells.fills), 1)}][4])"
+
+    def as_bytes(self) -> bytes:
+        """
+        Solid runs in c array layout
+        """
+        return pack_values(
+            [i for fill in self._cells.fills or [(0, 0, 0, 0)] for i in fill],
+            self._cells.ctype
+        )
+
+    def generate_array(self) -> str:
+        """
+        Format solid runs into c array of {cell, length, palette, colour}
+        """
+        output = f"{self._cells.ctype} {self.name}[][4] = {{\n"
+        for fill in self._cells.fills or [(0, 0, 0, 0)]:
+            output += "    { " + ", ".join([f"{i}" for i in fill]) + " },\n"
+        output += "};\n"
+
+        return output
+
+
+# Cells and fills drawn by DRAW_map_cells, which reads the map as
+# uint8_t[2][SCREEN_TILES] and these tables as uint16_t through MapCells_t
+class MapCells():
+    def __init__(self, map: Map, spritesheet: Spritesheet) -> None:
+        if map.w * map.h != SCREEN_TILES or map.ctype != "uint8_t":
+            raise ValueError(
+                f"{map.name} is {map.w}x{map.h} with {map.ctype} indexes, "
+                f"DRAW_map_cells only draws {SCREEN_TILES} cells of uint8_t"
+            )
+        self._map = map
+        self._classify(spritesheet)
+        self._map_fills = MapFills(self)
+
+    @property
+    def map(self) -> Map:
+        return self._map
+
+    @property
+    def cells(self) -> list[int]:
+        return self._cells
+
+    @property
+    def fills(self) -> list[tuple[int, int, int, int]]:
+        return self._fills
+
+    @property
+    def n_empty(self) -> int:
+        return self._n_empty
+
+    @property
+    def tables(self) -> list["MapCells | MapFills"]:
+        return [self, self._map_fills]
+
+    @property
+    def name(self) -> str:
+        return f"{self._map.name}_CELLS"
+
+    @property
+    def ctype(self) -> str:
+        """C type of cell indexes and fills, as read through MapCells_t"""
+        return "uint16_t"
+
+    @property
+    def definition(self) -> str:
+        return f"{self.ctype} {self.name}[{max(len(self._cells), 1)}]"
+
+    @property
+    def pointer(self) -> str:
+        return f"{self.ctype} (*{self.name})[{max(len(self._cells), 1)}]"
+
+    @property
+    def cast(self) -> str:
+        return f"({self.ctype} (*)[{max(len(self._cells), 1)}])"
+
+    def _classify(self, spritesheet: Spritesheet) -> None:
+        """
+        Sort cells into empty, solid colour and detailed.
+
+        Detailed cells are listed for drawing, and runs of solid cells of
+        the same colour along a row are merged into one fill.
+        """
+        colours = [solid_colour(sprite) for sprite in spritesheet.sprites]
+        w = self._map.w
+        cells = []
+        fills = []
+        n_empty = 0
+        for y in range(self._map.h):
+            run = None
+            for x in range(w):
+                idx = x + y * w
+                colour = colours[self._map.data[idx]]
+                fill = None
+                if colour is None:
+                    cells.append(idx)
+                elif colour == 0:
+                    n_empty += 1
+                else:
+                    fill = (self._map.palette_data[idx], colour)
+
+                if run is not None and fill == (run[2], run[3]):
+                    run[1] += 1
+                    continue
+                if run is not None:
+                    fills.append(tuple(run))
+                run = [idx, 1, *fill] if fill is not None else None
+
+            if run is not None:
+                fills.append(tuple(run))
+
+        self._cells = cells
+        self._fills = fills
+        self._n_empty = n_empty
+
+    def generate_define(self) -> str:
+        """
+        Generate cell and fill counts
+        """
+        return (
+            f"#define {self._map.name}_N_CELLS {len(self._cells)}\n"
+            f"#define {self._map.name}_N_FILLS {len(self._fills)}\n"
+        )
+
+    def as_bytes(self) -> bytes:
+        """
+        Detailed cell indexes in c array layout
+        """
+        return pack_values(self._cells or [0], self.ctype)
+
+    def generate_array(self) -> str:
+        """
+        Format detailed cell indexes into c array
+        """
+        output = f"{self.ctype} {self.name}[] = {{\n"
+        output += format_indexes(self._cells or [0], self.ctype, 4)
+        output += "};\n"
+
+        return output
+
+
 class MapGenerator():
-    def __init__(self) -> None:
+    def __init__(self, chunk_tiles: int | None = None) -> None:
         self._maps = []
+        self._chunks = []
+        self._chunk_tiles = chunk_tiles
+        self._cells = []
+        self._spritesheet = None
 
     @property
     def maps(self) -> list[Map]:
         return self._maps
 
+    @property
+    def chunks(self) -> list[MapChunks]:
+        return self._chunks
+
+    @property
+    def chunk_tables(self) -> list[MapChunks | MapChunkIndex]:
+        tables = []
+        for map_chunks in self._chunks:
+            tables.append(map_chunks)
+            tables.append(map_chunks.chunk_index)
+
+        return tables
+
+    @property
+    def cells(self) -> list[MapCells]:
+        return self._cells
+
+    @property
+    def cell_tables(self) -> list[MapCells | MapFills]:
+        tables = []
+        for map_cells in self._cells:
+            tables.extend(map_cells.tables)
+
+        return tables
+
+    def classify(self, spritesheet: Spritesheet) -> None:
+        """
+        Classify every map cell using the pixel data of `spritesheet`
+        """
+        self._spritesheet = spritesheet
+        self._cells = [MapCells(map, spritesheet) for map in self._maps]
+
+    def remap(
+        self,
+        tiles: dict[int, int] | None = None,
+        palettes: dict[int, int] | None = None
+    ) -> None:
+        """
+        Rewrite tile and palette indexes of every map
+        """
+        for map in self._maps:
+            map.remap(tiles, palettes)
+        if self._chunk_tiles is not None:
+            self._chunks = [MapChunks(map, self._chunk_tiles) for map in self._maps]
+        if self._spritesheet is not None:
+            self.classify(self._spritesheet)
+
     def parse_map(
         self,
         filename: str
@@ -120,6 +676,8 @@ class MapGenerator():
             data = f.read()
 
         self._maps.append(Map(name, data))
+        if self._chunk_tiles is not None:
+            self._chunks.append(MapChunks(self._maps[-1], self._chunk_tiles))
 
     def generate_header(self, filename: str) -> None:
         """
@@ -138,6 +696,13 @@ class MapGenerator():
                 "\n",
                 "\n"
             ])
+            f.write("\n".join([i.generate_define() for i in self._maps]))
+            if self._chunks:
+                f.write("\n")
+                f.write("\n".join([i.generate_define() for i in self._chunks]))
+            if self._cells:
+                f.write("\n")
+                f.write("\n".join([i.generate_define() for i in self._cells]))
             f.writelines([
                 "\n\n",
                 f"#endif // {header_def}"
@@ -0,0 +1,255 @@
+# Standard library imports
+import os
+from pathlib import Path
+
+# Local
+from csprite.palette import PaletteGroup
+from csprite.shared import chunks, pack_values
+from csprite.sprite import Spritesheet
+
+
+# Constants
+TILE_PX = 8
+EMPTY_TILE = 0xff
+# Parts per side whose pixel offset fits in uint8_t
+MAX_SIZE = 0xff // TILE_PX
+FLIP_H = 0b01
+FLIP_V = 0b10
+PART_BYTES = 3
+PART_FIELDS = 5
+
+
+class Metasprite():
+    def __init__(
+        self,
+        data: bytes,
+        spritesheets: list[Spritesheet],
+        palettes: list[PaletteGroup]
+    ) -> None:
+        self._data = data
+        self._version = [int(i) for i in self._data[:3]]
+        self._parse_metasprite(spritesheets, palettes)
+
+    @property
+    def version(self) -> list[int]:
+        return self._version
+
+    @property
+    def label(self) -> str:
+        return self._label
+
+    @property
+    def w(self) -> int:
+        return self._w
+
+    @property
+    def h(self) -> int:
+        return self._h
+
+    @property
+    def spritesheet(self) -> Spritesheet:
+        return self._spritesheet
+
+    @property
+    def palette(self) -> PaletteGroup:
+        return self._palette
+
+    @property
+    def name(self) -> str:
+        return f"{self._label.upper()}_META"
+
+    @property
+    def parts(self) -> list[list[int]]:
+        """
+        (x, y, sprite, palette, flags) of every drawn part. Sprites and
+        palettes are looked up by label, so stay valid once assets are
+        stripped or reordered
+        """
+        parts = [
+            [
+                TILE_PX * i,
+                TILE_PX * j,
+                self._spritesheet.labels.index(tile),
+                self._palette.labels.index(palette),
+                flags
+            ]
+            for i, j, tile, palette, flags in self._parts
+        ]
+        for _, _, tile, palette, _ in parts:
+            if tile > 0xff or palette > 0xff:
+                raise ValueError(
+                    f"Metasprite '{self._label}' draws sprite {tile} with "
+                    f"palette {palette}, past the uint8_t range"
+                )
+
+        return parts
+
+    @property
+    def tiles(self) -> set[int]:
+        """Sprites drawn by the metasprite"""
+        return {part[2] for part in self.parts}
+
+    @property
+    def palettes(self) -> set[int]:
+        """Palettes drawn with by the metasprite"""
+        return {part[3] for part in self.parts}
+
+    @property
+    def nbytes(self) -> int:
+        """Size of generated descriptor table"""
+        return max(len(self._parts), 1) * PART_FIELDS
+
+    @property
+    def definition(self) -> str:
+        return f"uint8_t {self.name}[{max(len(self._parts), 1)}][{PART_FIELDS}]"
+
+    @property
+    def pointer(self) -> str:
+        return f"uint8_t (*{self.name})[{max(len(self._parts), 1)}][{PART_FIELDS}]"
+
+    @property
+    def cast(self) -> str:
+        return f"(uint8_t (*)[{max(len(self._parts), 1)}][{PART_FIELDS}])"
+
+    def _parse_metasprite(
+        self,
+        spritesheets: list[Spritesheet],
+        palettes: list[PaletteGroup]
+    ) -> None:
+        """
+        Parse label, spritesheet and parts from `.meta` file
+        """
+        offset = 3
+        label_length = self._data[offset]
+        self._label = str(
+            self._data[offset + 1:offset + 1 + label_length], encoding="utf-8"
+        )
+        offset += label_length + 1
+
+        sheet_length = self._data[offset]
+        sheet = str(
+            self._data[offset + 1:offset + 1 + sheet_length], encoding="utf-8"
+        ).upper()
+        offset += sheet_length + 1
+        self._spritesheet = self._find(spritesheets, f"{sheet}_SPRITE")
+        self._palette = self._find(palettes, f"{sheet}_PAL")
+
+        self._w, self._h = self._data[offset], self._data[offset + 1]
+        offset += 2
+        if self._w > MAX_SIZE or self._h > MAX_SIZE:
+            raise ValueError(
+                f"Metasprite '{self._label}' is {self._w}x{self._h} parts, "
+                f"at most {MAX_SIZE}x{MAX_SIZE} fit uint8_t positions"
+            )
+
+        self._parts = []
+        parts = self._data[offset:offset + PART_BYTES * self._w * self._h]
+        for n, (tile, palette, flags) in enumerate(chunks(parts, PART_BYTES)):
+            if tile == EMPTY_TILE:
+                continue
+            j, i = divmod(n, self._w)
+            self._parts.append([
+                i,
+                j,
+                self._spritesheet.labels[tile],
+                self._palette.labels[palette],
+                flags
+            ])
+
+    def _find(self, assets: list, name: str) -> Spritesheet | PaletteGroup:
+        for asset in assets:
+            if asset.name == name:
+                return asset
+        raise ValueError(f"Metasprite '{self._label}' uses missing asset {name}")
+
+    def generate_define(self) -> str:
+        """
+        Generate size and part count definitions
+        """
+        return (
+            f"#define {self.name}_W {self._w}\n"
+            f"#define {self.name}_H {self._h}\n"
+            f"#define {self.name}_PARTS {len(self._parts)}\n"
+        )
+
+    def as_bytes(self) -> bytes:
+        """
+        Descriptor table in c array layout
+        """
+        return pack_values(
+            [i for part in self.parts or [[0] * PART_FIELDS] for i in part],
+            "uint8_t"
+        )
+
+    def generate_array(self) -> str:
+        """
+        Format parts into c array of (x, y, sprite, palette, flags)
+        """
+        output = f"uint8_t {self.name}[][{PART_FIELDS}] = {{\n"
+        for part in self.parts or [[0] * PART_FIELDS]:
+            output += "    {" + ", ".join([f"{i}" for i in part]) + "},\n"
+        output += "};\n"
+
+        return output
+
+
+class MetaspriteGenerator():
+    def __init__(self) -> None:
+        self._metasprites = []
+
+    @property
+    def metasprites(self) -> list[Metasprite]:
+        return self._metasprites
+
+    def parse_metasprite(
+        self,
+        filename: str,
+        spritesheets: list[Spritesheet],
+        palettes: list[PaletteGroup]
+    ) -> None:
+        """
+        Load and parse metasprite, resolving its spritesheet and palette
+        group by name
+        """
+        if not Path(filename).is_file():
+            raise FileNotFoundError(filename)
+
+        with open(filename, "rb") as f:
+            data = f.read()
+
+        self._metasprites.append(Metasprite(data, spritesheets, palettes))
+
+    def generate_header(self, filename: str) -> None:
+        """
+        Generate header file from metasprites
+        """
+        header_def = filename.split(os.sep)[-1].upper().replace('.', '_') + '_'
+
+        with open(filename, "w") as f:
+            f.writelines([
+                "/**\n"
+                " * Generated file\n"
+                "**/\n"
+                f"#ifndef {header_def}\n",
+                f"#define {header_def}\n",
+                "\n",
+                "#include <stdint.h>\n",
+                "\n",
+                "\n",
+                "typedef enum {\n",
+                "    META_X = 0,\n",
+                "    META_Y,\n",
+                "    META_SPRITE,\n",
+                "    META_PALETTE,\n",
+                "    META_FLAGS\n",
+                "} MetaPart_e;\n",
+                "\n",
+                f"#define META_FLIP_H 0x{FLIP_H:02X}\n",
+                f"#define META_FLIP_V 0x{FLIP_V:02X}\n",
+                "\n"
+            ])
+            f.write("\n".join([i.generate_define() for i in self._metasprites]))
+            f.writelines([
+                "\n\n",
+                f"#endif // {header_def}"
+            ])
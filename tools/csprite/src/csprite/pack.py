@@ -0,0 +1,125 @@
+# Standard library imports
+import os
+import struct
+import tempfile
+from importlib import resources
+from pathlib import Path
+from string import Template
+
+# Local imports
+from csprite.graphics import GraphicsGenerator
+from csprite.shared import CTYPE_TYPECODES
+from csprite import templates
+
+
+# Constants
+TEMPLATE_FILE = resources.files(templates) / "gpak.txt"
+MAGIC = b"GPAK"
+VERSION = 1
+# magic, version, number of entries, index offset, reserved
+HEADER_FORMAT = "<4sHHII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# name, element size, reserved, payload offset, payload size
+ENTRY_FORMAT = "<32sIIQQ"
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)
+NAME_LENGTH = 32
+PAGE_SIZE = 4096
+ELEMENT_SIZES = {"uint8_t": 1, "uint16_t": 2, "uint32_t": 4}
+
+
+def page_align(offset: int) -> int:
+    """
+    Round offset up to the next page boundary
+    """
+    return -(-offset // PAGE_SIZE) * PAGE_SIZE
+
+
+class PackGenerator():
+    def __init__(self, graphics: GraphicsGenerator) -> None:
+        self._graphics = graphics
+
+    @property
+    def symbols(self) -> list:
+        return [symbol for _, symbols in self._graphics.sections for symbol in symbols]
+
+    def generate_pack(self, filename: str) -> list[tuple[str, int, int]]:
+        """
+        Write every symbol into a `.gpak` pack file.
+
+        The header and typed index come first, followed by each payload on
+        its own page so it can be mapped and shared as is. The pack is
+        written next to `filename` and moved into place, so running games
+        keep their mapping of the previous pack. Returns the name, offset
+        and size of every entry.
+        """
+        entries = []
+        offset = page_align(HEADER_SIZE + ENTRY_SIZE * len(self.symbols))
+        payloads = []
+        for symbol in self.symbols:
+            name = symbol.name.encode()
+            if len(name) >= NAME_LENGTH:
+                raise ValueError(f"Symbol name {symbol.name} is too long for .gpak")
+
+            ctype = symbol.definition.split()[0]
+            if ctype not in CTYPE_TYPECODES:
+                raise ValueError(f"Symbol {symbol.name} has unsupported type {ctype}")
+
+            payload = symbol.as_bytes()
+            entries.append((name, ELEMENT_SIZES[ctype], offset, len(payload)))
+            payloads.append(payload)
+            offset = page_align(offset + len(payload))
+
+        path = Path(filename)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(struct.pack(
+                    HEADER_FORMAT, MAGIC, VERSION, len(entries), HEADER_SIZE, 0
+                ))
+                for name, element_size, offset, size in entries:
+                    f.write(struct.pack(
+                        ENTRY_FORMAT, name, element_size, 0, offset, size
+                    ))
+                for (_, _, offset, _), payload in zip(entries, payloads):
+                    f.seek(offset)
+                    f.write(payload)
+                f.truncate(page_align(f.tell()))
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        return [(name.decode(), offset, size) for name, _, offset, size in entries]
+
+    def generate_src(self, filename: str, pack_name: str) -> None:
+        """
+        Generate loader that maps `pack_name` and points symbols into it.
+        Symbols are listed in the same order as the pack index, so each is
+        found at its position instead of by searching
+        """
+        with TEMPLATE_FILE.open("r") as f:
+            template = Template(f.read())
+
+        definitions, symbol_list = self._graphics.generate_definitions()
+        symbols = "\n".join([
+            (
+                f'    {i} = {j}GPAK_find({k}, "{i}", sizeof(*{i}));\n'
+                f"    if ({i} == NULL)\n"
+                "    {\n"
+                "        return 1;\n"
+                "    }\n"
+            )
+            for k, (i, j) in enumerate(symbol_list)
+        ])
+        output = template.substitute({
+            "magic": MAGIC.decode(),
+            "version": VERSION,
+            "name_length": NAME_LENGTH,
+            "filename": pack_name,
+            "definitions": definitions,
+            "symbols": symbols
+        })
+
+        with open(filename, "w") as f:
+            f.write(output)
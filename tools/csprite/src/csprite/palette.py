@@ -1,19 +1,236 @@
 # Standard library imports
+import abc
+import colorsys
 import os
 from pathlib import Path
 
 # Local
-from csprite.shared import chunks
+from csprite.shared import chunks, pack_values
 
 
 PALETTE_LENGTH = 8
 
 
+def format_colour(r: int, g: int, b: int) -> str:
+    """
+    Format RGB colour as opaque ARGB8888 literal
+    """
+    return f"0xff{r:02x}{g:02x}{b:02x}"
+
+
+def argb(r: int, g: int, b: int) -> int:
+    """
+    Opaque ARGB8888 value of RGB colour
+    """
+    return 0xff000000 | r << 16 | g << 8 | b
+
+
+class PaletteVariant(abc.ABC):
+    def __init__(
+        self,
+        name: str,
+        steps: int,
+        amount: float = 1.0
+    ) -> None:
+        if steps < 1:
+            raise ValueError(f"Palette variant '{name}' needs at least 1 step")
+        self._name = name
+        self._steps = steps
+        self._amount = amount
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def steps(self) -> int:
+        return self._steps
+
+    def strength(self, step: int) -> float:
+        """
+        Effect strength at `step`, reaching `amount` on the final step
+        """
+        return self._amount * (step + 1) / self._steps
+
+    @abc.abstractmethod
+    def transform(self, r: int, g: int, b: int, strength: float) -> list[int]:
+        """
+        Transform a single colour
+        """
+
+
+class DesaturateVariant(PaletteVariant):
+    def __init__(
+        self,
+        steps: int = 4,
+        amount: float = 0.0,
+        name: str = "desaturate"
+    ) -> None:
+        super().__init__(name, steps, amount)
+
+    def strength(self, step: int) -> float:
+        """
+        Saturation kept at `step`, reaching `amount` on the final step like
+        `DRAW_desaturate(amount)`
+        """
+        return 1 - (1 - self._amount) * (step + 1) / self._steps
+
+    def transform(self, r: int, g: int, b: int, strength: float) -> list[int]:
+        """
+        Scale HSV saturation by `strength`, matching `COLOUR_desaturate`
+        """
+        h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+        rgb = colorsys.hsv_to_rgb(h, s * strength, v)
+        return [int(c * 255) for c in rgb]
+
+
+class FadeVariant(PaletteVariant):
+    def __init__(
+        self,
+        steps: int = 4,
+        amount: float = 1.0,
+        name: str = "fade"
+    ) -> None:
+        super().__init__(name, steps, amount)
+
+    def transform(self, r: int, g: int, b: int, strength: float) -> list[int]:
+        """
+        Fade colour towards black
+        """
+        return [int(c * (1 - strength)) for c in (r, g, b)]
+
+
+class TintVariant(PaletteVariant):
+    def __init__(
+        self,
+        name: str,
+        colour: list[int],
+        steps: int = 4,
+        amount: float = 0.5
+    ) -> None:
+        super().__init__(name, steps, amount)
+        self._colour = colour
+
+    def transform(self, r: int, g: int, b: int, strength: float) -> list[int]:
+        """
+        Blend colour towards the tint colour
+        """
+        return [
+            int(c + (t - c) * strength)
+            for c, t in zip((r, g, b), self._colour)
+        ]
+
+
+class PaletteVariantTable():
+    def __init__(
+        self,
+        group: "PaletteGroup",
+        variant: PaletteVariant
+    ) -> None:
+        self._group = group
+        self._variant = variant
+        self._steps = self._generate_steps()
+
+    @property
+    def variant(self) -> PaletteVariant:
+        return self._variant
+
+    @property
+    def steps(self) -> list[list[list[list[int]]]]:
+        return self._steps
+
+    @property
+    def name(self) -> str:
+        return f"{self._group.name}_{self._variant.name.upper()}"
+
+    @property
+    def definition(self) -> str:
+        return (
+            f"uint32_t {self.name}"
+            f"[{self._variant.steps}][{len(self._group.palettes)}][{PALETTE_LENGTH}]"
+        )
+
+    @property
+    def pointer(self) -> str:
+        return (
+            f"uint32_t (*{self.name})"
+            f"[{self._variant.steps}][{len(self._group.palettes)}][{PALETTE_LENGTH}]"
+        )
+
+    @property
+    def cast(self) -> str:
+        return (
+            f"(uint32_t (*)[{self._variant.steps}]"
+            f"[{len(self._group.palettes)}][{PALETTE_LENGTH}])"
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Size of generated variant data"""
+        return 4 * self._variant.steps * len(self._group.palettes) * PALETTE_LENGTH
+
+    def _generate_steps(self) -> list[list[list[list[int]]]]:
+        """
+        Apply variant transform to every colour for each step
+        """
+        steps = []
+        for step in range(self._variant.steps):
+            strength = self._variant.strength(step)
+            steps.append([
+                [self._variant.transform(r, g, b, strength) for r, g, b in palette]
+                for palette in self._group.colours
+            ])
+
+        return steps
+
+    def generate_define(self) -> str:
+        """
+        Generate step count definition
+        """
+        return f"#define {self.name}_STEPS {self._variant.steps}\n"
+
+    def as_bytes(self) -> bytes:
+        """
+        Variant palettes in c array layout
+        """
+        return pack_values(
+            [
+                argb(r, g, b)
+                for step in self._steps
+                for palette in step
+                for r, g, b in palette
+            ],
+            "uint32_t"
+        )
+
+    def generate_array(self) -> str:
+        """
+        Format variant palettes into c array
+        """
+        output = (
+            f"uint32_t {self.name}"
+            f"[][{len(self._group.palettes)}][{PALETTE_LENGTH}] = {{\n"
+        )
+        for step in self._steps:
+            output += "    {\n"
+            for palette in step:
+                output += "        {\n"
+                for r, g, b in palette:
+                    output += f"            {format_colour(r, g, b)},\n"
+                output += "        },\n"
+            output += "    },\n"
+
+        output += "};\n"
+
+        return output
+
+
 class PaletteGroup():
     def __init__(
         self,
         name: str,
-        data: bytes
+        data: bytes,
+        variants: list[PaletteVariant] | None = None
     ) -> None:
         self._name = name
         self._data = data
@@ -21,6 +238,10 @@ class PaletteGroup():
         self._palettes = []
         self._labels = []
         self._parse_palette()
+        self._variant_transforms = variants or []
+        self._variants = [
+            PaletteVariantTable(self, variant) for variant in self._variant_transforms
+        ]
 
     @property
     def version(self) -> list[int]:
@@ -42,10 +263,22 @@ class PaletteGroup():
 
         return colours
 
+    @property
+    def variants(self) -> list[PaletteVariantTable]:
+        return self._variants
+
     @property
     def name(self) -> str:
         return f"{self._name.upper()}_PAL"
 
+    @property
+    def nbytes(self) -> int:
+        """Size of generated palette data, including variants"""
+        return (
+            4 * len(self._palettes) * PALETTE_LENGTH
+            + sum([variant.nbytes for variant in self._variants])
+        )
+
     @property
     def definition(self) -> str:
         return (
@@ -96,6 +329,16 @@ class PaletteGroup():
 
         return offset, label, data
 
+    def select(self, indexes: list[int]) -> None:
+        """
+        Keep only palettes at `indexes`, in the order given
+        """
+        self._palettes = [self._palettes[i] for i in indexes]
+        self._labels = [self._labels[i] for i in indexes]
+        self._variants = [
+            PaletteVariantTable(self, variant) for variant in self._variant_transforms
+        ]
+
     def generate_enum(self) -> str:
         """
         Generate enum from palette names
@@ -114,6 +357,19 @@ class PaletteGroup():
 
         return output
 
+    def as_bytes(self) -> bytes:
+        """
+        Palettes in c array layout
+        """
+        return pack_values(
+            [
+                argb(r, g, b)
+                for palette in self._palettes
+                for r, g, b in chunks(palette, 3)
+            ],
+            "uint32_t"
+        )
+
     def generate_array(self) -> str:
         """
         Format byte data into c array
@@ -124,7 +380,7 @@ class PaletteGroup():
         for palette in self._palettes:
             array = "    {\n"
             for r, g, b in chunks(palette, 3):
-                array += f"        0xff{r:02x}{g:02x}{b:02x},\n"
+                array += f"        {format_colour(r, g, b)},\n"
             array += "    },\n"
             output += array
 
@@ -134,13 +390,18 @@ class PaletteGroup():
 
 
 class PaletteGenerator():
-    def __init__(self) -> None:
+    def __init__(self, variants: list[PaletteVariant] | None = None) -> None:
         self._palettes = []
+        self._variants = variants or []
 
     @property
     def palettes(self) -> list[PaletteGroup]:
         return self._palettes
 
+    @property
+    def variants(self) -> list[PaletteVariantTable]:
+        return [table for palette in self._palettes for table in palette.variants]
+
     def parse_palette(
         self,
         filename: str
@@ -156,9 +417,15 @@ class PaletteGenerator():
             data = f.read()
 
         self._palettes.append(
-            PaletteGroup(name, data)
+            PaletteGroup(name, data, self._variants)
         )
 
+    def remove_palette(self, palette: PaletteGroup) -> None:
+        """
+        Remove palette group from generated output
+        """
+        self._palettes.remove(palette)
+
     def generate_header(self, filename: str) -> None:
         """
         Generate header file from spritesheets
@@ -178,6 +445,9 @@ class PaletteGenerator():
                 "\n"
             ])
             f.write("\n".join([i.generate_enum() for i in self._palettes]))
+            if self.variants:
+                f.write("\n")
+                f.write("".join([i.generate_define() for i in self.variants]))
             f.writelines([
                 "\n\n",
                 f"#endif // {header_def}"
@@ -0,0 +1,193 @@
+# Standard library imports
+import re
+from pathlib import Path
+
+# Local imports
+from csprite.map import MapGenerator
+from csprite.metasprite import MetaspriteGenerator
+from csprite.palette import PaletteGenerator, PaletteGroup
+from csprite.sprite import SpriteGenerator, Spritesheet
+
+
+# Constants
+BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+LINE_COMMENT = re.compile(r"//[^\n]*")
+SYMBOL_USE = re.compile(r"\b(\w+_(?:SPRITE|PAL))\b\s*\)?\s*(?:\[([^\]]*)\])?")
+IDENTIFIER = re.compile(r"\b[A-Z][A-Z0-9_]*\b")
+LITERAL_INDEX = re.compile(r"\s*(\d+)\s*")
+
+
+Asset = Spritesheet | PaletteGroup
+
+
+class ReferenceGraph():
+    def __init__(self) -> None:
+        # source (map or c file) -> {(asset symbol, index or None for all)}
+        self._edges: dict[str, set[tuple[str, int | None]]] = {}
+        # Entries indexed by literal in c code, which must keep their index
+        self._pinned: dict[str, set[int]] = {}
+        # Assets drawn through maps, which pick the entries that are used
+        self._bound: set[str] = set()
+
+    @property
+    def edges(self) -> dict[str, set[tuple[str, int | None]]]:
+        return self._edges
+
+    def add_reference(
+        self,
+        source: str,
+        asset: str,
+        idx: int | None = None,
+        pinned: bool = False
+    ) -> None:
+        """
+        Record that `source` uses entry `idx` of `asset`, or all entries
+        """
+        self._edges.setdefault(source, set()).add((asset, idx))
+        if pinned and idx is not None:
+            self._pinned.setdefault(asset, set()).add(idx)
+
+    def add_maps(
+        self,
+        maps: MapGenerator,
+        spritesheet: Spritesheet,
+        palette: PaletteGroup
+    ) -> None:
+        """
+        Add map -> tile and map -> palette references
+        """
+        self._bound.update([spritesheet.name, palette.name])
+        for map in maps.maps:
+            for idx in set(map.data):
+                self.add_reference(map.name, spritesheet.name, idx)
+            for idx in set(map.palette_data):
+                self.add_reference(map.name, palette.name, idx)
+
+    def add_metasprites(self, metasprites: MetaspriteGenerator) -> None:
+        """
+        Add metasprite -> sprite and metasprite -> palette references
+        """
+        for metasprite in metasprites.metasprites:
+            for idx in metasprite.tiles:
+                self.add_reference(metasprite.name, metasprite.spritesheet.name, idx)
+            for idx in metasprite.palettes:
+                self.add_reference(metasprite.name, metasprite.palette.name, idx)
+
+    def add_sources(self, filenames: list[str], assets: list[Asset]) -> None:
+        """
+        Add references from c sources, by symbol index or enum label
+        """
+        labels = {}
+        for asset in assets:
+            for idx, label in enumerate(asset.labels):
+                labels.setdefault(label.upper(), []).append((asset.name, idx))
+
+        for filename in filenames:
+            source = Path(filename).read_text()
+            source = LINE_COMMENT.sub("", BLOCK_COMMENT.sub("", source))
+
+            for symbol, index in SYMBOL_USE.findall(source):
+                literal = LITERAL_INDEX.fullmatch(index)
+                if literal is not None:
+                    self.add_reference(filename, symbol, int(literal.group(1)), True)
+                elif index.strip().upper() in labels:
+                    # Resolved through enum labels below
+                    continue
+                elif index or symbol not in self._bound:
+                    # Computed index, or asset passed to code that indexes it
+                    self.add_reference(filename, symbol)
+
+            for identifier in set(IDENTIFIER.findall(source)):
+                for asset, idx in labels.get(identifier, []):
+                    self.add_reference(filename, asset, idx)
+
+    def referenced(self, asset: str) -> set[int] | None:
+        """
+        Entries of `asset` that are used, or None if all are
+        """
+        indexes = set()
+        for targets in self._edges.values():
+            for name, idx in targets:
+                if name != asset:
+                    continue
+                if idx is None:
+                    return None
+                indexes.add(idx)
+
+        return indexes
+
+    def pinned(self, asset: str) -> set[int]:
+        """
+        Entries of `asset` indexed by literal in c code
+        """
+        return set(self._pinned.get(asset, set()))
+
+    def _keep(self, asset: Asset, n: int) -> list[int] | None:
+        """
+        Indexes of `asset` to keep, or None if it can be removed
+        """
+        indexes = self.referenced(asset.name)
+        if indexes is None:
+            return list(range(n))
+
+        # Literal indexes in code only stay valid if nothing before them moves
+        pinned = self._pinned.get(asset.name, set())
+        if pinned:
+            indexes.update(range(max(pinned) + 1))
+
+        keep = sorted([i for i in indexes if i < n])
+        if not keep and asset.name not in self._bound:
+            return None
+
+        return keep or [0]
+
+    def strip(
+        self,
+        generators: list[SpriteGenerator],
+        palette: PaletteGenerator,
+        maps: MapGenerator,
+        spritesheet: Spritesheet,
+        palette_group: PaletteGroup
+    ) -> list[tuple[str, int, int]]:
+        """
+        Drop unreferenced sprites and palettes, compacting map indexes.
+
+        Returns (asset, bytes before, bytes after) for every asset.
+        """
+        report = []
+        map_bytes = {map.name: map.nbytes for map in maps.maps}
+        map_bytes.update({chunks.name: chunks.nbytes for chunks in maps.chunks})
+
+        for generator in generators:
+            for sheet in list(generator.spritesheets):
+                before = sheet.nbytes
+                keep = self._keep(sheet, len(sheet.sprites))
+                if keep is None:
+                    generator.remove_spritesheet(sheet)
+                    report.append((sheet.name, before, 0))
+                    continue
+
+                sheet.select(keep)
+                report.append((sheet.name, before, sheet.nbytes))
+                if sheet is spritesheet:
+                    maps.remap(tiles={old: new for new, old in enumerate(keep)})
+
+        for group in list(palette.palettes):
+            before = group.nbytes
+            keep = self._keep(group, len(group.palettes))
+            if keep is None:
+                palette.remove_palette(group)
+                report.append((group.name, before, 0))
+                continue
+
+            group.select(keep)
+            report.append((group.name, before, group.nbytes))
+            if group is palette_group:
+                maps.remap(palettes={old: new for new, old in enumerate(keep)})
+
+        for map in maps.maps:
+            report.append((map.name, map_bytes[map.name], map.nbytes))
+        for chunks in maps.chunks:
+            report.append((chunks.name, map_bytes[chunks.name], chunks.nbytes))
+
+        return report
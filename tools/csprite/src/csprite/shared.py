@@ -1,8 +1,13 @@
 # Standard library imports
+import array
 from io import TextIOWrapper
 import typing as t
 
 
+# Constants
+CTYPE_TYPECODES = {"uint8_t": "B", "uint16_t": "H", "uint32_t": "I"}
+
+
 def chunks(seq, size) -> t.Iterable:
     """
     Iterate through `seq` in `size` chunks
@@ -10,6 +15,13 @@ def chunks(seq, size) -> t.Iterable:
     return (seq[pos:pos + size] for pos in range(0, len(seq), size))
 
 
+def pack_values(values: t.Iterable[int], ctype: str) -> bytes:
+    """
+    Pack values into the in-memory layout of a c array of `ctype`
+    """
+    return array.array(CTYPE_TYPECODES[ctype], values).tobytes()
+
+
 def write_comment(f: TextIOWrapper, text: str) -> None:
     """
     Write comment in following form:
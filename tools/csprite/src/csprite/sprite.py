@@ -3,12 +3,53 @@ import os
 from pathlib import Path
 
 # Local imports
-from csprite.shared import chunks
+from csprite.shared import chunks, pack_values
 
 
 # Constants
 SPRITE_WIDTH = 8
 SPRITE_PIXELS = SPRITE_WIDTH**2
+SPRITE_EMPTY = 0x01
+SPRITE_OPAQUE = 0x02
+MAX_SPANS = 2**16
+
+
+def opaque_pixels(row: bytes) -> list[bool]:
+    """
+    Opacity of each pixel in a packed sprite row, colour index 0 being transparent
+    """
+    pixels = []
+    for byte in row:
+        pixels.append((byte & 0b01110000) != 0)
+        pixels.append((byte & 0b00000111) != 0)
+
+    return pixels
+
+
+def solid_colour(sprite: bytes) -> int | None:
+    """
+    Colour index of every pixel in a sprite, or None if pixels differ
+    """
+    colours = {(byte >> 4) & 0b00000111 for byte in sprite}
+    colours |= {byte & 0b00000111 for byte in sprite}
+
+    return colours.pop() if len(colours) == 1 else None
+
+
+def opaque_spans(pixels: list[bool]) -> list[tuple[int, int]]:
+    """
+    (start, length) of each run of opaque pixels
+    """
+    spans = []
+    start = None
+    for idx, opaque in enumerate(pixels + [False]):
+        if opaque and start is None:
+            start = idx
+        elif not opaque and start is not None:
+            spans.append((start, idx - start))
+            start = None
+
+    return spans
 
 
 class Spritesheet():
@@ -21,6 +62,7 @@ class Spritesheet():
         self._data = data
         self._version = [int(i) for i in self._data[:3]]
         self._sprites = []
+        self._spans = None
         self._parse_spritesheet()
 
     @property
@@ -31,10 +73,26 @@ class Spritesheet():
     def sprites(self) -> list[bytes]:
         return self._sprites
 
+    @property
+    def labels(self) -> list[str]:
+        return self._labels
+
     @property
     def name(self) -> str:
         return f"{self._name.upper()}_SPRITE"
 
+    @property
+    def spans(self) -> "SpriteSpans":
+        """Opaque span tables, rebuilt after sprites change"""
+        if self._spans is None:
+            self._spans = SpriteSpans(self)
+        return self._spans
+
+    @property
+    def nbytes(self) -> int:
+        """Size of generated sprite data"""
+        return len(self._sprites) * SPRITE_PIXELS // 2
+
     @property
     def definition(self) -> str:
         return (
@@ -82,6 +140,20 @@ class Spritesheet():
 
         return label, data
 
+    def select(self, indexes: list[int]) -> None:
+        """
+        Keep only sprites at `indexes`, in the order given
+        """
+        self._sprites = [self._sprites[i] for i in indexes]
+        self._labels = [self._labels[i] for i in indexes]
+        self._spans = None
+
+    def as_bytes(self) -> bytes:
+        """
+        Sprite data in c array layout
+        """
+        return b"".join(self._sprites)
+
     def generate_enum(self) -> str:
         """
         Generate enum from sprite names
@@ -100,7 +172,7 @@ class Spritesheet():
 
         return output
 
-    def generate_arrays(self) -> str:
+    def generate_array(self) -> str:
         """
         Format byte data into c arrays
         """
@@ -118,14 +190,218 @@ class Spritesheet():
         return output
 
 
+class SpriteFlags():
+    def __init__(self, spans: "SpriteSpans") -> None:
+        self._spans = spans
+
+    @property
+    def name(self) -> str:
+        return f"{self._spans.spritesheet.name}_FLAGS"
+
+    @property
+    def definition(self) -> str:
+        return f"uint8_t {self.name}[{len(self._spans.flags)}]"
+
+    @property
+    def pointer(self) -> str:
+        return f"uint8_t (*{self.name})[{len(self._spans.flags)}]"
+
+    @property
+    def cast(self) -> str:
+        return f"(uint8_t (*)[{len(self._spans.flags)}])"
+
+    def as_bytes(self) -> bytes:
+        """
+        Sprite flags in c array layout
+        """
+        return pack_values(self._spans.flags, "uint8_t")
+
+    def generate_array(self) -> str:
+        """
+        Format sprite flags into c array
+        """
+        output = f"uint8_t {self.name}[] = {{\n"
+        for row in chunks(self._spans.flags, 8):
+            output += "    " + ", ".join([f"0x{i:02X}" for i in row]) + ",\n"
+        output += "};\n"
+
+        return output
+
+
+class SpriteSpanRows():
+    def __init__(self, spans: "SpriteSpans") -> None:
+        self._spans = spans
+
+    @property
+    def name(self) -> str:
+        return f"{self._spans.spritesheet.name}_SPAN_ROWS"
+
+    @property
+    def definition(self) -> str:
+        return f"uint16_t {self.name}[{len(self._spans.rows)}][{SPRITE_WIDTH + 1}]"
+
+    @property
+    def pointer(self) -> str:
+        return f"uint16_t (*{self.name})[{len(self._spans.rows)}][{SPRITE_WIDTH + 1}]"
+
+    @property
+    def cast(self) -> str:
+        return f"(uint16_t (*)[{len(self._spans.rows)}][{SPRITE_WIDTH + 1}])"
+
+    def as_bytes(self) -> bytes:
+        """
+        Span offsets in c array layout
+        """
+        return pack_values(
+            [offset for offsets in self._spans.rows for offset in offsets],
+            "uint16_t"
+        )
+
+    def generate_array(self) -> str:
+        """
+        Format span offsets of each sprite row into c array
+        """
+        output = f"uint16_t {self.name}[][{SPRITE_WIDTH + 1}] = {{\n"
+        for offsets in self._spans.rows:
+            output += "    { " + ", ".join([f"{i}" for i in offsets]) + " },\n"
+        output += "};\n"
+
+        return output
+
+
+class SpriteSpans():
+    def __init__(self, spritesheet: Spritesheet) -> None:
+        self._spritesheet = spritesheet
+        self._analyse()
+        self._flags = SpriteFlags(self)
+        self._span_rows = SpriteSpanRows(self)
+
+    @property
+    def spritesheet(self) -> Spritesheet:
+        return self._spritesheet
+
+    @property
+    def spans(self) -> list[int]:
+        return self._spans
+
+    @property
+    def rows(self) -> list[list[int]]:
+        return self._rows
+
+    @property
+    def flags(self) -> list[int]:
+        return self._flags_data
+
+    @property
+    def tables(self) -> list["SpriteFlags | SpriteSpanRows | SpriteSpans"]:
+        return [self._flags, self, self._span_rows]
+
+    @property
+    def name(self) -> str:
+        return f"{self._spritesheet.name}_SPANS"
+
+    @property
+    def definition(self) -> str:
+        return f"uint8_t {self.name}[{max(len(self._spans), 1)}]"
+
+    @property
+    def pointer(self) -> str:
+        return f"uint8_t (*{self.name})[{max(len(self._spans), 1)}]"
+
+    @property
+    def cast(self) -> str:
+        return f"(uint8_t (*)[{max(len(self._spans), 1)}])"
+
+    @property
+    def pixel_tests(self) -> tuple[int, int]:
+        """
+        Transparency tests per draw of every sprite, without and with spans
+
+        With spans, each sprite costs one flag test and each span of a
+        partly transparent sprite one loop bound, in place of 64 tests.
+        """
+        after = len(self._flags_data)
+        for flags, offsets in zip(self._flags_data, self._rows):
+            if not flags:
+                after += offsets[-1] - offsets[0]
+
+        return len(self._flags_data) * SPRITE_PIXELS, after
+
+    def _analyse(self) -> None:
+        """
+        Find opaque spans and flags of every sprite.
+
+        Spans are packed as start << 4 | length, and the spans of row j of
+        sprite i run from `rows[i][j]` up to `rows[i][j + 1]`.
+        """
+        spans = []
+        rows = []
+        flags = []
+        for sprite in self._spritesheet.sprites:
+            offsets = [len(spans)]
+            n_opaque = 0
+            for row in chunks(sprite, SPRITE_WIDTH // 2):
+                pixels = opaque_pixels(row)
+                n_opaque += sum(pixels)
+                spans.extend([
+                    start << 4 | length for start, length in opaque_spans(pixels)
+                ])
+                offsets.append(len(spans))
+
+            if len(spans) >= MAX_SPANS:
+                raise ValueError(
+                    f"{self._spritesheet.name} has more than {MAX_SPANS} spans"
+                )
+            rows.append(offsets)
+            if n_opaque == 0:
+                flags.append(SPRITE_EMPTY)
+            elif n_opaque == SPRITE_PIXELS:
+                flags.append(SPRITE_OPAQUE)
+            else:
+                flags.append(0)
+
+        self._spans = spans
+        self._rows = rows
+        self._flags_data = flags
+
+    def as_bytes(self) -> bytes:
+        """
+        Packed spans in c array layout
+        """
+        return pack_values(self._spans or [0], "uint8_t")
+
+    def generate_array(self) -> str:
+        """
+        Format packed spans into c array
+        """
+        output = f"uint8_t {self.name}[] = {{\n"
+        for row in chunks(self._spans or [0], 8):
+            output += "    " + ", ".join([f"0x{i:02X}" for i in row]) + ",\n"
+        output += "};\n"
+
+        return output
+
+
 class SpriteGenerator():
-    def __init__(self) -> None:
+    def __init__(self, spans: bool = False) -> None:
         self._spritesheets = []
+        self._spans = spans
 
     @property
     def spritesheets(self) -> list[Spritesheet]:
         return self._spritesheets
 
+    @property
+    def span_tables(self) -> list[SpriteFlags | SpriteSpanRows | SpriteSpans]:
+        if not self._spans:
+            return []
+
+        tables = []
+        for spritesheet in self._spritesheets:
+            tables.extend(spritesheet.spans.tables)
+
+        return tables
+
     def parse_spritesheet(
         self,
         filename: str
@@ -143,6 +419,12 @@ class SpriteGenerator():
             Spritesheet(name, data)
         )
 
+    def remove_spritesheet(self, spritesheet: Spritesheet) -> None:
+        """
+        Remove spritesheet from generated output
+        """
+        self._spritesheets.remove(spritesheet)
+
     def generate_header(self, filename: str) -> None:
         """
         Generate header file from spritesheets
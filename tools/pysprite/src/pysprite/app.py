@@ -1,16 +1,28 @@
 # Standard library imports
 import math
+import typing as t
 
 # Third party imports
-from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMenu
-from PyQt6.QtGui import QAction, QScreen
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QFileDialog, QInputDialog, QMenu
+)
+from PyQt6.QtGui import QAction, QActionGroup, QCloseEvent, QKeySequence, QScreen
 
 # Local imports
+from pysprite.canvas.files import with_extension
+from pysprite.canvas.journal import (
+    DocumentJournal, MetaspriteJournal, PaletteJournal, SpritesheetJournal
+)
+from pysprite.canvas.tools import PENCIL, TOOLS
+from pysprite.widgets.autosave import QtAutosave
 from pysprite.widgets.layout import QtMainLayout
+from pysprite.widgets.worker import QtTaskProgress
 
 
 WIN_WIDTH = 640
 WIN_HEIGHT = 480
+MAX_METASPRITE_PARTS = 8
+MESSAGE_MS = 5000
 
 
 class MainWindow(QMainWindow):
@@ -28,11 +40,18 @@ class MainWindow(QMainWindow):
         )
 
         self.mainlayout = QtMainLayout()
+        self.progress = QtTaskProgress()
+        self.autosave = QtAutosave()
+        self.autosave.failed.connect(self._show_message)
+        self.mainlayout.part_rejected.connect(self._show_message)
+        self.mainlayout.history.changed.connect(self.autosave.sync)
 
         self._createActions()
         self._createMenuBar()
+        self._createStatusBar()
 
         self.setCentralWidget(self.mainlayout)
+        self._journal_untitled()
 
     def _createActions(self):
         """
@@ -41,24 +60,32 @@ class MainWindow(QMainWindow):
         # File...
         self.newAction = QAction("&New", self)
         self.newAction.triggered.connect(self._newFile)
+        self.newMetasprite = QAction("New &Metasprite...", self)
+        self.newMetasprite.triggered.connect(self._new_metasprite)
 
         # Open...
         self.openMenu = QMenu("&Open...", self)
         self.open_spritesheet = QAction("&Spritesheet", self)
         self.open_palette = QAction("&Palette", self)
+        self.open_metasprite = QAction("&Metasprite", self)
         self.openMenu.addAction(self.open_spritesheet)
         self.openMenu.addAction(self.open_palette)
+        self.openMenu.addAction(self.open_metasprite)
         self.open_spritesheet.triggered.connect(self._open_spritesheet)
         self.open_palette.triggered.connect(self._open_palette)
+        self.open_metasprite.triggered.connect(self._open_metasprite)
 
         # Save...
         self.saveMenu = QMenu("&Save...", self)
         self.save_spritesheet = QAction("&Spritesheet", self)
         self.save_palette = QAction("&Palette", self)
+        self.save_metasprite = QAction("&Metasprite", self)
         self.saveMenu.addAction(self.save_spritesheet)
         self.saveMenu.addAction(self.save_palette)
+        self.saveMenu.addAction(self.save_metasprite)
         self.save_spritesheet.triggered.connect(self._save_spritesheet)
         self.save_palette.triggered.connect(self._save_palette)
+        self.save_metasprite.triggered.connect(self._save_metasprite)
 
         # Toolbar...
         self.mainlayout.canvas_add_button.pressed.connect(
@@ -76,6 +103,25 @@ class MainWindow(QMainWindow):
         self.exitAction.triggered.connect(self.close)
 
         # Edit...
+        self.undoAction = QAction("&Undo", self)
+        self.undoAction.setShortcut(QKeySequence.StandardKey.Undo)
+        self.undoAction.triggered.connect(self.mainlayout.undo)
+        self.redoAction = QAction("&Redo", self)
+        self.redoAction.setShortcut(QKeySequence.StandardKey.Redo)
+        self.redoAction.triggered.connect(self.mainlayout.redo)
+
+        # Tool... (shift with fill replaces across the sheet, with rect fills)
+        self.toolMenu = QMenu("&Tool", self)
+        self.toolGroup = QActionGroup(self)
+        for tool in TOOLS:
+            action = QAction(f"&{tool.capitalize()}", self)
+            action.setCheckable(True)
+            action.setChecked(tool == PENCIL)
+            action.triggered.connect(
+                lambda _, x=tool: self.mainlayout.set_tool(x)
+            )
+            self.toolGroup.addAction(action)
+            self.toolMenu.addAction(action)
 
         # Help...
         self.helpAction = QAction("&Help...", self)
@@ -94,6 +140,7 @@ class MainWindow(QMainWindow):
             raise RuntimeError("Unable to add menu bar entry")
         fileMenu.addSeparator()
         fileMenu.addAction(self.newAction)
+        fileMenu.addAction(self.newMetasprite)
         fileMenu.addMenu(self.openMenu)
         fileMenu.addMenu(self.saveMenu)
         fileMenu.addAction(self.exitAction)
@@ -101,6 +148,9 @@ class MainWindow(QMainWindow):
         editMenu = menuBar.addMenu("&Edit")
         if editMenu is None:
             raise RuntimeError("Unable to add menu bar entry")
+        editMenu.addAction(self.undoAction)
+        editMenu.addAction(self.redoAction)
+        editMenu.addMenu(self.toolMenu)
 
         helpMenu = menuBar.addMenu("&Help")
         if helpMenu is None:
@@ -110,12 +160,115 @@ class MainWindow(QMainWindow):
 
         self.setMenuBar(menuBar)
 
+    def _createStatusBar(self):
+        """
+        Create status bar showing file progress
+        """
+        statusBar = self.statusBar()
+        if statusBar is None:
+            raise RuntimeError("Unable to create status bar")
+
+        statusBar.addPermanentWidget(self.progress)
+
+    def _show_message(self, message: str) -> None:
+        """
+        Show message in the status bar for a while
+        """
+        statusBar = self.statusBar()
+        if statusBar is not None:
+            statusBar.showMessage(message, MESSAGE_MS)
+
+    def _journal(self, key: str, journal: DocumentJournal) -> None:
+        """
+        Journal document `key`, recovering changes an earlier session left
+        unsaved
+        """
+        if self.autosave.track(key, journal):
+            self._show_message(f"Recovered unsaved {key} changes")
+
+    def _journal_untitled(self) -> None:
+        """
+        Journal the untitled documents the editor starts with
+        """
+        self._journal("spritesheet", SpritesheetJournal(
+            self.mainlayout.spritesheet.spritesheet,
+            self.autosave.untitled("untitled.4bpp")
+        ))
+        self._journal("palette", PaletteJournal(
+            self.mainlayout.pal.palette_group,
+            self.autosave.untitled("untitled.pal")
+        ))
+        self._journal("metasprite", MetaspriteJournal(
+            self.mainlayout.metasprite.metasprite,
+            self.autosave.untitled("untitled.meta")
+        ))
+
+    def closeEvent(self, a0: t.Optional[QCloseEvent]) -> None:
+        """
+        Journal the last changes before closing
+        """
+        self.autosave.close()
+        super().closeEvent(a0)
+
     def _newFile(self) -> None:
         """
         Create new `.4bpp` file
         """
         self.mainlayout.canvas.newFile()
 
+    def _new_metasprite(self) -> None:
+        """
+        Ask for a size and start an empty metasprite
+        """
+        w, ok = QInputDialog.getInt(
+            self, "New Metasprite", "Width (tiles):", 2, 1, MAX_METASPRITE_PARTS
+        )
+        if not ok:
+            return
+        h, ok = QInputDialog.getInt(
+            self, "New Metasprite", "Height (tiles):", 2, 1, MAX_METASPRITE_PARTS
+        )
+        if ok:
+            self.mainlayout.new_metasprite(w, h)
+
+    def _save_metasprite(self) -> None:
+        """
+        Save to `.meta` file
+        """
+        dialog = QFileDialog()
+        filename, _ = dialog.getSaveFileName(
+            self,
+            "Save File",
+            "",
+            "Meta Files(*.meta);;All Files(*)"
+        )
+
+        if filename:
+            journal = self.autosave.mark("metasprite")
+            self.mainlayout.metasprite.metasprite.save(filename)
+            self.autosave.saved(
+                "metasprite", journal, with_extension(filename, ".meta")
+            )
+
+    def _open_metasprite(self) -> None:
+        """
+        Open and load an existing `.meta` file.
+        """
+        dialog = QFileDialog()
+        filename, _ = dialog.getOpenFileName(
+            self,
+            "Open File",
+            "",
+            "Meta Files(*.meta);;All Files(*)"
+        )
+
+        if filename:
+            self.autosave.close("metasprite")
+            self.mainlayout.metasprite.metasprite.open(filename)
+            self._journal("metasprite", MetaspriteJournal(
+                self.mainlayout.metasprite.metasprite, filename
+            ))
+
     def _save_spritesheet(self) -> None:
         """
         Save to `.4bpp` file
@@ -129,7 +282,12 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.spritesheet.save(filename)
+            journal = self.autosave.mark("spritesheet")
+            task = self.mainlayout.spritesheet.save(filename)
+            task.signals.finished.connect(lambda _: self.autosave.saved(
+                "spritesheet", journal, with_extension(filename, ".4bpp")
+            ))
+            self.progress.start(task)
 
     def _save_palette(self) -> None:
         """
@@ -144,7 +302,12 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.pal.save_file(filename)
+            journal = self.autosave.mark("palette")
+            task = self.mainlayout.pal.save_file(filename)
+            task.signals.finished.connect(lambda _: self.autosave.saved(
+                "palette", journal, with_extension(filename, ".pal")
+            ))
+            self.progress.start(task)
 
     def _open_spritesheet(self) -> None:
         """
@@ -159,7 +322,13 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.spritesheet.open(filename)
+            self.autosave.close("spritesheet")
+            task = self.mainlayout.spritesheet.open(filename)
+            task.signals.finished.connect(lambda _: self._journal(
+                "spritesheet",
+                SpritesheetJournal(self.mainlayout.spritesheet.spritesheet, filename)
+            ))
+            self.progress.start(task)
 
     def _open_palette(self) -> None:
         """
@@ -174,7 +343,12 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.pal.open_file(filename)
+            self.autosave.close("palette")
+            task = self.mainlayout.pal.open_file(filename)
+            task.signals.finished.connect(lambda _: self._journal(
+                "palette", PaletteJournal(self.mainlayout.pal.palette_group, filename)
+            ))
+            self.progress.start(task)
 
 
 def run() -> None:
@@ -182,6 +356,7 @@ def run() -> None:
     Run the application
     """
     app = QApplication([])
+    app.setApplicationName("pysprite")
     screen = app.primaryScreen()
     if screen is None:
         raise RuntimeError("Could not read screen information")
@@ -0,0 +1,172 @@
+# Standard library imports
+import math
+import typing as t
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.canvas import TILE_PX, TileListener, map_canvases_to_colour
+from pysprite.canvas.observer import Signal
+from pysprite.canvas.spritesheet import Spritesheet
+from pysprite.canvas.transaction import Region
+
+
+# Constants
+TARGET_FPS = 60.0
+TIMESTEP = 0.1
+ONION_ALPHA = 0.3
+
+
+# Frames `first` to `last` of a spritesheet played like `ANIMATION_step`.
+# Frames are rendered through each palette's cached lookup table and kept
+# until the canvas or palette behind them changes, so playback only indexes.
+class Animation():
+    animationChanged = Signal()
+
+    def __init__(
+        self,
+        spritesheet: Spritesheet,
+        first: int = 0,
+        last: int = 0,
+        timestep: float = TIMESTEP
+    ) -> None:
+        self._spritesheet = spritesheet
+        self._first = 0
+        self._last = 0
+        self._timestep = timestep
+        self._listeners: list[tuple[t.Any, TileListener]] = []
+        self._spritesheet.spritesheet_changed.connect(self._spritesheet_changed)
+        self._spritesheet.spritesheet_loaded.connect(self._spritesheet_changed)
+        self.set_range(first, last)
+
+    @property
+    def spritesheet(self) -> Spritesheet:
+        return self._spritesheet
+
+    @property
+    def first(self) -> int:
+        return self._first
+
+    @property
+    def last(self) -> int:
+        return self._last
+
+    @property
+    def n_frames(self) -> int:
+        return self._last - self._first + 1
+
+    @property
+    def timestep(self) -> float:
+        """Seconds each frame is shown"""
+        return self._timestep
+
+    @property
+    def frame_ms(self) -> int:
+        """
+        Milliseconds each frame is shown in the engine, which only steps
+        animations once per engine frame
+        """
+        frames = math.ceil(self._timestep * TARGET_FPS - 1e-9)
+        return round(1000 * frames / TARGET_FPS)
+
+    def set_range(self, first: int, last: int) -> None:
+        """
+        Play canvases `first` to `last`, clamped to the spritesheet
+        """
+        n = len(self._spritesheet.canvases)
+        first, last = min(max(first, 0), n - 1), min(max(last, 0), n - 1)
+        if first > last:
+            raise ValueError(f"First frame {first} is after last frame {last}")
+
+        self._first, self._last = first, last
+        self._frames = np.zeros(
+            (self.n_frames, TILE_PX, TILE_PX, 3), dtype=np.uint8
+        )
+        self._onion = np.zeros_like(self._frames)
+        # Lookup table each frame was rendered with, None once it is stale
+        self._luts: list[np.ndarray | None] = [None] * self.n_frames
+        self._onion_valid = np.zeros(self.n_frames, dtype=bool)
+        self._connect()
+        self.animationChanged.emit(Region(0, 0, self.n_frames, 1))
+
+    def set_timestep(self, timestep: float) -> None:
+        """
+        Show each frame for `timestep` seconds
+        """
+        if timestep <= 0:
+            raise ValueError("Animation timestep must be positive")
+        self._timestep = timestep
+
+    def frame_at(self, elapsed: float) -> int:
+        """
+        Frame shown `elapsed` seconds after the animation started
+        """
+        return int(1000 * elapsed // self.frame_ms) % self.n_frames
+
+    def _connect(self) -> None:
+        """
+        Listen to changes of the canvases in the range
+        """
+        for signal, listener in self._listeners:
+            signal.disconnect(listener.changed)
+        self._listeners = []
+
+        canvases = self._spritesheet.canvases
+        for frame in range(self.n_frames):
+            listener = TileListener(frame, self._frame_changed)
+            canvases[self._first + frame].canvasChanged.connect(listener.changed)
+            self._listeners.append(
+                (canvases[self._first + frame].canvasChanged, listener)
+            )
+
+    def _frame_changed(self, frame: int, region: Region) -> None:
+        """
+        Invalidate `frame` and the onion skin laid over the next one
+        """
+        self._luts[frame] = None
+        self._onion_valid[[frame, (frame + 1) % self.n_frames]] = False
+        self.animationChanged.emit(Region(frame, 0, frame + 1, 1))
+
+    def _spritesheet_changed(self) -> None:
+        """
+        Rebind frames after canvases are reordered or reloaded
+        """
+        self.set_range(self._first, self._last)
+
+    def frames(self) -> np.ndarray:
+        """
+        (n_frames, 8, 8, 3) RGB frames, re-rendering only stale ones
+        """
+        canvases = self._spritesheet.canvases[self._first:self._last + 1]
+        stale = [
+            n for n, canvas in enumerate(canvases)
+            if self._luts[n] is not canvas.palette.lut
+        ]
+        if stale:
+            self._frames[stale] = map_canvases_to_colour([canvases[n] for n in stale])
+            for n in stale:
+                self._luts[n] = canvases[n].palette.lut
+                self._onion_valid[[n, (n + 1) % self.n_frames]] = False
+
+        return self._frames
+
+    def onion_frames(self) -> np.ndarray:
+        """
+        (n_frames, 8, 8, 3) RGB frames with the previous frame faintly shown
+        through transparent pixels
+        """
+        frames = self.frames()
+        stale = np.flatnonzero(~self._onion_valid)
+        if len(stale):
+            canvases = self._spritesheet.canvases
+            data = np.stack([canvases[self._first + n].data for n in stale])
+            previous = frames[(stale - 1) % self.n_frames]
+            self._onion[stale] = np.where(
+                (data == 0)[..., None],
+                (previous * ONION_ALPHA).astype(np.uint8),
+                frames[stale]
+            )
+            self._onion_valid[stale] = True
+
+        return self._onion
@@ -1,9 +1,16 @@
+# Standard library imports
+import functools
+import typing as t
+
 # Third party imports
 import numpy as np
-from PyQt6.QtCore import QObject, pyqtSignal
 
 # Local imports
+from pysprite.canvas.history import History
+from pysprite.canvas.observer import Signal
 from pysprite.canvas.palette import Palette
+from pysprite.canvas.tools import flood_mask, line_mask, rect_mask
+from pysprite.canvas.transaction import Region, Transaction
 
 
 # Constants
@@ -14,19 +21,121 @@ SPRITE_PIXELS = TILE_PX**2
 G_CANVAS_COUNT = 0
 
 
-class Canvas(QObject):
-    canvasChanged = pyqtSignal()
+class TileStore():
+    def __init__(self, capacity: int = 1) -> None:
+        # Index and collision data of every tile, canvases are views into rows
+        self.data = np.zeros((max(capacity, 1), TILE_PX, TILE_PX), dtype=np.uint8)
+        self.collision_data = np.zeros_like(self.data)
+        self.n = 0
+
+    def append(self) -> int:
+        """
+        Add an empty tile, growing the arrays geometrically. Returns its index
+        """
+        self._reserve(self.n + 1)
+        self.n += 1
+        return self.n - 1
+
+    def extend(self, data: np.ndarray, collision_data: np.ndarray) -> int:
+        """
+        Add (N, 8, 8) tiles, growing the arrays geometrically. Returns the
+        index of the first
+        """
+        n = len(data)
+        self._reserve(self.n + n)
+        self.data[self.n:self.n + n] = data
+        self.collision_data[self.n:self.n + n] = collision_data
+        self.n += n
+        return self.n - n
+
+    def _reserve(self, n: int) -> None:
+        """
+        Make room for `n` tiles
+        """
+        if n <= len(self.data):
+            return
+
+        capacity = max(2 * len(self.data), n)
+        data = np.zeros((capacity, TILE_PX, TILE_PX), dtype=np.uint8)
+        collision_data = np.zeros_like(data)
+        data[:self.n] = self.data[:self.n]
+        collision_data[:self.n] = self.collision_data[:self.n]
+        self.data = data
+        self.collision_data = collision_data
+
+    def reorder(self, order: list[int]) -> None:
+        """
+        Rearrange tiles so tile `order[i]` moves to index i
+        """
+        self.data[:self.n] = self.data[order]
+        self.collision_data[:self.n] = self.collision_data[order]
+
+
+# Forwards change signals of a canvas along with the tile it draws
+class TileListener():
+    def __init__(self, tile: int, callback: t.Callable[[int, Region], None]) -> None:
+        self._tile = tile
+        self._callback = callback
+
+    def changed(self, region: Region) -> None:
+        self._callback(self._tile, region)
+
 
-    def __init__(self, palette: Palette) -> None:
-        super().__init__()
+def map_canvases_to_colour(canvases: list["Canvas"]) -> np.ndarray:
+    """
+    Map data of many canvases to (n, h, w, 3) RGB images in one lookup
+    """
+    palettes: dict[int, int] = {}
+    luts = []
+    palette_idx = np.empty(len(canvases), dtype=np.intp)
+    for n, canvas in enumerate(canvases):
+        key = id(canvas.palette)
+        if key not in palettes:
+            palettes[key] = len(luts)
+            luts.append(canvas.palette.lut)
+        palette_idx[n] = palettes[key]
+
+    data = np.stack([canvas.data for canvas in canvases])
+    return np.stack(luts)[palette_idx[:, None, None], data]
+
+
+class Canvas():
+    canvasChanged = Signal()
+
+    def __init__(
+        self,
+        palette: Palette,
+        store: TileStore | None = None,
+        idx: int | None = None
+    ) -> None:
         global G_CANVAS_COUNT
         self._label = f"canvas_{G_CANVAS_COUNT}"
         G_CANVAS_COUNT += 1
 
-        self.data = np.full((TILE_PX, TILE_PX), 0, dtype=np.uint8)
-        self.collision_data = np.full((TILE_PX, TILE_PX), 0, dtype=np.uint8)
+        if store is None:
+            store = TileStore()
+        self.bind(store, store.append() if idx is None else idx)
         self._colour_idx = 0
         self._palette = palette
+        self._transaction = Transaction(self.canvasChanged)
+
+    @property
+    def data(self) -> np.ndarray:
+        """(8, 8) palette indexes, a view into the tile store"""
+        return self._store.data[self._idx]
+
+    @data.setter
+    def data(self, data: np.ndarray) -> None:
+        self._store.data[self._idx] = data
+
+    @property
+    def collision_data(self) -> np.ndarray:
+        """(8, 8) collision flags, a view into the tile store"""
+        return self._store.collision_data[self._idx]
+
+    @collision_data.setter
+    def collision_data(self, data: np.ndarray) -> None:
+        self._store.collision_data[self._idx] = data
 
     @property
     def w(self) -> int:
@@ -38,25 +147,95 @@ class Canvas(QObject):
         """Height of image"""
         return self.data.shape[0]
 
+    @property
+    def palette(self) -> Palette:
+        return self._palette
+
+    @property
+    def history(self) -> History | None:
+        """History recording edits, if any"""
+        return self._transaction.history
+
+    @history.setter
+    def history(self, history: History | None) -> None:
+        self._transaction.history = history
+
+    @property
+    def region(self) -> Region:
+        """Region covering the whole image"""
+        return Region(0, 0, self.w, self.h)
+
+    def transaction(self) -> Transaction:
+        """
+        Transaction batching changes into one `canvasChanged`
+        """
+        return self._transaction
+
     def get_label(self) -> str:
         """
         Canvas label
         """
         return self._label
 
+    def bind(self, store: TileStore, idx: int) -> None:
+        """
+        Point canvas at tile `idx` of `store`
+        """
+        self._store = store
+        self._idx = idx
+
+    def _array(self, field: str) -> np.ndarray:
+        return self.data if field == "data" else self.collision_data
+
+    def _write(self, field: str, idx: np.ndarray, values: t.Any) -> None:
+        """
+        Write `values` at flat indexes `idx` of data or collision data,
+        recording the edit in history
+        """
+        if len(idx) == 0:
+            return
+        array = self._array(field)
+        old = array.flat[idx]
+        array.flat[idx] = values
+        if self.history is not None:
+            self.history.record(
+                (self, field),
+                functools.partial(self._apply_delta, field),
+                idx,
+                old,
+                array.flat[idx]
+            )
+        self._report(idx)
+
+    def _apply_delta(self, field: str, idx: np.ndarray, values: np.ndarray) -> None:
+        """
+        Scatter values of an undone or redone edit
+        """
+        self._array(field).flat[idx] = values
+        self._report(idx)
+
+    def _report(self, idx: np.ndarray) -> None:
+        """
+        Report change to the cells at flat indexes `idx`
+        """
+        rows, cols = np.divmod(idx, self.w)
+        self._transaction.changed(Region(
+            int(cols.min()), int(rows.min()), int(cols.max()) + 1, int(rows.max()) + 1
+        ))
+
     def set_data(self, data: np.ndarray) -> None:
         """
         Set image data
         """
-        self.data = data
-        self.canvasChanged.emit()
+        self._write("data", np.arange(SPRITE_PIXELS), np.asarray(data).ravel())
 
     def set_collision_data(self, data: np.ndarray) -> None:
         """
         Set collision data
         """
-        self.collision_data = data
-        self.canvasChanged.emit()
+        self._write(
+            "collision_data", np.arange(SPRITE_PIXELS), np.asarray(data).ravel()
+        )
 
     def set_label(self, label: str) -> None:
         """
@@ -75,7 +254,7 @@ class Canvas(QObject):
         Return pixel data as RGB bytes
         """
         if desaturate:
-            return (self.map_to_colour() // 2).tobytes()
+            return (self._palette.lut // 2)[self.data].tobytes()
         else:
             return self.map_to_colour().tobytes()
 
@@ -90,13 +269,7 @@ class Canvas(QObject):
         Map data to RGB image using palette
         """
         p = self._palette if palette is None else palette
-        data_rgb = np.zeros((self.w, self.h, 3), dtype=np.uint8)
-        for j in range(self.h):
-            for i in range(self.w):
-                data_rgb[j, i] = p.map_idx_to_rgb(self.data[j, i]).rgb
-
-        self._changed = False
-        return data_rgb
+        return p.lut[self.data]
 
     def set_colour_idx(self, idx: int) -> None:
         """
@@ -114,9 +287,9 @@ class Canvas(QObject):
         """
         Create new canvas
         """
-        self.data = np.full((TILE_PX, TILE_PX), 0, dtype=np.uint8)
-        self.collision_data = np.full((TILE_PX, TILE_PX), 0, dtype=np.uint8)
-        self.canvasChanged.emit()
+        with self._transaction:
+            self._write("data", np.arange(SPRITE_PIXELS), 0)
+            self._write("collision_data", np.arange(SPRITE_PIXELS), 0)
 
     def draw_collision(
         self,
@@ -129,8 +302,8 @@ class Canvas(QObject):
         """
         if (x >= 1) or (y >= 1) or (x < 0) or (y < 0):
             return
-        self.collision_data[int(TILE_PX * y), int(TILE_PX * x)] = int(collision)
-        self.canvasChanged.emit()
+        i, j = int(TILE_PX * x), int(TILE_PX * y)
+        self._write("collision_data", np.array([TILE_PX * j + i]), int(collision))
 
     def draw_pixel(self, x: float, y: float) -> None:
         """
@@ -138,5 +311,55 @@ class Canvas(QObject):
         """
         if (x >= 1) or (y >= 1) or (x < 0) or (y < 0):
             return
-        self.data[int(TILE_PX * y), int(TILE_PX * x)] = self._colour_idx
-        self.canvasChanged.emit()
+        i, j = int(TILE_PX * x), int(TILE_PX * y)
+        self._write("data", np.array([TILE_PX * j + i]), self._colour_idx)
+
+    def draw_mask(
+        self,
+        mask: np.ndarray,
+        collision: bool | None = None,
+        colour_idx: int | None = None
+    ) -> None:
+        """
+        Paint `colour_idx`, or the brush colour, or set collision if given,
+        where `mask` is set
+        """
+        if collision is None:
+            colour = self._colour_idx if colour_idx is None else colour_idx
+            self._write("data", np.flatnonzero(mask), colour)
+        else:
+            self._write("collision_data", np.flatnonzero(mask), int(collision))
+
+    def flood_fill(self, i: int, j: int, collision: bool | None = None) -> None:
+        """
+        Fill the area of equal pixels, or collision flags, around pixel (i, j)
+        """
+        array = self.data if collision is None else self.collision_data
+        self.draw_mask(flood_mask(array, i, j), collision)
+
+    def draw_line(
+        self,
+        i0: int,
+        j0: int,
+        i1: int,
+        j1: int,
+        collision: bool | None = None
+    ) -> None:
+        """
+        Draw line from pixel (i0, j0) to (i1, j1)
+        """
+        self.draw_mask(line_mask(self.data.shape, i0, j0, i1, j1), collision)
+
+    def draw_rect(
+        self,
+        i0: int,
+        j0: int,
+        i1: int,
+        j1: int,
+        filled: bool = False,
+        collision: bool | None = None
+    ) -> None:
+        """
+        Draw rectangle with corner pixels (i0, j0) and (i1, j1)
+        """
+        self.draw_mask(rect_mask(self.data.shape, i0, j0, i1, j1, filled), collision)
@@ -0,0 +1,50 @@
+# Standard library imports
+import contextlib
+import os
+import tempfile
+import typing as t
+from pathlib import Path
+
+
+# Constants
+FILE_MODE = 0o644
+
+# Called with (done, total) as a file is read or written. May raise to stop.
+Progress = t.Callable[[int, int], None]
+
+
+def with_extension(filename: str, extension: str) -> str:
+    """
+    `filename`, with `extension` added unless it already ends with it
+    """
+    return filename if filename.endswith(extension) else f"{filename}{extension}"
+
+
+def report(progress: Progress | None, done: int, total: int) -> None:
+    """
+    Report progress, if anyone is listening
+    """
+    if progress is not None:
+        progress(done, total)
+
+
+@contextlib.contextmanager
+def atomic_write(filename: str | Path) -> t.Iterator[t.BinaryIO]:
+    """
+    Write to a temporary file next to `filename`, moving it into place only
+    once writing succeeds, so the target is never left half written
+    """
+    path = Path(filename)
+    mode = path.stat().st_mode & 0o777 if path.exists() else FILE_MODE
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            # Contents must reach the disk before the rename does
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,196 @@
+# Standard library imports
+import typing as t
+from collections import deque
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.observer import Signal
+
+
+# Constants
+HISTORY_BYTES = 16 * 1024**2
+
+Apply = t.Callable[[np.ndarray, np.ndarray], None]
+
+
+# Values of an array at flat indexes `idx` before and after an edit. `apply`
+# scatters either set of values back into the array.
+class Delta():
+    def __init__(
+        self,
+        apply: Apply,
+        idx: np.ndarray,
+        old: np.ndarray,
+        new: np.ndarray
+    ) -> None:
+        self.apply = apply
+        self.idx = idx
+        self.old = old
+        self.new = new
+
+    @property
+    def nbytes(self) -> int:
+        return self.idx.nbytes + self.old.nbytes + self.new.nbytes
+
+    @classmethod
+    def merge(cls, deltas: list["Delta"]) -> "Delta | None":
+        """
+        Combine deltas of the same array in the order they were made, keeping
+        the first old and last new value of each index. None if nothing
+        changed overall.
+        """
+        idx = np.concatenate([delta.idx for delta in deltas])
+        old = np.concatenate([delta.old for delta in deltas])
+        new = np.concatenate([delta.new for delta in deltas])
+
+        # np.unique sorts, so first and last occurrences line up by index
+        _, first = np.unique(idx, return_index=True)
+        _, last = np.unique(idx[::-1], return_index=True)
+        last = len(idx) - 1 - last
+
+        changed = (old[first] != new[last]).reshape(len(first), -1).any(axis=1)
+        if not changed.any():
+            return None
+        first, last = first[changed], last[changed]
+
+        return cls(deltas[0].apply, idx[first], old[first], new[last])
+
+    def undo(self) -> None:
+        self.apply(self.idx, self.old)
+
+    def redo(self) -> None:
+        self.apply(self.idx, self.new)
+
+
+# Undoable edits, one step per stroke or operation. Steps are kept oldest
+# first in a ring buffer that drops the oldest once `max_bytes` is exceeded.
+# `changed` is emitted after every step pushed, undone or redone.
+class History():
+    changed = Signal()
+
+    def __init__(self, max_bytes: int = HISTORY_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._undo: deque[list[Delta]] = deque()
+        self._redo: list[list[Delta]] = []
+        self._bytes = 0
+        self._depth = 0
+        self._step: dict[t.Hashable, list[Delta]] = {}
+        self._replaying = False
+
+    @property
+    def can_undo(self) -> bool:
+        return len(self._undo) > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return len(self._redo) > 0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by undo and redo steps"""
+        return self._bytes
+
+    def begin(self) -> None:
+        """
+        Start a step, merging everything recorded until the matching end
+        """
+        self._depth += 1
+
+    def end(self) -> None:
+        """
+        Close step, pushing it once the outermost one closes
+        """
+        if self._depth == 0:
+            raise AttributeError("No history step to end")
+        self._depth -= 1
+        if self._depth == 0:
+            self._push()
+
+    def record(
+        self,
+        key: t.Hashable | None,
+        apply: Apply,
+        idx: np.ndarray,
+        old: np.ndarray,
+        new: np.ndarray
+    ) -> None:
+        """
+        Record an edit of the array identified by `key`. Edits with a None
+        key are not scatters, e.g. reorders, and are never merged.
+        """
+        if self._replaying:
+            return
+
+        delta = Delta(apply, np.asarray(idx), np.asarray(old), np.asarray(new))
+        self._step.setdefault(object() if key is None else key, []).append(delta)
+        if self._depth == 0:
+            self._push()
+
+    def _push(self) -> None:
+        """
+        Merge the open step into one delta per array and push it
+        """
+        step = []
+        for deltas in self._step.values():
+            delta = Delta.merge(deltas) if len(deltas) > 1 else deltas[0]
+            if delta is not None:
+                step.append(delta)
+        self._step = {}
+        if len(step) == 0:
+            return
+
+        self._bytes -= sum([self._size(s) for s in self._redo])
+        self._redo = []
+        self._undo.append(step)
+        self._bytes += self._size(step)
+        while self._bytes > self.max_bytes and len(self._undo) > 1:
+            self._bytes -= self._size(self._undo.popleft())
+        self.changed.emit()
+
+    def _size(self, step: list[Delta]) -> int:
+        return sum([delta.nbytes for delta in step])
+
+    def undo(self) -> bool:
+        """
+        Revert the latest step. Returns False if there is none
+        """
+        if not self.can_undo:
+            return False
+
+        step = self._undo.pop()
+        self._replay([delta.undo for delta in reversed(step)])
+        self._redo.append(step)
+        self.changed.emit()
+        return True
+
+    def redo(self) -> bool:
+        """
+        Reapply the latest undone step. Returns False if there is none
+        """
+        if not self.can_redo:
+            return False
+
+        step = self._redo.pop()
+        self._replay([delta.redo for delta in step])
+        self._undo.append(step)
+        self.changed.emit()
+        return True
+
+    def _replay(self, actions: list[t.Callable[[], None]]) -> None:
+        self._replaying = True
+        try:
+            for action in actions:
+                action()
+        finally:
+            self._replaying = False
+
+    def clear(self) -> None:
+        """
+        Drop all steps
+        """
+        self._undo.clear()
+        self._redo = []
+        self._step = {}
+        self._bytes = 0
@@ -0,0 +1,400 @@
+# Standard library imports
+import abc
+import io
+import os
+import struct
+import zlib
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.files import FILE_MODE, atomic_write
+from pysprite.canvas.metasprite import Metasprite
+from pysprite.canvas.palette_group import PaletteGroup, dump_palettes, parse_palettes
+from pysprite.canvas.spritesheet import (
+    Spritesheet,
+    decode_tiles,
+    dump_spritesheet,
+    encode_tiles
+)
+
+
+# Constants
+VERSION = [0, 0, 1]
+EXTENSION = ".journal"
+RECORD_FORMAT = "<BII"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+COMPACT_BYTES = 256 * 1024
+
+# Record kinds
+SNAPSHOT = 0
+SIZE = 1
+TILES = 2
+
+# (kind, payload)
+Record = tuple[int, bytes]
+
+
+def journal_path(filename: str | Path) -> Path:
+    """
+    Journal kept beside document `filename`
+    """
+    path = Path(filename)
+    return path.with_name(path.name + EXTENSION)
+
+
+def pack_record(kind: int, payload: bytes) -> bytes:
+    """
+    Record header, with a checksum to spot records torn by a crash, and payload
+    """
+    return struct.pack(RECORD_FORMAT, kind, len(payload), zlib.crc32(payload)) + payload
+
+
+def read_journal(filename: str | Path) -> list[Record]:
+    """
+    Read every record of a `.journal` file, stopping at a torn record
+    """
+    data_raw = Path(filename).read_bytes()
+    if data_raw[:3] != bytes(VERSION):
+        raise AttributeError(".journal file has outdated version")
+
+    records = []
+    offset = 3
+    while offset + RECORD_SIZE <= len(data_raw):
+        kind, length, crc = struct.unpack_from(RECORD_FORMAT, data_raw, offset)
+        offset += RECORD_SIZE
+        payload = data_raw[offset:offset + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            break
+        records.append((kind, payload))
+        offset += length
+
+    return records
+
+
+# Append-only `.journal` file. Appends are written with one call to the end
+# of the file, so they cost the same however large the document is. The
+# file is only rewritten whole when compacted.
+class Journal():
+    def __init__(self, filename: str | Path) -> None:
+        self._path = Path(filename)
+        self._fd: int | None = None
+        self._pending: list[bytes] = []
+        self.appended = 0
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def append(self, kind: int, payload: bytes) -> None:
+        """
+        Queue a record until the next flush
+        """
+        self._pending.append(pack_record(kind, payload))
+
+    def flush(self) -> None:
+        """
+        Append queued records, creating the file if needed
+        """
+        if not self._pending:
+            return
+
+        if self._fd is None:
+            self._fd = os.open(
+                self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, FILE_MODE
+            )
+            if os.fstat(self._fd).st_size == 0:
+                os.write(self._fd, bytes(VERSION))
+        data = b"".join(self._pending)
+        self._pending = []
+        written = 0
+        while written < len(data):
+            written += os.write(self._fd, data[written:])
+        self.appended += len(data)
+
+    def rewrite(self, records: list[Record]) -> None:
+        """
+        Replace every record, e.g. with a snapshot of the document
+        """
+        self.close()
+        with atomic_write(self._path) as f:
+            f.write(bytes(VERSION))
+            for kind, payload in records:
+                f.write(pack_record(kind, payload))
+        self._pending = []
+        self.appended = 0
+
+    def discard(self) -> None:
+        """
+        Delete the file, once there is nothing left to recover
+        """
+        self.close()
+        self._pending = []
+        self._path.unlink(missing_ok=True)
+        self.appended = 0
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# Journal of the unsaved changes to one document, kept beside its file.
+# Subclasses track the document state last journaled, list the records of
+# changes since, the records of a snapshot and replay records.
+class DocumentJournal(abc.ABC):
+    def __init__(self, filename: str) -> None:
+        self._journal = Journal(journal_path(filename))
+        self._edits = 0
+        self._mark = 0
+        self._snapshot_bytes = 0
+        self._track()
+
+    @property
+    def path(self) -> Path:
+        """Path of the `.journal` file"""
+        return self._journal.path
+
+    @abc.abstractmethod
+    def _track(self) -> None:
+        """
+        Take the current document as the state last journaled
+        """
+
+    @abc.abstractmethod
+    def _changes(self) -> list[Record]:
+        """
+        Records of changes since the state last journaled, tracking the
+        current state
+        """
+
+    @abc.abstractmethod
+    def _snapshot(self) -> list[Record]:
+        """
+        Records recreating the document, none if it has nothing unsaved
+        """
+
+    @abc.abstractmethod
+    def _replay(self, records: list[Record]) -> None:
+        """
+        Apply records to the document
+        """
+
+    def sync(self) -> None:
+        """
+        Append changes since the last sync, compacting the journal once it
+        outgrows a snapshot
+        """
+        records = self._changes()
+        if not records:
+            return
+
+        for kind, payload in records:
+            self._journal.append(kind, payload)
+        self._journal.flush()
+        self._edits += 1
+        if self._journal.appended > max(COMPACT_BYTES, self._snapshot_bytes):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Replace the journal with a snapshot of the document
+        """
+        records = self._snapshot()
+        if records:
+            self._journal.rewrite(records)
+        else:
+            self._journal.discard()
+        self._snapshot_bytes = sum([RECORD_SIZE + len(i[1]) for i in records])
+
+    def recover(self) -> bool:
+        """
+        Replay the journal left by an earlier session, if any
+        """
+        if not self._journal.path.is_file():
+            return False
+
+        records = read_journal(self._journal.path)
+        if not records:
+            self._journal.discard()
+            return False
+
+        self._replay(records)
+        self._track()
+        # Drop anything torn, so later appends can be read back
+        self.compact()
+        return True
+
+    def mark(self) -> None:
+        """
+        Sync as the document starts saving
+        """
+        self.sync()
+        self._mark = self._edits
+
+    def saved(self, filename: str) -> None:
+        """
+        Move the journal beside `filename` once the document is saved there,
+        keeping only changes made since it started saving
+        """
+        self.sync()
+        path = journal_path(filename)
+        if path != self._journal.path:
+            self._journal.discard()
+            self._journal = Journal(path)
+
+        if self._edits == self._mark:
+            self._journal.discard()
+        else:
+            self.compact()
+
+    def close(self) -> None:
+        """
+        Sync and stop journaling, leaving the journal for a later session
+        """
+        self.sync()
+        self._journal.close()
+
+
+# Journals tiles of a spritesheet as they change, as `.4bpp` tiles prefixed
+# with their index. Snapshots are whole `.4bpp` files.
+class SpritesheetJournal(DocumentJournal):
+    def __init__(self, spritesheet: Spritesheet, filename: str) -> None:
+        self._spritesheet = spritesheet
+        super().__init__(filename)
+
+    def _state(self) -> tuple[list[str], np.ndarray, np.ndarray]:
+        return (
+            [canvas.get_label() for canvas in self._spritesheet.canvases],
+            self._spritesheet.data,
+            self._spritesheet.collision_data
+        )
+
+    def _track(self) -> None:
+        labels, data, collision_data = self._state()
+        self._labels = labels
+        self._data = data.copy()
+        self._collision_data = collision_data.copy()
+
+    def _changes(self) -> list[Record]:
+        labels, data, collision_data = self._state()
+        n = min(len(data), len(self._data))
+        changed = (
+            (data[:n] != self._data[:n]).any(axis=(1, 2))
+            | (collision_data[:n] != self._collision_data[:n]).any(axis=(1, 2))
+            | np.array([a != b for a, b in zip(labels, self._labels)], dtype=bool)
+        )
+        idx = np.concatenate([np.flatnonzero(changed), np.arange(n, len(data))])
+
+        records = []
+        if len(data) != len(self._data):
+            records.append((SIZE, struct.pack("<I", len(data))))
+        if len(idx):
+            records.append((
+                TILES,
+                struct.pack("<I", len(idx))
+                + idx.astype("<u4").tobytes()
+                + encode_tiles([labels[i] for i in idx], data[idx], collision_data[idx])
+            ))
+        if records:
+            self._track()
+
+        return records
+
+    def _snapshot(self) -> list[Record]:
+        f = io.BytesIO()
+        dump_spritesheet(f, *self._state())
+        return [(SNAPSHOT, f.getvalue())]
+
+    def _replay(self, records: list[Record]) -> None:
+        labels, data, collision_data = self._state()
+        data, collision_data = data.copy(), collision_data.copy()
+        for kind, payload in records:
+            if kind == SNAPSHOT:
+                pages = list(decode_tiles(payload, 3))
+                labels = [label for page in pages for label in page[1]]
+                data = np.concatenate([page[2] for page in pages])
+                collision_data = np.concatenate([page[3] for page in pages])
+            elif kind == SIZE:
+                n = struct.unpack("<I", payload)[0]
+                labels = (labels + [""] * n)[:n]
+                data = np.resize(data, (n, *data.shape[1:]))
+                collision_data = np.resize(collision_data, data.shape)
+            elif kind == TILES:
+                count = struct.unpack_from("<I", payload)[0]
+                idx = np.frombuffer(payload, dtype="<u4", count=count, offset=4)
+                for start, page_labels, page_data, page_collision in decode_tiles(
+                    payload, 4 + 4 * count
+                ):
+                    page_idx = idx[start:start + len(page_labels)]
+                    for i, label in zip(page_idx.tolist(), page_labels):
+                        labels[i] = label
+                    data[page_idx] = page_data
+                    collision_data[page_idx] = page_collision
+            else:
+                raise ValueError(f"Unknown spritesheet journal record {kind}")
+
+        self._spritesheet.load_page(0, labels, data, collision_data)
+
+
+# Journals small documents by appending a whole snapshot on every change
+class SnapshotJournal(DocumentJournal):
+    @abc.abstractmethod
+    def _encode(self) -> bytes:
+        """
+        Snapshot of the document
+        """
+
+    @abc.abstractmethod
+    def _decode(self, data_raw: bytes) -> None:
+        """
+        Load a snapshot into the document
+        """
+
+    def _track(self) -> None:
+        self._state = self._encode()
+
+    def _changes(self) -> list[Record]:
+        state = self._encode()
+        if state == self._state:
+            return []
+        self._state = state
+        return [(SNAPSHOT, state)]
+
+    def _snapshot(self) -> list[Record]:
+        return [(SNAPSHOT, self._encode())]
+
+    def _replay(self, records: list[Record]) -> None:
+        snapshots = [payload for kind, payload in records if kind == SNAPSHOT]
+        if snapshots:
+            self._decode(snapshots[-1])
+
+
+# Journals palettes as `.pal` files
+class PaletteJournal(SnapshotJournal):
+    def __init__(self, palette_group: PaletteGroup, filename: str) -> None:
+        self._palette_group = palette_group
+        super().__init__(filename)
+
+    def _encode(self) -> bytes:
+        f = io.BytesIO()
+        dump_palettes(f, self._palette_group.labelled_colours())
+        return f.getvalue()
+
+    def _decode(self, data_raw: bytes) -> None:
+        self._palette_group.load(parse_palettes(data_raw))
+
+
+# Journals a metasprite as `.meta` files
+class MetaspriteJournal(SnapshotJournal):
+    def __init__(self, metasprite: Metasprite, filename: str) -> None:
+        self._metasprite = metasprite
+        super().__init__(filename)
+
+    def _encode(self) -> bytes:
+        return self._metasprite.to_bytes()
+
+    def _decode(self, data_raw: bytes) -> None:
+        self._metasprite.load(data_raw)
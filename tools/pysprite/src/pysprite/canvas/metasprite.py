@@ -0,0 +1,400 @@
+# Standard library imports
+import typing as t
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.canvas import TILE_PX, TileListener
+from pysprite.canvas.files import atomic_write, with_extension
+from pysprite.canvas.history import History
+from pysprite.canvas.observer import Signal
+from pysprite.canvas.palette_group import PaletteGroup
+from pysprite.canvas.spritesheet import Spritesheet
+from pysprite.canvas.tools import flood_mask, line_mask, rect_mask
+from pysprite.canvas.transaction import Region, Transaction
+
+
+# Constants
+VERSION = [0, 0, 1]
+EMPTY = -1
+EMPTY_TILE = 0xff
+# Parts per side whose pixel offset still fits the uint8_t read by csprite
+MAX_SIZE = 0xff // TILE_PX
+FLIP_H = 0b01
+FLIP_V = 0b10
+
+# Fields of a part
+TILE = 0
+PALETTE = 1
+FLAGS = 2
+
+# Global variables
+G_METASPRITE_COUNT = 0
+
+
+def empty_parts(w: int, h: int) -> np.ndarray:
+    """
+    (h, w, 3) parts drawing no tile
+    """
+    if not (1 <= w <= MAX_SIZE and 1 <= h <= MAX_SIZE):
+        raise ValueError(f"Metasprites are 1 to {MAX_SIZE} parts wide and high")
+    parts = np.zeros((h, w, 3), dtype=np.int16)
+    parts[..., TILE] = EMPTY
+    return parts
+
+
+# Spritesheet tiles arranged in a w x h grid of parts, each drawn with its own
+# palette and flips. The composite image is cached per part and re-rendered
+# once the canvas or palette behind a part changes.
+class Metasprite():
+    metaspriteChanged = Signal()
+    metasprite_loaded = Signal()
+
+    def __init__(
+        self,
+        spritesheet: Spritesheet,
+        palette_group: PaletteGroup,
+        w: int = 2,
+        h: int = 2
+    ) -> None:
+        global G_METASPRITE_COUNT
+        self._label = f"metasprite_{G_METASPRITE_COUNT}"
+        G_METASPRITE_COUNT += 1
+
+        self._spritesheet = spritesheet
+        self._palette_group = palette_group
+        self._colour_idx = 0
+        self._listeners: list[tuple[t.Any, TileListener]] = []
+        self._transaction = Transaction(self.metaspriteChanged)
+        self._spritesheet.spritesheet_changed.connect(self._spritesheet_changed)
+        self._spritesheet.spritesheet_loaded.connect(self._spritesheet_changed)
+        self._spritesheet.canvases_added.connect(self._spritesheet_changed)
+        self._reset(empty_parts(w, h))
+
+    @property
+    def w(self) -> int:
+        """Width in parts"""
+        return self._parts.shape[1]
+
+    @property
+    def h(self) -> int:
+        """Height in parts"""
+        return self._parts.shape[0]
+
+    @property
+    def parts(self) -> np.ndarray:
+        """(h, w, 3) tile, palette and flip flags of every part"""
+        return self._parts
+
+    @property
+    def data(self) -> np.ndarray:
+        """(h * 8, w * 8) palette indexes of the composite image"""
+        self.composite()
+        return self._index
+
+    @property
+    def history(self) -> History | None:
+        """History recording edits, if any"""
+        return self._transaction.history
+
+    @history.setter
+    def history(self, history: History | None) -> None:
+        self._transaction.history = history
+
+    @property
+    def region(self) -> Region:
+        """Region covering the whole composite image"""
+        return Region(0, 0, TILE_PX * self.w, TILE_PX * self.h)
+
+    def transaction(self) -> Transaction:
+        """
+        Transaction batching changes into one `metaspriteChanged`
+        """
+        return self._transaction
+
+    def get_label(self) -> str:
+        """
+        Metasprite label
+        """
+        return self._label
+
+    def set_label(self, label: str) -> None:
+        """
+        Set metasprite label
+        """
+        self._label = label
+
+    def set_colour_idx(self, idx: int) -> None:
+        """
+        Set brush colour
+        """
+        self._colour_idx = idx
+
+    def get_colour_idx(self) -> int:
+        """
+        Get brush colour
+        """
+        return self._colour_idx
+
+    def _reset(self, parts: np.ndarray) -> None:
+        """
+        Replace every part, dropping the render cache
+        """
+        parts[..., TILE][parts[..., TILE] == EMPTY_TILE] = EMPTY
+        self._parts = parts
+        self._rgb = np.zeros((TILE_PX * self.h, TILE_PX * self.w, 3), dtype=np.uint8)
+        self._index = np.zeros((TILE_PX * self.h, TILE_PX * self.w), dtype=np.uint8)
+        # Lookup table each part was rendered with, None once it is stale
+        self._luts: list[np.ndarray | None] = [None] * (self.w * self.h)
+        self._connect()
+
+    def _connect(self) -> None:
+        """
+        Listen to changes of the canvases drawn by parts
+        """
+        for signal, listener in self._listeners:
+            signal.disconnect(listener.changed)
+        self._listeners = []
+
+        canvases = self._spritesheet.canvases
+        for tile in np.unique(self._parts[..., TILE]).tolist():
+            if 0 <= tile < len(canvases):
+                listener = TileListener(tile, self._tile_changed)
+                canvases[tile].canvasChanged.connect(listener.changed)
+                self._listeners.append((canvases[tile].canvasChanged, listener))
+
+    def _tile_changed(self, tile: int, region: Region) -> None:
+        """
+        Invalidate parts drawing `tile`, reporting where they changed
+        """
+        for j, i in zip(*np.nonzero(self._parts[..., TILE] == tile)):
+            self._luts[j * self.w + i] = None
+            self._transaction.changed(self._part_region(int(i), int(j), region))
+
+    def _spritesheet_changed(self) -> None:
+        """
+        Rebind parts after canvases are reordered or reloaded
+        """
+        self._luts = [None] * (self.w * self.h)
+        self._connect()
+        self._transaction.changed(self.region)
+
+    def _part_region(self, i: int, j: int, region: Region) -> Region:
+        """
+        Region of the composite covering `region` of the tile of part (i, j)
+        """
+        flags = int(self._parts[j, i, FLAGS])
+        x0, x1 = region.x0, region.x1
+        y0, y1 = region.y0, region.y1
+        if flags & FLIP_H:
+            x0, x1 = TILE_PX - x1, TILE_PX - x0
+        if flags & FLIP_V:
+            y0, y1 = TILE_PX - y1, TILE_PX - y0
+        return Region(
+            TILE_PX * i + x0, TILE_PX * j + y0, TILE_PX * i + x1, TILE_PX * j + y1
+        )
+
+    def _cell(self, i: int, j: int) -> tuple[slice, slice]:
+        """
+        Composite pixels of part (i, j)
+        """
+        return (
+            slice(TILE_PX * j, TILE_PX * (j + 1)),
+            slice(TILE_PX * i, TILE_PX * (i + 1))
+        )
+
+    def _lut(self, palette: int) -> np.ndarray:
+        palettes = self._palette_group.palettes
+        return palettes[palette if palette < len(palettes) else 0].lut
+
+    def composite(self) -> np.ndarray:
+        """
+        (h * 8, w * 8, 3) RGB image of every part, re-rendering only parts
+        whose canvas or palette changed since the last call
+        """
+        canvases = self._spritesheet.canvases
+        for j in range(self.h):
+            for i in range(self.w):
+                tile, palette, flags = self._parts[j, i].tolist()
+                lut = self._lut(palette)
+                n = j * self.w + i
+                if self._luts[n] is lut:
+                    continue
+
+                cell = self._cell(i, j)
+                if 0 <= tile < len(canvases):
+                    data = canvases[tile].data
+                    if flags & FLIP_H:
+                        data = data[:, ::-1]
+                    if flags & FLIP_V:
+                        data = data[::-1]
+                    self._index[cell] = data
+                    self._rgb[cell] = lut[data]
+                else:
+                    self._index[cell] = 0
+                    self._rgb[cell] = 0
+                self._luts[n] = lut
+
+        return self._rgb
+
+    def set_part(
+        self,
+        i: int,
+        j: int,
+        tile: int,
+        palette: int = 0,
+        flip_h: bool = False,
+        flip_v: bool = False
+    ) -> None:
+        """
+        Draw `tile` with `palette` and flips at part (i, j), EMPTY clears it
+        """
+        if tile != EMPTY and not 0 <= tile < len(self._spritesheet.canvases):
+            raise ValueError(f"Tile {tile} is not in the spritesheet")
+        if tile >= EMPTY_TILE:
+            raise ValueError(f"Tile {tile} does not fit in a .meta part")
+        if not 0 <= palette < len(self._palette_group.palettes):
+            raise ValueError(f"Palette {palette} is not in the palette group")
+        if palette > 0xff:
+            raise ValueError(f"Palette {palette} does not fit in a .meta part")
+
+        flags = (FLIP_H if flip_h else 0) | (FLIP_V if flip_v else 0)
+        idx = np.array([j * self.w + i])
+        old = self._parts.reshape(-1, 3)[idx]
+        new = np.array([[tile, palette, flags]], dtype=np.int16)
+        self._apply_parts(idx, new)
+        if self.history is not None:
+            self.history.record((self, "parts"), self._apply_parts, idx, old, new)
+
+    def _apply_parts(self, idx: np.ndarray, values: np.ndarray) -> None:
+        """
+        Set parts at flat indexes `idx`
+        """
+        self._parts.reshape(-1, 3)[idx] = values
+        self._connect()
+        for n in idx.tolist():
+            j, i = divmod(n, self.w)
+            self._luts[n] = None
+            self._transaction.changed(Region(
+                TILE_PX * i, TILE_PX * j, TILE_PX * (i + 1), TILE_PX * (j + 1)
+            ))
+
+    def new(self, w: int, h: int) -> None:
+        """
+        Start an empty metasprite of w x h parts
+        """
+        self._reset(empty_parts(w, h))
+        if self.history is not None:
+            self.history.clear()
+        self.metasprite_loaded.emit()
+
+    def draw_mask(self, mask: np.ndarray, colour_idx: int | None = None) -> None:
+        """
+        Paint `colour_idx`, or the brush colour, where the composite `mask` is
+        set, writing through to the canvas of each part
+        """
+        colour = self._colour_idx if colour_idx is None else colour_idx
+        canvases = self._spritesheet.canvases
+        with self._transaction:
+            for j in range(self.h):
+                for i in range(self.w):
+                    tile, _, flags = self._parts[j, i].tolist()
+                    if not 0 <= tile < len(canvases):
+                        continue
+                    cell = mask[self._cell(i, j)]
+                    if flags & FLIP_H:
+                        cell = cell[:, ::-1]
+                    if flags & FLIP_V:
+                        cell = cell[::-1]
+                    if cell.any():
+                        canvases[tile].draw_mask(cell, colour_idx=colour)
+
+    def draw_pixel(self, x: float, y: float) -> None:
+        """
+        Draw pixel at normalised (x, y) of the composite
+        """
+        if (x >= 1) or (y >= 1) or (x < 0) or (y < 0):
+            return
+        mask = np.zeros(self._index.shape, dtype=bool)
+        mask[int(mask.shape[0] * y), int(mask.shape[1] * x)] = True
+        self.draw_mask(mask)
+
+    def flood_fill(self, i: int, j: int) -> None:
+        """
+        Fill the area of equal pixels around composite pixel (i, j), across
+        part boundaries
+        """
+        self.draw_mask(flood_mask(self.data, i, j))
+
+    def draw_line(self, i0: int, j0: int, i1: int, j1: int) -> None:
+        """
+        Draw line from composite pixel (i0, j0) to (i1, j1)
+        """
+        self.draw_mask(line_mask(self._index.shape, i0, j0, i1, j1))
+
+    def draw_rect(
+        self,
+        i0: int,
+        j0: int,
+        i1: int,
+        j1: int,
+        filled: bool = False
+    ) -> None:
+        """
+        Draw rectangle with composite corner pixels (i0, j0) and (i1, j1)
+        """
+        self.draw_mask(rect_mask(self._index.shape, i0, j0, i1, j1, filled))
+
+    def open(self, filename: str) -> None:
+        """
+        Open metasprite from `.meta` file
+        """
+        self.load(Path(filename).read_bytes())
+
+    def load(self, data_raw: bytes) -> None:
+        """
+        Load metasprite from the contents of a `.meta` file
+        """
+        version = data_raw[:3]
+        if version != bytes(VERSION):
+            raise AttributeError(".meta file has outdated version")
+        offset = 3
+
+        label_length = data_raw[offset]
+        label = str(data_raw[offset + 1:offset + 1 + label_length], encoding="utf-8")
+        offset += label_length + 1
+        # Spritesheet the tiles index, read by csprite
+        offset += data_raw[offset] + 1
+
+        w, h = data_raw[offset], data_raw[offset + 1]
+        offset += 2
+        parts = np.frombuffer(data_raw[offset:offset + 3 * w * h], dtype=np.uint8)
+
+        self._label = label
+        self._reset(parts.reshape(h, w, 3).astype(np.int16))
+        if self.history is not None:
+            self.history.clear()
+        self.metasprite_loaded.emit()
+
+    def to_bytes(self) -> bytes:
+        """
+        Contents of a `.meta` file of the metasprite
+        """
+        parts = self._parts.copy()
+        parts[..., TILE][parts[..., TILE] == EMPTY] = EMPTY_TILE
+        output = bytes(VERSION)
+        for name in [self._label, self._spritesheet.name]:
+            label = bytes(name, encoding="utf-8")
+            output += bytes([len(label)]) + label
+        output += bytes([self.w, self.h])
+
+        return output + parts.astype(np.uint8).tobytes()
+
+    def save(self, filename: str) -> None:
+        """
+        Save metasprite to `.meta` file
+        """
+        with atomic_write(with_extension(filename, ".meta")) as f:
+            f.write(self.to_bytes())
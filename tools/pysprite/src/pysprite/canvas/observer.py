@@ -0,0 +1,58 @@
+# Standard library imports
+import typing as t
+import weakref
+
+
+class BoundSignal():
+    def __init__(self) -> None:
+        self._slots: list[t.Callable | weakref.WeakMethod] = []
+
+    def connect(self, slot: t.Callable) -> None:
+        """
+        Call `slot` on every emit. Methods are held weakly, so connecting
+        does not keep their object alive
+        """
+        try:
+            self._slots.append(weakref.WeakMethod(slot))
+        except TypeError:
+            self._slots.append(slot)
+
+    def disconnect(self, slot: t.Callable | None = None) -> None:
+        """
+        Stop calling `slot`, or every slot if None
+        """
+        if slot is None:
+            self._slots = []
+            return
+        self._slots = [i for i in self._slots if self._resolve(i) != slot]
+
+    def emit(self, *args: t.Any) -> None:
+        """
+        Call every connected slot with `args`
+        """
+        for ref in list(self._slots):
+            slot = self._resolve(ref)
+            if slot is not None:
+                slot(*args)
+        self._slots = [i for i in self._slots if self._resolve(i) is not None]
+
+    def _resolve(self, ref: t.Callable | weakref.WeakMethod) -> t.Callable | None:
+        return ref() if isinstance(ref, weakref.WeakMethod) else ref
+
+    def __getstate__(self) -> dict:
+        # Slots belong to the process that connected them
+        return {"_slots": []}
+
+
+# Declared on a model class like a Qt signal, each instance gets its own
+# BoundSignal on first access
+class Signal():
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __get__(self, instance: t.Any, owner: type) -> "Signal | BoundSignal":
+        if instance is None:
+            return self
+        signal = BoundSignal()
+        instance.__dict__[self._name] = signal
+        return signal
@@ -2,7 +2,11 @@
 import random
 
 # Third party imports
-from PyQt6.QtCore import QObject, pyqtSignal
+import numpy as np
+
+# Local imports
+from pysprite.canvas.history import History
+from pysprite.canvas.observer import Signal
 
 
 # Constants
@@ -40,16 +44,14 @@ class Colour():
         return [self._r, self._g, self._b]
 
 
-class Palette(QObject):
-    palette_changed = pyqtSignal()
+class Palette():
+    palette_changed = Signal()
 
     def __init__(
         self,
         colours: list[Colour] | None = None,
         label: str | None = None
     ) -> None:
-        super().__init__()
-
         if label is None:
             global G_PALETTE_COUNT
             self._label = f"palette_{G_PALETTE_COUNT}"
@@ -64,6 +66,8 @@ class Palette(QObject):
             for idx in range(N_PALETTE_COLOURS):
                 c = "#000000" if idx == 0 else PALETTE[random.randrange(255)]
                 self._colours.append(Colour.from_hex(c))
+        self._lut = None
+        self.history: History | None = None
 
     @property
     def length(self) -> int:
@@ -77,6 +81,17 @@ class Palette(QObject):
     def label(self) -> str:
         return self._label
 
+    @property
+    def lut(self) -> np.ndarray:
+        """(length, 3) RGB lookup table, rebuilt after colours change"""
+        if self._lut is None:
+            self._lut = np.array(
+                [colour.rgb for colour in self._colours],
+                dtype=np.uint8
+            ).reshape(-1, 3)
+            self._lut.flags.writeable = False
+        return self._lut
+
     def get_label(self) -> str:
         """
         Canvas label
@@ -107,7 +122,22 @@ class Palette(QObject):
             raise IndexError(
                 f"Colour index {idx} is outside the palette range 0-{self.length}"
             )
+        old = self.lut[[idx]]
         self._colours[idx] = colour
+        self._lut = None
+        if self.history is not None:
+            self.history.record(
+                (self, "colours"), self._apply_colours, [idx], old, self.lut[[idx]]
+            )
+
+    def _apply_colours(self, idx: np.ndarray, values: np.ndarray) -> None:
+        """
+        Set colours of an undone or redone edit
+        """
+        for i, rgb in zip(idx.tolist(), values.tolist()):
+            self._colours[i] = Colour(*rgb)
+        self._lut = None
+        self.palette_changed.emit()
 
 
 # Constants
@@ -1,10 +1,15 @@
 # Standard library imports
+import functools
+import typing as t
 from pathlib import Path
 
 # Third party imports
-from PyQt6.QtCore import QObject, pyqtSignal
+import numpy as np
 
 # Local imports
+from pysprite.canvas.files import Progress, atomic_write, report, with_extension
+from pysprite.canvas.history import History
+from pysprite.canvas.observer import Signal
 from pysprite.canvas.palette import Colour, Palette
 
 
@@ -13,13 +18,73 @@ VERSION = [0, 0, 1]
 PALETTE_LENGTH = 8
 
 
-class PaletteGroup(QObject):
-    changed = pyqtSignal()
-    loaded = pyqtSignal()
-
-    def __init__(self) -> None:
-        super().__init__()
-        self._palettes = [Palette()]
+def read_palettes(filename: str, progress: Progress | None = None) -> list[Palette]:
+    """
+    Read every palette of a `.pal` file
+    """
+    return parse_palettes(Path(filename).read_bytes(), progress)
+
+
+def parse_palettes(data_raw: bytes, progress: Progress | None = None) -> list[Palette]:
+    """
+    Parse every palette from the contents of a `.pal` file
+    """
+    if data_raw[:3] != bytes(VERSION):
+        raise AttributeError(".pal file has outdated version")
+
+    offset = 3
+    palettes = []
+    while offset < len(data_raw):
+        label_length = data_raw[offset]
+        label = data_raw[offset + 1:offset + 1 + label_length]
+        offset += label_length + 1
+        colours = [
+            Colour(*data_raw[idx:idx + 3])
+            for idx in range(offset, offset + PALETTE_LENGTH * 3, 3)
+        ]
+        offset += PALETTE_LENGTH * 3
+        palettes.append(Palette(colours, str(label, encoding="utf-8")))
+        report(progress, offset, len(data_raw))
+
+    return palettes
+
+
+def write_palettes(
+    path: str,
+    palettes: list[tuple[str, list[list[int]]]],
+    progress: Progress | None = None
+) -> None:
+    """
+    Write (label, colours) of every palette to a `.pal` file. The file is
+    replaced only once fully written
+    """
+    with atomic_write(path) as f:
+        dump_palettes(f, palettes, progress)
+
+
+def dump_palettes(
+    f: t.BinaryIO,
+    palettes: list[tuple[str, list[list[int]]]],
+    progress: Progress | None = None
+) -> None:
+    """
+    Write (label, colours) of every palette in `.pal` format to `f`
+    """
+    f.write(bytes(VERSION))
+    for n, (label, colours) in enumerate(palettes):
+        label = bytes(label, encoding="utf-8")
+        f.write(bytes([len(label)]) + label)
+        f.write(bytes([chan for rgb in colours for chan in rgb]))
+        report(progress, n + 1, len(palettes))
+
+
+class PaletteGroup():
+    changed = Signal()
+    loaded = Signal()
+
+    def __init__(self, palettes: list[Palette] | None = None) -> None:
+        self._palettes = [Palette()] if palettes is None else palettes
+        self._history: History | None = None
 
     @property
     def palettes(self) -> list[Palette]:
@@ -28,11 +93,37 @@ class PaletteGroup(QObject):
         """
         return self._palettes
 
+    @property
+    def history(self) -> History | None:
+        """History recording colour edits of every palette"""
+        return self._history
+
+    @history.setter
+    def history(self, history: History | None) -> None:
+        self._history = history
+        for palette in self._palettes:
+            palette.history = history
+
+    @property
+    def lut(self) -> np.ndarray:
+        """
+        (palettes, colours, 3) RGB lookup table of every palette
+        """
+        return np.stack([palette.lut for palette in self._palettes])
+
     def new_palette(self) -> None:
         """
         Create new canvas
         """
         self._palettes.append(Palette())
+        self._palettes[-1].history = self._history
+
+    def add_palette(self, palette: Palette) -> None:
+        """
+        Append an existing palette
+        """
+        self._palettes.append(palette)
+        palette.history = self._history
 
     def swap_palette(
         self,
@@ -45,55 +136,42 @@ class PaletteGroup(QObject):
         source = self._palettes.pop(source_idx)
         self._palettes.insert(target_idx, source)
 
-    def open(self, filename: str) -> None:
+    def load(self, palettes: list[Palette]) -> None:
         """
-        Open and load an existing `.pal` file
+        Replace every palette, as read by `read_palettes`
         """
-        path = Path(filename)
-        data_raw = path.read_bytes()
-        version = data_raw[:3]
-        if version != bytes(VERSION):
-            raise AttributeError(".pal file has outdated version")
-        self._offset = 3
-
-        palettes = []
-        while self._offset < len(data_raw):
-            palettes.append(self._extract_palette(data_raw))
         self._palettes = palettes
+        self.history = self._history
+        if self._history is not None:
+            self._history.clear()
         self.loaded.emit()
 
-    def _extract_palette(self, data_raw: bytes) -> Palette:
+    def open(self, filename: str) -> None:
         """
-        Extract palette from `.pal` file
+        Open and load an existing `.pal` file
         """
-        label_length = data_raw[self._offset]
-        label = data_raw[1 + self._offset:label_length + 1 + self._offset]
+        self.load(read_palettes(filename))
 
-        self._offset += label_length + 1
-        colours = []
-        for idx in range(0, PALETTE_LENGTH * 3, 3):
-            colours.append(
-                Colour(*data_raw[idx + self._offset:idx + self._offset + 3])
-            )
-        self._offset += PALETTE_LENGTH * 3
+    def writer(self, filename: str) -> t.Callable[[Progress | None], None]:
+        """
+        Snapshot the palettes, returning a function that saves them to a
+        `.pal` file. The function is safe to run on another thread
+        """
+        return functools.partial(
+            write_palettes, with_extension(filename, ".pal"), self.labelled_colours()
+        )
 
-        return Palette(colours, str(label, encoding="utf-8"))
+    def labelled_colours(self) -> list[tuple[str, list[list[int]]]]:
+        """
+        (label, colours) of every palette
+        """
+        return [
+            (palette.get_label(), [colour.rgb for colour in palette.colours])
+            for palette in self._palettes
+        ]
 
     def save(self, filename: str) -> None:
         """
         Save palette to `.pal` file
         """
-        if not filename.endswith(".pal"):
-            path = f"{filename}.pal"
-        else:
-            path = filename
-
-        with open(path, "wb") as f:
-            f.write(bytes(VERSION))
-            for palette in self.palettes:
-                label = bytes(palette.get_label(), encoding="utf-8")
-                f.write(bytes([len(label)]))
-                f.write(label)
-                for colour in palette.colours:
-                    for chan in colour.rgb:
-                        f.write(chan.to_bytes())
+        self.writer(filename)(None)
@@ -1,12 +1,16 @@
 # Standard library imports
+import functools
+import typing as t
 from pathlib import Path
 
 # Third party imports
 import numpy as np
-from PyQt6.QtCore import QObject, pyqtSignal
 
 # Local imports
-from pysprite.canvas.canvas import Canvas
+from pysprite.canvas.canvas import Canvas, TileStore
+from pysprite.canvas.files import Progress, atomic_write, report, with_extension
+from pysprite.canvas.history import History
+from pysprite.canvas.observer import Signal
 from pysprite.canvas.palette import Palette
 
 
@@ -14,6 +18,10 @@ from pysprite.canvas.palette import Palette
 VERSION = [0, 0, 1]
 TILE_PX = 8
 SPRITE_PIXELS = TILE_PX**2
+PAGE_TILES = 96
+
+# (index of first tile, labels, index array, collision array)
+Page = tuple[int, list[str], np.ndarray, np.ndarray]
 
 
 def pack_data(idx_a, collision_a, idx_b, collision_b):
@@ -26,13 +34,147 @@ def pack_data(idx_a, collision_a, idx_b, collision_b):
     return (a << 4) + b
 
 
-class Spritesheet(QObject):
-    spritesheet_changed = pyqtSignal()
-    spritesheet_loaded = pyqtSignal()
+def pack_tiles(data: np.ndarray, collision_data: np.ndarray) -> np.ndarray:
+    """
+    Pack (N, 8, 8) index and collision arrays into (N, 32) `.4bpp` bytes
+    """
+    packed = pack_data(
+        data[..., 0::2].astype(np.uint8),
+        collision_data[..., 0::2].astype(np.uint8),
+        data[..., 1::2].astype(np.uint8),
+        collision_data[..., 1::2].astype(np.uint8)
+    )
+    return packed.reshape(len(data), SPRITE_PIXELS // 2)
+
+
+def write_spritesheet(
+    path: str,
+    labels: list[str],
+    data: np.ndarray,
+    collision_data: np.ndarray,
+    progress: Progress | None = None
+) -> None:
+    """
+    Write (N, 8, 8) index and collision arrays to a `.4bpp` file a page at a
+    time. The file is replaced only once fully written
+    """
+    with atomic_write(path) as f:
+        dump_spritesheet(f, labels, data, collision_data, progress)
+
+
+def dump_spritesheet(
+    f: t.BinaryIO,
+    labels: list[str],
+    data: np.ndarray,
+    collision_data: np.ndarray,
+    progress: Progress | None = None
+) -> None:
+    """
+    Write (N, 8, 8) index and collision arrays in `.4bpp` format to `f`
+    """
+    f.write(bytes(VERSION))
+    for start in range(0, len(labels), PAGE_TILES):
+        end = start + PAGE_TILES
+        f.write(encode_tiles(
+            labels[start:end], data[start:end], collision_data[start:end]
+        ))
+        report(progress, min(end, len(labels)), len(labels))
+
+
+def encode_tiles(
+    labels: list[str],
+    data: np.ndarray,
+    collision_data: np.ndarray
+) -> bytes:
+    """
+    Label length, label and packed pixels of each tile, as stored in `.4bpp`
+    files
+    """
+    output = []
+    for label, tile in zip(labels, pack_tiles(data, collision_data)):
+        label = bytes(label, encoding="utf-8")
+        output.append(bytes([len(label)]) + label + tile.tobytes())
+
+    return b"".join(output)
+
+
+def unpack_tiles(packed: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Unpack (N, 32) `.4bpp` bytes into (N, 8, 8) index and collision arrays
+    """
+    nibbles = np.empty((len(packed), SPRITE_PIXELS // 2, 2), dtype=np.uint8)
+    nibbles[..., 0] = packed >> 4
+    nibbles[..., 1] = packed & 0b00001111
+    nibbles = nibbles.reshape(len(packed), TILE_PX, TILE_PX)
+
+    return nibbles & 0b00000111, (nibbles & 0b00001000) >> 3
+
+
+def read_spritesheet(
+    filename: str,
+    page: int = PAGE_TILES,
+    progress: Progress | None = None
+) -> t.Iterator[Page]:
+    """
+    Read a `.4bpp` file, yielding `page` tiles at a time so the first can be
+    shown before the rest are read
+    """
+    data_raw = Path(filename).read_bytes()
+    if data_raw[:3] != bytes(VERSION):
+        raise AttributeError(".4bpp file has outdated version")
+
+    yield from decode_tiles(data_raw, 3, page, progress)
+
+
+def decode_tiles(
+    data_raw: bytes,
+    offset: int = 0,
+    page: int = PAGE_TILES,
+    progress: Progress | None = None
+) -> t.Iterator[Page]:
+    """
+    Decode tiles stored like in `.4bpp` files from `offset` onwards,
+    `page` tiles at a time
+    """
+    start = 0
+    labels: list[str] = []
+    pixels: list[bytes] = []
+    while offset < len(data_raw) or start == 0:
+        if offset < len(data_raw):
+            label_length = data_raw[offset]
+            labels.append(str(
+                data_raw[offset + 1:offset + 1 + label_length], encoding="utf-8"
+            ))
+            offset += label_length + 1
+            pixels.append(data_raw[offset:offset + SPRITE_PIXELS // 2])
+            offset += SPRITE_PIXELS // 2
+        if len(labels) < page and offset < len(data_raw):
+            continue
+
+        packed = np.frombuffer(b"".join(pixels), dtype=np.uint8)
+        report(progress, min(offset, len(data_raw)), len(data_raw))
+        yield (
+            start,
+            labels,
+            *unpack_tiles(packed.reshape(len(labels), SPRITE_PIXELS // 2))
+        )
+        start += len(labels)
+        labels, pixels = [], []
+        if offset >= len(data_raw):
+            break
+
+
+class Spritesheet():
+    spritesheet_changed = Signal()
+    spritesheet_loaded = Signal()
+    canvases_added = Signal()
 
     def __init__(self) -> None:
-        super().__init__()
-        self._canvases = [Canvas(Palette())]
+        self._palette = Palette()
+        self._store = TileStore()
+        self._canvases = [Canvas(self._palette, self._store)]
+        self._history: History | None = None
+        self._name = "sprite"
 
     @property
     def canvases(self) -> list[Canvas]:
@@ -41,11 +183,42 @@ class Spritesheet(QObject):
         """
         return self._canvases
 
+    @property
+    def name(self) -> str:
+        """Name of the file last opened or saved, without extension"""
+        return self._name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self._name = name
+
+    @property
+    def history(self) -> History | None:
+        """History recording edits of the spritesheet and its canvases"""
+        return self._history
+
+    @history.setter
+    def history(self, history: History | None) -> None:
+        self._history = history
+        for canvas in self._canvases:
+            canvas.history = history
+
+    @property
+    def data(self) -> np.ndarray:
+        """(N, 8, 8) palette indexes of every canvas"""
+        return self._store.data[:self._store.n]
+
+    @property
+    def collision_data(self) -> np.ndarray:
+        """(N, 8, 8) collision flags of every canvas"""
+        return self._store.collision_data[:self._store.n]
+
     def new_canvas(self) -> None:
         """
         Create new canvas
         """
-        self._canvases.append(Canvas(Palette()))
+        self._canvases.append(Canvas(self._palette, self._store))
+        self._canvases[-1].history = self._history
 
     def swap_canvas(
         self,
@@ -55,78 +228,141 @@ class Spritesheet(QObject):
         """
         Swap canvases at specified indexes
         """
-        source = self._canvases.pop(source_idx)
-        self._canvases.insert(target_idx, source)
+        order = list(range(len(self._canvases)))
+        order.insert(target_idx, order.pop(source_idx))
+        self._reorder(order)
+        if self._history is not None:
+            self._history.record(
+                None,
+                self._apply_order,
+                np.arange(len(order)),
+                np.argsort(order),
+                np.array(order)
+            )
+        self.spritesheet_changed.emit()
 
-    def open(self, filename: str) -> None:
+    def _reorder(self, order: list[int]) -> None:
         """
-        Open spritesheet from `.4bpp` file
+        Rearrange canvases so canvas `order[i]` moves to index i
+        """
+        self._store.reorder(order)
+        self._canvases = [self._canvases[i] for i in order]
+        for idx, canvas in enumerate(self._canvases):
+            canvas.bind(self._store, idx)
+
+    def _apply_order(self, idx: np.ndarray, order: np.ndarray) -> None:
+        """
+        Reorder for an undone or redone swap, leaving canvases added since in
+        place
+        """
+        self._reorder(order.tolist() + list(range(len(order), len(self._canvases))))
+        self.spritesheet_changed.emit()
+
+    def map_to_colour(self, palette: Palette | None = None) -> np.ndarray:
+        """
+        Map every canvas to (N, 8, 8, 3) RGB images using one palette
+        """
+        p = self._palette if palette is None else palette
+        return p.lut[self.data]
+
+    def recolour(self, mapping: list[int] | np.ndarray) -> None:
+        """
+        Replace palette index i with `mapping[i]` in every canvas
         """
-        path = Path(filename)
-        data_raw = path.read_bytes()
-        version = data_raw[:3]
-        if version != bytes(VERSION):
-            raise AttributeError(".4bpp file has outdated version")
-        self._offset = 3
+        new = np.asarray(mapping, dtype=np.uint8)[self.data]
+        idx = np.flatnonzero(new != self.data)
+        old = self.data.flat[idx]
+        self._apply_data(idx, new.flat[idx])
+        if self._history is not None:
+            self._history.record(
+                (self, "data"), self._apply_data, idx, old, new.flat[idx]
+            )
 
-        canvases = []
-        while self._offset < len(data_raw):
-            canvases.append(self._extract_canvas(data_raw))
+    def replace_colour(self, old: int, new: int) -> None:
+        """
+        Replace palette index `old` with `new` in every canvas
+        """
+        mapping = np.arange(max(old, new, int(self.data.max(initial=0))) + 1)
+        mapping[old] = new
+        self.recolour(mapping)
 
-        self._canvases = canvases
-        self.spritesheet_loaded.emit()
+    def _apply_data(self, idx: np.ndarray, values: np.ndarray) -> None:
+        """
+        Scatter values at flat indexes `idx` of the data of every canvas
+        """
+        self.data.flat[idx] = values
+        for tile in np.unique(idx // SPRITE_PIXELS):
+            canvas = self._canvases[tile]
+            canvas.transaction().changed(canvas.region)
+        self.spritesheet_changed.emit()
 
-    def _extract_canvas(self, data_raw: bytes) -> Canvas:
+    def duplicates(self) -> np.ndarray:
+        """
+        Index of the first identical canvas for every canvas
+        """
+        packed = np.ascontiguousarray(pack_tiles(self.data, self.collision_data))
+        keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        return first[inverse.ravel()]
+
+    def load_page(
+        self,
+        start: int,
+        labels: list[str],
+        data: np.ndarray,
+        collision_data: np.ndarray
+    ) -> None:
         """
-        Extract canvas from `.4bpp` file
+        Install a page read by `read_spritesheet`. The first page replaces the
+        spritesheet, later ones are appended to it
         """
-        label_length = data_raw[self._offset]
-        label = data_raw[1 + self._offset:label_length + 1 + self._offset]
+        if start == 0:
+            self._store = TileStore(len(labels))
+            self._canvases = []
+        elif start != len(self._canvases):
+            raise ValueError(f"Page at {start} does not follow the last canvas")
 
-        self._offset += label_length + 1
-        data = np.full((TILE_PX, TILE_PX), 0, dtype=np.uint8)
-        collision_data = np.full((TILE_PX, TILE_PX), 0, dtype=np.uint8)
-        for j in range(TILE_PX):
-            for i in range(TILE_PX // 2):
-                x = data_raw[i + (TILE_PX // 2) * j + self._offset]
-                a = (x & 0b11110000) >> 4
-                b = x & 0b00001111
+        idx = self._store.extend(data, collision_data)
+        for n, label in enumerate(labels):
+            canvas = Canvas(self._palette, self._store, idx + n)
+            canvas.set_label(label)
+            canvas.history = self._history
+            self._canvases.append(canvas)
 
-                data[j, 2 * i] = a & 0b00000111
-                data[j, 2 * i + 1] = b & 0b00000111
+        if start == 0:
+            if self._history is not None:
+                self._history.clear()
+            self.spritesheet_loaded.emit()
+        else:
+            self.canvases_added.emit()
 
-                collision_data[j, 2 * i] = int((a & 0b00001000) == 0b00001000)
-                collision_data[j, 2 * i + 1] = int((b & 0b00001000) == 0b00001000)
+    def open(self, filename: str) -> None:
+        """
+        Open spritesheet from `.4bpp` file
+        """
+        for page in read_spritesheet(filename):
+            self.load_page(*page)
+        self._name = Path(filename).stem
 
-        self._offset += TILE_PX**2 // 2
+    def writer(self, filename: str) -> t.Callable[[Progress | None], None]:
+        """
+        Snapshot the spritesheet, returning a function that saves it to a
+        `.4bpp` file. The function is safe to run on another thread
+        """
+        path = with_extension(filename, ".4bpp")
+        self._name = Path(path).stem
 
-        canvas = Canvas(Palette())
-        canvas.set_data(data)
-        canvas.set_collision_data(collision_data)
-        canvas.set_label(str(label, encoding="utf-8"))
-        return canvas
+        return functools.partial(
+            write_spritesheet,
+            path,
+            [canvas.get_label() for canvas in self._canvases],
+            self.data.copy(),
+            self.collision_data.copy()
+        )
 
     def save(self, filename: str) -> None:
         """
         Save data to `.4bpp` file
         """
-        if not filename.endswith(".4bpp"):
-            path = f"{filename}.4bpp"
-        else:
-            path = filename
-
-        with open(path, "wb") as f:
-            f.write(bytes(VERSION))
-            for canvas in self._canvases:
-                label = bytes(canvas.get_label(), encoding="utf-8")
-                f.write(bytes([len(label)]))
-                f.write(label)
-                for j in range(canvas.h):
-                    for i in range(0, canvas.w, 2):
-                        d = pack_data(
-                            canvas.data[j, i],
-                            canvas.collision_data[j, i],
-                            canvas.data[j, i + 1],
-                            canvas.collision_data[j, i + 1]
-                        )
-                        f.write(d.tobytes())
+        self.writer(filename)(None)
@@ -0,0 +1,69 @@
+# Third party imports
+import numpy as np
+
+
+# Constants
+PENCIL = "pencil"
+FILL = "fill"
+LINE = "line"
+RECT = "rect"
+TOOLS = [PENCIL, FILL, LINE, RECT]
+
+
+def flood_mask(array: np.ndarray, i: int, j: int) -> np.ndarray:
+    """
+    Cells of `array` connected to (i, j) through 4-neighbours of equal value.
+
+    Grows the seed by whole-array shifts, so the loop runs once per cell of
+    the longest path through the region rather than once per cell.
+    """
+    same = array == array[j, i]
+    mask = np.zeros_like(same)
+    mask[j, i] = True
+    while True:
+        grown = mask.copy()
+        grown[1:] |= mask[:-1]
+        grown[:-1] |= mask[1:]
+        grown[:, 1:] |= mask[:, :-1]
+        grown[:, :-1] |= mask[:, 1:]
+        grown &= same
+        if (grown == mask).all():
+            return mask
+        mask = grown
+
+
+def line_mask(shape: tuple[int, int], i0: int, j0: int, i1: int, j1: int) -> np.ndarray:
+    """
+    Cells on the line from (i0, j0) to (i1, j1), one per step along its
+    longer axis
+    """
+    n = max(abs(i1 - i0), abs(j1 - j0)) + 1
+    mask = np.zeros(shape, dtype=bool)
+    i = np.rint(np.linspace(i0, i1, n)).astype(np.intp)
+    j = np.rint(np.linspace(j0, j1, n)).astype(np.intp)
+    inside = (i >= 0) & (i < shape[1]) & (j >= 0) & (j < shape[0])
+    mask[j[inside], i[inside]] = True
+
+    return mask
+
+
+def rect_mask(
+    shape: tuple[int, int],
+    i0: int,
+    j0: int,
+    i1: int,
+    j1: int,
+    filled: bool = False
+) -> np.ndarray:
+    """
+    Cells of the rectangle with corners (i0, j0) and (i1, j1), or only its
+    outline if not `filled`
+    """
+    x0, x1 = sorted([i0, i1])
+    y0, y1 = sorted([j0, j1])
+    jj, ii = np.indices(shape)
+    mask = (ii >= x0) & (ii <= x1) & (jj >= y0) & (jj <= y1)
+    if not filled:
+        mask &= (ii == x0) | (ii == x1) | (jj == y0) | (jj == y1)
+
+    return mask
@@ -0,0 +1,120 @@
+# Standard library imports
+import typing as t
+
+# Local imports
+from pysprite.canvas.history import History
+from pysprite.canvas.observer import BoundSignal
+
+
+# Cells from (x0, y0) up to but excluding (x1, y1), x is the column
+class Region():
+    def __init__(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+
+    @classmethod
+    def cell(cls, x: int, y: int) -> "Region":
+        """
+        Region covering the single cell (x, y)
+        """
+        return cls(x, y, x + 1, y + 1)
+
+    @property
+    def w(self) -> int:
+        return self.x1 - self.x0
+
+    @property
+    def h(self) -> int:
+        return self.y1 - self.y0
+
+    def union(self, other: "Region | None") -> "Region":
+        """
+        Smallest region containing this region and `other`
+        """
+        if other is None:
+            return self
+        return Region(
+            min(self.x0, other.x0),
+            min(self.y0, other.y0),
+            max(self.x1, other.x1),
+            max(self.y1, other.y1)
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Region):
+            return NotImplemented
+        return (self.x0, self.y0, self.x1, self.y1) == \
+            (other.x0, other.y0, other.x1, other.y1)
+
+    def __repr__(self) -> str:
+        return f"Region({self.x0}, {self.y0}, {self.x1}, {self.y1})"
+
+
+# Batches changes of a model so its change signal is emitted once with the
+# region they cover. Nests, and is usable as a context manager or held open
+# across events with begin and end, e.g. for a mouse stroke. With a history
+# attached, the transaction is also one undo step.
+class Transaction():
+    def __init__(self, signal: BoundSignal) -> None:
+        self._signal = signal
+        self._depth = 0
+        self._pending: Region | None = None
+        self.history: History | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._depth > 0
+
+    @property
+    def pending(self) -> Region | None:
+        return self._pending
+
+    def begin(self) -> None:
+        """
+        Start holding back change signals
+        """
+        self._depth += 1
+        if self.history is not None:
+            self.history.begin()
+
+    def end(self) -> None:
+        """
+        Close transaction, emitting changes once the outermost one closes
+        """
+        if self._depth == 0:
+            raise AttributeError("No transaction to end")
+        self._depth -= 1
+        if self.history is not None:
+            self.history.end()
+        if self._depth == 0:
+            self.flush()
+
+    def changed(self, region: Region) -> None:
+        """
+        Record change to `region`, emitting straight away outside a transaction
+        """
+        if self._depth == 0:
+            self._signal.emit(region)
+        else:
+            self._pending = region.union(self._pending)
+
+    def flush(self) -> None:
+        """
+        Emit changes held back so far without closing the transaction
+        """
+        region, self._pending = self._pending, None
+        if region is not None:
+            self._signal.emit(region)
+
+    def __getstate__(self) -> dict:
+        # Undo history belongs to the editing session
+        return {**self.__dict__, "history": None}
+
+    def __enter__(self) -> "Transaction":
+        self.begin()
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.end()
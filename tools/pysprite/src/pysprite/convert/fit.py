@@ -0,0 +1,285 @@
+# Standard library imports
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.palette import (
+    N_PALETTE_COLOURS,
+    PALETTE,
+    Colour,
+    Palette,
+    hex_to_rgb
+)
+from pysprite.canvas.palette_group import PaletteGroup
+from pysprite.convert.png import (
+    ALPHA_THRESHOLD,
+    TRANSPARENT_IDX,
+    nearest_colours,
+    read_rgba,
+    slice_tiles
+)
+
+
+# Constants
+PALETTE_RGB = np.array([hex_to_rgb(c) for c in PALETTE], dtype=np.int64)
+N_TABLE_COLOURS = len(PALETTE)
+N_FIT_COLOURS = N_PALETTE_COLOURS - 1
+MAX_ITERATIONS = 32
+# Squared RGB distance between every pair of `PALETTE` entries
+DISTANCE = ((PALETTE_RGB[:, None, :] - PALETTE_RGB[None, :, :])**2).sum(axis=-1)
+DISTANCE = DISTANCE.astype(np.float64)
+
+
+def tile_histograms(filename: str) -> np.ndarray:
+    """
+    (n, 256) count of each `PALETTE` colour in every 8x8 tile of an image
+
+    Transparent pixels are not counted.
+    """
+    rgba = read_rgba(filename)
+    colours = slice_tiles(nearest_colours(rgba[..., :3], PALETTE_RGB))
+    opaque = slice_tiles(rgba[..., 3] >= ALPHA_THRESHOLD)
+
+    n = len(colours)
+    bins = np.arange(n)[:, None, None] * N_TABLE_COLOURS + colours
+    return np.bincount(
+        bins.ravel(),
+        weights=opaque.ravel(),
+        minlength=n * N_TABLE_COLOURS
+    ).astype(np.int64).reshape(n, N_TABLE_COLOURS)
+
+
+def fit_colours(weights: np.ndarray) -> np.ndarray:
+    """
+    Choose the 7 `PALETTE` entries minimising weighted squared error.
+
+    This is a weighted k-medoids over `PALETTE`: colours are added greedily
+    by largest error reduction, then swapped one at a time while that helps.
+    """
+    used = np.flatnonzero(weights)
+    if len(used) == 0:
+        return np.full(N_FIT_COLOURS, TRANSPARENT_IDX)
+
+    w = weights[used].astype(np.float64)[:, None]
+    distance = DISTANCE[used]
+
+    chosen = []
+    nearest = np.full((len(used), 1), np.inf)
+    for _ in range(N_FIT_COLOURS):
+        cost = (w * np.minimum(nearest, distance)).sum(axis=0)
+        best = int(cost.argmin())
+        chosen.append(best)
+        nearest = np.minimum(nearest, distance[:, best:best + 1])
+    error = float((w * nearest).sum())
+
+    improved = True
+    while improved:
+        improved = False
+        for slot in range(N_FIT_COLOURS):
+            others = chosen[:slot] + chosen[slot + 1:]
+            base = distance[:, others].min(axis=1, keepdims=True)
+            cost = (w * np.minimum(base, distance)).sum(axis=0)
+            best = int(cost.argmin())
+            if cost[best] < error:
+                chosen[slot] = best
+                error = float(cost[best])
+                improved = True
+
+    colours = sorted(set(chosen))
+    return np.array(colours + [TRANSPARENT_IDX] * (N_FIT_COLOURS - len(colours)))
+
+
+def tile_errors(histograms: np.ndarray, palettes: np.ndarray) -> np.ndarray:
+    """
+    (n, k) squared error of drawing every tile with every palette
+    """
+    # Error of each `PALETTE` entry under each palette, (256, k)
+    colour_error = DISTANCE[:, palettes].min(axis=2)
+    return histograms @ colour_error
+
+
+def unique_histograms(
+    histograms: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Distinct histograms, how often each occurs and which one every tile has
+
+    Levels repeat the same few tiles many times, so fitting only distinct
+    histograms weighted by their count is much cheaper than fitting tiles.
+    """
+    rng = np.random.default_rng(0)
+    keys = histograms @ rng.random(N_TABLE_COLOURS)
+    _, first, inverse, counts = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True
+    )
+    if not np.array_equal(histograms[first][inverse], histograms):
+        # Two different histograms collided, fall back to exact rows
+        _, first, inverse, counts = np.unique(
+            histograms, axis=0, return_index=True, return_inverse=True,
+            return_counts=True
+        )
+
+    return histograms[first], counts.astype(np.float64), inverse.ravel()
+
+
+def _fit_once(
+    histograms: np.ndarray,
+    counts: np.ndarray,
+    k: int,
+    seed: int
+) -> tuple[float, np.ndarray, np.ndarray]:
+    """
+    One k-means style fit of `k` palettes from a k-means++ seeding
+    """
+    rng = np.random.default_rng(seed)
+    pixels = counts * histograms.sum(axis=1)
+
+    first = rng.choice(len(histograms), p=pixels / pixels.sum())
+    palettes = [fit_colours(histograms[first])]
+    for _ in range(1, k):
+        error = counts * tile_errors(histograms, np.array(palettes)).min(axis=1)
+        if error.sum() == 0:
+            palettes.append(palettes[-1])
+            continue
+        seed_tile = rng.choice(len(histograms), p=error / error.sum())
+        palettes.append(fit_colours(histograms[seed_tile]))
+    palettes = np.array(palettes)
+
+    assigned = None
+    for _ in range(MAX_ITERATIONS):
+        errors = tile_errors(histograms, palettes)
+        update = errors.argmin(axis=1)
+        if assigned is not None and np.array_equal(update, assigned):
+            break
+        assigned = update
+
+        for idx in range(k):
+            members = assigned == idx
+            if members.any():
+                palettes[idx] = fit_colours(counts[members] @ histograms[members])
+            else:
+                # Restart an empty palette on the worst fitting tile
+                worst = int((counts * errors.min(axis=1)).argmax())
+                palettes[idx] = fit_colours(histograms[worst])
+
+    errors = tile_errors(histograms, palettes)
+    return float(counts @ errors.min(axis=1)), palettes, errors.argmin(axis=1)
+
+
+def fit_palettes(
+    histograms: np.ndarray,
+    k: int,
+    restarts: int = 1,
+    jobs: int | None = 1,
+    seed: int = 0
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Fit `k` palettes of 7 `PALETTE` entries to tile colour histograms.
+
+    Each restart runs from a different seeding, in separate processes when
+    `jobs` is not 1, and the lowest total error wins. Returns the (k, 7)
+    `PALETTE` indexes, the palette of every tile and the mean squared
+    error per pixel.
+    """
+    # Float histograms so error sums go through BLAS matrix products
+    unique, counts, inverse = unique_histograms(histograms.astype(np.float64))
+    opaque = unique.any(axis=1)
+    if not opaque.any():
+        palettes = np.full((k, N_FIT_COLOURS), TRANSPARENT_IDX)
+        return palettes, np.zeros(len(histograms), dtype=np.intp), 0.0
+
+    seeds = [seed + idx for idx in range(restarts)]
+    args = (unique[opaque], counts[opaque], k)
+    if jobs == 1 or restarts == 1:
+        fits = [_fit_once(*args, s) for s in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            fits = list(executor.map(
+                _fit_once,
+                *[[arg] * restarts for arg in args],
+                seeds
+            ))
+
+    error, palettes, assigned = min(fits, key=lambda fit: fit[0])
+
+    # Empty tiles are left on the first palette
+    unique_assigned = np.zeros(len(unique), dtype=np.intp)
+    unique_assigned[opaque] = assigned
+    return palettes, unique_assigned[inverse], error / (counts @ unique.sum(axis=1))
+
+
+def as_palette(colours: np.ndarray, label: str) -> Palette:
+    """
+    Palette with a transparent first entry followed by `PALETTE` entries
+    """
+    return Palette(
+        [Colour.from_hex(PALETTE[c]) for c in [TRANSPARENT_IDX, *colours]],
+        label
+    )
+
+
+def run() -> None:
+    """
+    Fit a group of 8 colour palettes to the tiles of a set of images
+    """
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument("images", nargs="+", help="images to fit palettes to")
+    parser.add_argument(
+        "-o", "--output",
+        required=True,
+        help="`.pal` file to write"
+    )
+    parser.add_argument(
+        "-k", "--palettes",
+        type=int,
+        default=1,
+        help="number of palettes (default 1)"
+    )
+    parser.add_argument(
+        "--restarts",
+        type=int,
+        default=4,
+        help="independent fits to pick the best from (default 4)"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="worker processes, defaults to one per cpu"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    if args.jobs == 1:
+        histograms = [tile_histograms(image) for image in args.images]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            histograms = list(executor.map(tile_histograms, args.images))
+
+    palettes, assigned, error = fit_palettes(
+        np.concatenate(histograms),
+        args.palettes,
+        args.restarts,
+        args.jobs,
+        args.seed
+    )
+
+    stem = Path(args.output).stem
+    group = PaletteGroup([
+        as_palette(colours, f"{stem}_{idx}")
+        for idx, colours in enumerate(palettes)
+    ])
+    group.save(args.output)
+
+    counts = np.bincount(assigned, minlength=args.palettes)
+    for idx, colours in enumerate(palettes):
+        print(f"{stem}_{idx}: {counts[idx]} tiles, {[PALETTE[c] for c in colours]}")
+    print(f"Mean squared error per pixel: {error:.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,260 @@
+# Standard library imports
+import argparse
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.palette import PALETTE, Colour, Palette, hex_to_rgb
+from pysprite.canvas.palette_group import PaletteGroup
+from pysprite.canvas.spritesheet import TILE_PX, write_spritesheet
+
+
+# Constants
+N_PALETTE_COLOURS = 8
+TRANSPARENT_IDX = 0
+ALPHA_THRESHOLD = 128
+MASK_THRESHOLD = 128
+MATCH_BLOCK = 4096
+MASK_SUFFIX = "_mask"
+
+
+def read_rgba(filename: str) -> np.ndarray:
+    """
+    Read image as an (h, w, 4) RGBA array
+    """
+    # Only image decoding needs Qt, so batch tools import without it
+    from PyQt6.QtGui import QImage
+
+    image = QImage(filename)
+    if image.isNull():
+        raise FileNotFoundError(f"Could not read image '{filename}'")
+
+    image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(
+        image.height(), image.bytesPerLine()
+    )
+    rgba = rows[:, :4 * image.width()].reshape(image.height(), image.width(), 4)
+    return rgba.copy()
+
+
+def nearest_colours(rgb: np.ndarray, colours: np.ndarray) -> np.ndarray:
+    """
+    Index of the nearest of `colours` (k, 3) for each pixel of `rgb` (..., 3)
+
+    Pixel art only uses a handful of distinct colours, so distances are
+    computed once per unique colour rather than once per pixel.
+    """
+    packed = (
+        rgb[..., 0].astype(np.uint32) << 16
+        | rgb[..., 1].astype(np.uint32) << 8
+        | rgb[..., 2].astype(np.uint32)
+    )
+    unique, inverse = np.unique(packed.ravel(), return_inverse=True)
+    unique_rgb = np.stack(
+        [(unique >> 16) & 0xff, (unique >> 8) & 0xff, unique & 0xff],
+        axis=-1
+    ).astype(np.int32)
+
+    colours = colours.astype(np.int32)
+    nearest = np.empty(len(unique), dtype=np.intp)
+    for start in range(0, len(unique), MATCH_BLOCK):
+        block = unique_rgb[start:start + MATCH_BLOCK]
+        distance = ((block[:, None, :] - colours[None, :, :])**2).sum(axis=-1)
+        nearest[start:start + MATCH_BLOCK] = distance.argmin(axis=-1)
+
+    return nearest[inverse].reshape(packed.shape)
+
+
+def fit_palette(rgba: np.ndarray, label: str) -> Palette:
+    """
+    Build a palette from the most used `PALETTE` colours in `rgba`
+    """
+    opaque = rgba[rgba[..., 3] >= ALPHA_THRESHOLD][:, :3]
+    table = np.array([hex_to_rgb(c) for c in PALETTE], dtype=np.uint8)
+
+    counts = np.bincount(
+        nearest_colours(opaque, table).ravel(),
+        minlength=len(table)
+    )
+    used = [int(i) for i in np.argsort(-counts, kind="stable") if counts[i] > 0]
+
+    colours = [Colour.from_hex(PALETTE[TRANSPARENT_IDX])]
+    for idx in used[:N_PALETTE_COLOURS - 1]:
+        colours.append(Colour.from_hex(PALETTE[idx]))
+    while len(colours) < N_PALETTE_COLOURS:
+        colours.append(Colour.from_hex(PALETTE[TRANSPARENT_IDX]))
+
+    return Palette(colours, label)
+
+
+def map_to_palette(rgba: np.ndarray, palette: Palette) -> np.ndarray:
+    """
+    Map RGBA pixels to palette indexes, transparent pixels to index 0
+    """
+    colours = np.array(
+        [colour.rgb for colour in palette.colours[TRANSPARENT_IDX + 1:]],
+        dtype=np.uint8
+    )
+    data = nearest_colours(rgba[..., :3], colours).astype(np.uint8) + 1
+    data[rgba[..., 3] < ALPHA_THRESHOLD] = TRANSPARENT_IDX
+    return data
+
+
+def read_collision(filename: str, shape: tuple[int, int]) -> np.ndarray:
+    """
+    Read collision mask, where any bright opaque pixel collides
+    """
+    rgba = read_rgba(filename)
+    if rgba.shape[:2] != shape:
+        raise ValueError(
+            f"Mask '{filename}' is {rgba.shape[1]}x{rgba.shape[0]}, "
+            f"expected {shape[1]}x{shape[0]}"
+        )
+    bright = rgba[..., :3].max(axis=-1) >= MASK_THRESHOLD
+    return (bright & (rgba[..., 3] >= ALPHA_THRESHOLD)).astype(np.uint8)
+
+
+def slice_tiles(image: np.ndarray) -> np.ndarray:
+    """
+    Slice an (h, w) image into (n, 8, 8) tiles, row by row
+
+    Images that are not a multiple of the tile size are padded with index 0.
+    """
+    h, w = image.shape
+    pad_h, pad_w = -h % TILE_PX, -w % TILE_PX
+    if pad_h or pad_w:
+        image = np.pad(image, ((0, pad_h), (0, pad_w)))
+        h, w = image.shape
+
+    return (
+        image.reshape(h // TILE_PX, TILE_PX, w // TILE_PX, TILE_PX)
+        .swapaxes(1, 2)
+        .reshape(-1, TILE_PX, TILE_PX)
+    )
+
+
+def import_png(
+    filename: str,
+    output: str,
+    palette: Palette | None = None,
+    mask: str | None = None,
+    skip_empty: bool = False
+) -> tuple[int, Palette]:
+    """
+    Slice a PNG into 8x8 tiles and write them to a `.4bpp` file.
+
+    Without a palette, one is fitted from `PALETTE`. Returns the number of
+    tiles written and the palette they index.
+    """
+    stem = Path(filename).stem
+    rgba = read_rgba(filename)
+    if palette is None:
+        palette = fit_palette(rgba, stem)
+
+    data = slice_tiles(map_to_palette(rgba, palette))
+    if mask is not None:
+        collision_data = slice_tiles(read_collision(mask, rgba.shape[:2]))
+    else:
+        collision_data = np.zeros_like(data)
+
+    keep = np.arange(len(data))
+    if skip_empty:
+        keep = np.flatnonzero(
+            data.any(axis=(1, 2)) | collision_data.any(axis=(1, 2))
+        )
+
+    write_spritesheet(
+        output,
+        [f"{stem}_{idx}" for idx in keep],
+        data[keep],
+        collision_data[keep]
+    )
+    return len(keep), palette
+
+
+def find_palette(group: PaletteGroup, name: str) -> Palette:
+    """
+    Find palette in group by label or index
+    """
+    for palette in group.palettes:
+        if palette.label == name:
+            return palette
+    if name.isdigit() and int(name) < len(group.palettes):
+        return group.palettes[int(name)]
+
+    raise KeyError(f"No palette '{name}' in palette group")
+
+
+def run() -> None:
+    """
+    Import PNG sprite strips as `.4bpp` spritesheets
+    """
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument("images", nargs="+", help="PNG files to import")
+    parser.add_argument(
+        "-o", "--output-dir",
+        help="directory for `.4bpp` files, defaults to next to each image"
+    )
+    parser.add_argument(
+        "--pal",
+        help=(
+            "`.pal` file; with --palette the palette to match against, "
+            "otherwise fitted palettes are appended to it"
+        )
+    )
+    parser.add_argument("--palette", help="label or index of palette in --pal")
+    parser.add_argument(
+        "--mask-suffix",
+        default=MASK_SUFFIX,
+        help=f"collision mask is read from <image><suffix>.png (default {MASK_SUFFIX})"
+    )
+    parser.add_argument(
+        "--skip-empty",
+        action="store_true",
+        help="drop tiles with no opaque pixels or collision"
+    )
+    args = parser.parse_args()
+
+    if args.palette is not None and args.pal is None:
+        parser.error("--palette requires --pal")
+
+    group = PaletteGroup([])
+    if args.pal is not None and Path(args.pal).exists():
+        group.open(args.pal)
+    palette = None
+    if args.palette is not None:
+        palette = find_palette(group, args.palette)
+
+    fitted = []
+    for image in args.images:
+        path = Path(image)
+        out_dir = Path(args.output_dir) if args.output_dir else path.parent
+        output = out_dir / f"{path.stem}.4bpp"
+        mask = path.with_name(f"{path.stem}{args.mask_suffix}{path.suffix}")
+
+        n, used = import_png(
+            image,
+            str(output),
+            palette,
+            str(mask) if mask.exists() else None,
+            args.skip_empty
+        )
+        print(f"{image}: {n} tiles -> {output}")
+        if palette is None:
+            fitted.append((out_dir / f"{path.stem}.pal", used))
+
+    if fitted and args.pal is not None:
+        for _, used in fitted:
+            group.add_palette(used)
+        group.save(args.pal)
+    else:
+        for output, used in fitted:
+            PaletteGroup([used]).save(str(output))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,174 @@
+# Standard library imports
+import typing as t
+
+# Third party imports
+from PyQt6.QtCore import QElapsedTimer, Qt, QTimer
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtWidgets import (
+    QCheckBox, QDoubleSpinBox, QGridLayout, QLabel, QSpinBox, QToolButton, QWidget
+)
+
+# Local imports
+from pysprite.canvas.animation import Animation
+from pysprite.canvas.canvas import TILE_PX
+from pysprite.canvas.transaction import Region
+from pysprite.widgets.scheduler import RepaintScheduler
+
+
+ANIMATION_PX = 128
+
+
+# Plays an animation from pixmaps rendered once per frame. The timer only runs
+# while playing and fires once per animation frame, so an idle or paused
+# panel does no work.
+class QtAnimation(QWidget):
+    def __init__(self, animation: Animation) -> None:
+        super().__init__()
+        self.animation = animation
+        self._frame = 0
+        self._onion = False
+        self._pixmaps: list[QPixmap | None] = []
+
+        self._clock = QElapsedTimer()
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._step)
+        self._repaint = RepaintScheduler(self._frames_changed)
+        self.animation.animationChanged.connect(self._repaint.request)
+
+        self.glayout = QGridLayout()
+        self.view = QLabel()
+        self.view.setFixedSize(ANIMATION_PX, ANIMATION_PX)
+        self.play_button = QToolButton()
+        self.play_button.setText("Play")
+        self.play_button.setCheckable(True)
+        self.play_button.toggled.connect(self.play)
+        self.first_box = QSpinBox()
+        self.last_box = QSpinBox()
+        self.first_box.setPrefix("From ")
+        self.last_box.setPrefix("To ")
+        self.first_box.valueChanged.connect(self._range_changed)
+        self.last_box.valueChanged.connect(self._range_changed)
+        self.timestep_box = QDoubleSpinBox()
+        self.timestep_box.setSuffix(" s")
+        self.timestep_box.setDecimals(3)
+        self.timestep_box.setRange(0.001, 10.0)
+        self.timestep_box.setSingleStep(0.05)
+        self.timestep_box.setValue(self.animation.timestep)
+        self.timestep_box.valueChanged.connect(self._timestep_changed)
+        self.onion_box = QCheckBox("Onion skin")
+        self.onion_box.toggled.connect(self.set_onion)
+
+        self.glayout.addWidget(self.view, 0, 0, 1, 2)
+        self.glayout.addWidget(self.first_box, 1, 0)
+        self.glayout.addWidget(self.last_box, 1, 1)
+        self.glayout.addWidget(self.timestep_box, 2, 0)
+        self.glayout.addWidget(self.play_button, 2, 1)
+        self.glayout.addWidget(self.onion_box, 3, 0, 1, 2)
+        self.setLayout(self.glayout)
+
+        self.update_range()
+        self._frames_changed()
+
+    def update_range(self) -> None:
+        """
+        Fit range selection to the spritesheet
+        """
+        n = len(self.animation.spritesheet.canvases)
+        for box, value in [
+            (self.first_box, self.animation.first),
+            (self.last_box, self.animation.last)
+        ]:
+            box.blockSignals(True)
+            box.setRange(0, n - 1)
+            box.setValue(value)
+            box.blockSignals(False)
+
+    def play(self, playing: bool) -> None:
+        """
+        Start or stop playback
+        """
+        self.play_button.blockSignals(True)
+        self.play_button.setChecked(playing)
+        self.play_button.setText("Stop" if playing else "Play")
+        self.play_button.blockSignals(False)
+        if playing and self.animation.n_frames > 1:
+            self._clock.start()
+            self._timer.start(self.animation.frame_ms)
+        else:
+            self._timer.stop()
+
+    def update_palette(self) -> None:
+        """
+        Redraw frames after palette colours change
+        """
+        self._frames_changed(Region(0, 0, self.animation.n_frames, 1))
+
+    def set_onion(self, onion: bool) -> None:
+        """
+        Show the previous frame through transparent pixels
+        """
+        self._onion = onion
+        self._frames_changed(Region(0, 0, self.animation.n_frames, 1))
+
+    def _range_changed(self) -> None:
+        first, last = self.first_box.value(), self.last_box.value()
+        self.animation.set_range(min(first, last), max(first, last))
+        self._frame = 0
+        self.play(self.play_button.isChecked())
+
+    def _timestep_changed(self, timestep: float) -> None:
+        self.animation.set_timestep(timestep)
+        self.play(self.play_button.isChecked())
+
+    def _frames_changed(self, region: Region | None = None) -> None:
+        """
+        Drop pixmaps of frames in `region`, showing the current one again
+        """
+        if len(self._pixmaps) != self.animation.n_frames:
+            self._pixmaps = [None] * self.animation.n_frames
+            self._frame = min(self._frame, self.animation.n_frames - 1)
+        if region is not None:
+            for frame in range(region.x0, min(region.x1, len(self._pixmaps))):
+                self._pixmaps[frame] = None
+            # An onion skin shows the frame before it
+            if self._onion:
+                self._pixmaps[region.x1 % len(self._pixmaps)] = None
+        self._show(self._frame)
+
+    def _render(self) -> None:
+        """
+        Render pixmaps of every frame without one
+        """
+        stale = [n for n, pixmap in enumerate(self._pixmaps) if pixmap is None]
+        if not stale:
+            return
+
+        if self._onion:
+            frames = self.animation.onion_frames()
+        else:
+            frames = self.animation.frames()
+        for n in stale:
+            image = QImage(
+                frames[n].tobytes(),
+                TILE_PX,
+                TILE_PX,
+                TILE_PX * 3,
+                QImage.Format.Format_RGB888
+            )
+            self._pixmaps[n] = QPixmap.fromImage(image).scaled(
+                ANIMATION_PX, ANIMATION_PX
+            )
+
+    def _show(self, frame: int) -> None:
+        self._render()
+        self._frame = frame
+        self.view.setPixmap(t.cast(QPixmap, self._pixmaps[frame]))
+
+    def _step(self) -> None:
+        """
+        Show the frame due at this time, skipping any missed
+        """
+        frame = self.animation.frame_at(self._clock.elapsed() / 1000)
+        if frame != self._frame:
+            self._show(frame)
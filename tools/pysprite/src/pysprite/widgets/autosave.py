@@ -0,0 +1,104 @@
+# Standard library imports
+import typing as t
+from pathlib import Path
+
+# Third party imports
+from PyQt6.QtCore import QObject, QStandardPaths, QTimer, pyqtSignal
+
+# Local imports
+from pysprite.canvas.journal import DocumentJournal
+
+
+# Constants
+AUTOSAVE_MS = 2000
+
+
+# Keeps the journal of every open document up to date. Journals are synced
+# after each history step and on a timer, which catches edits history does
+# not record, like labels. Untitled documents are journaled in the
+# application data directory.
+class QtAutosave(QObject):
+    failed = pyqtSignal(str)
+
+    def __init__(self, directory: Path | None = None) -> None:
+        super().__init__()
+        if directory is None:
+            directory = Path(QStandardPaths.writableLocation(
+                QStandardPaths.StandardLocation.AppDataLocation
+            ))
+        self.directory = directory
+        self._journals: dict[str, DocumentJournal] = {}
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.sync)
+        self._timer.start(AUTOSAVE_MS)
+
+    def untitled(self, filename: str) -> str:
+        """
+        Path an untitled document is journaled beside
+        """
+        return str(self.directory.joinpath(filename))
+
+    def journal(self, key: str) -> DocumentJournal | None:
+        """
+        Journal of document `key`, if journaled
+        """
+        return self._journals.get(key)
+
+    def track(self, key: str, journal: DocumentJournal) -> bool:
+        """
+        Journal document `key`, first replaying what an earlier session left
+        unsaved. Returns True if anything was recovered
+        """
+        self.close(key)
+        self._journals[key] = journal
+        return bool(self._guard(lambda: self._recover(journal)))
+
+    def _recover(self, journal: DocumentJournal) -> bool:
+        journal.path.parent.mkdir(parents=True, exist_ok=True)
+        return journal.recover()
+
+    def close(self, key: str | None = None) -> None:
+        """
+        Stop journaling document `key`, or every document if None
+        """
+        keys = list(self._journals) if key is None else [key]
+        for k in keys:
+            journal = self._journals.pop(k, None)
+            if journal is not None:
+                self._guard(journal.close)
+
+    def sync(self) -> None:
+        """
+        Journal changes to every document
+        """
+        for journal in list(self._journals.values()):
+            self._guard(journal.sync)
+
+    def mark(self, key: str) -> DocumentJournal | None:
+        """
+        Note that document `key` starts saving, returning its journal
+        """
+        journal = self._journals.get(key)
+        if journal is not None:
+            self._guard(journal.mark)
+        return journal
+
+    def saved(self, key: str, journal: DocumentJournal | None, filename: str) -> None:
+        """
+        Move the journal returned by `mark` beside the saved file, if the
+        document is still open
+        """
+        if journal is not None and self._journals.get(key) is journal:
+            self._guard(lambda: journal.saved(filename))
+
+    def _guard(self, action: t.Callable[[], t.Any]) -> t.Any:
+        """
+        Run `action`, reporting rather than raising failures so editing
+        carries on without a journal
+        """
+        try:
+            return action()
+        except (OSError, ValueError, AttributeError) as e:
+            self.failed.emit(f"Autosave failed: {e}")
+            return None
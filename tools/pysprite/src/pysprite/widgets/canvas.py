@@ -2,26 +2,49 @@
 import typing as t
 
 # Third party imports
-from PyQt6.QtCore import QMimeData, QPoint, QSize, Qt, pyqtSignal
+from PyQt6.QtCore import QMimeData, QPoint, QRect, QSize, Qt, pyqtSignal
 from PyQt6 import QtGui
-from PyQt6.QtGui import QBrush, QDrag, QImage, QPainter, QPixmap
+from PyQt6.QtGui import QDrag, QImage, QPainter, QPixmap
 from PyQt6.QtWidgets import QGridLayout, QLabel, QLineEdit, QWidget
 
 # Local imports
 from pysprite.canvas.canvas import TILE_PX, Canvas
 from pysprite.canvas.palette import Colour, Palette
+from pysprite.canvas.tools import FILL, LINE, PENCIL, RECT, TOOLS
+from pysprite.canvas.transaction import Region
 from pysprite.widgets.palette_group import QtPaletteGroup
+from pysprite.widgets.scheduler import RepaintScheduler
 
 
 BORDER_COLOUR = [255, 255, 0]
+CELL_PX = 62
+CANVAS_PX = CELL_PX * TILE_PX
+CROSS_INSET = 6
+GRID_COLOUR = "#444444"
+COLLISION_COLOUR = "#ff0000"
 
 
 class QtCanvas(QLabel):
+    colour_replaced = pyqtSignal(int, int)
+
     def __init__(self, palette_group: QtPaletteGroup):
         super().__init__()
         self.mouse_clicked = False
         self._collision_mode = False
+        self._tool = PENCIL
+        self._stroke_start = (0, 0)
         self.mouse_button = Qt.MouseButton.LeftButton
+        self.setMinimumSize(CANVAS_PX, CANVAS_PX)
+
+        # Layers composited in paintEvent, only changed cells are redrawn
+        self._image = QImage(CANVAS_PX, CANVAS_PX, QImage.Format.Format_RGB32)
+        self._collision = QImage(
+            CANVAS_PX, CANVAS_PX, QImage.Format.Format_ARGB32_Premultiplied
+        )
+        self._collision.fill(Qt.GlobalColor.transparent)
+        self._grid = self._draw_grid()
+
+        self._repaint = RepaintScheduler(self.update_image, self._flush_stroke)
         self.update_canvas(Canvas(palette_group.get_active_palette()))
         self._palette_group = palette_group
         self._palette_group.palette_update.connect(self.update_palette)
@@ -32,7 +55,17 @@ class QtCanvas(QLabel):
         """
         Enable/disable collision mode
         """
-        self._collision_mode = mode
+        if mode != self._collision_mode:
+            self._collision_mode = mode
+            self.update_image()
+
+    def set_tool(self, tool: str) -> None:
+        """
+        Select drawing tool, one of TOOLS
+        """
+        if tool not in TOOLS:
+            raise ValueError(f"Unknown tool {tool}")
+        self._tool = tool
 
     def get_active_palette(self) -> Palette:
         """
@@ -56,8 +89,11 @@ class QtCanvas(QLabel):
         """
         Update canvas
         """
+        if hasattr(self, "canvas"):
+            self._end_stroke()
+            self.canvas.canvasChanged.disconnect(self._repaint.request)
         self.canvas = canvas
-        self.canvas.canvasChanged.connect(self.update_image)
+        self.canvas.canvasChanged.connect(self._repaint.request)
         self.update_image()
 
     def update_colour(self, colour: Colour) -> None:
@@ -80,7 +116,7 @@ class QtCanvas(QLabel):
         """
         x, y = pos.x(), pos.y()
 
-        img_size = self.img.size()
+        img_size = self._image.size()
         xi, yi = img_size.width(), img_size.height()
 
         return x / xi, y / yi
@@ -90,7 +126,7 @@ class QtCanvas(QLabel):
         Set brush colour
         """
         self.canvas.set_colour_idx(idx)
-        self._collision_mode = False
+        self.set_collision_mode(False)
 
     def get_colour_idx(self) -> int:
         """
@@ -104,6 +140,75 @@ class QtCanvas(QLabel):
         """
         self.canvas.new()
 
+    def _draw(self, pos: QPoint) -> None:
+        """
+        Draw at widget position, showing the change on the next frame
+        """
+        x, y = self.getNormalisedPos(pos)
+        if self._collision_mode:
+            self.canvas.draw_collision(
+                x, y, self.mouse_button == Qt.MouseButton.LeftButton
+            )
+        else:
+            self.canvas.draw_pixel(x, y)
+        self._repaint.request()
+
+    def _cell(self, pos: QPoint) -> tuple[int, int]:
+        """
+        Pixel of the canvas at widget position
+        """
+        x, y = self.getNormalisedPos(pos)
+        return int(TILE_PX * x), int(TILE_PX * y)
+
+    def _collision_flag(self) -> bool | None:
+        """
+        Collision flag set by tools in collision mode, None otherwise
+        """
+        if self._collision_mode:
+            return self.mouse_button == Qt.MouseButton.LeftButton
+        return None
+
+    def _fill(self, pos: QPoint, replace: bool) -> None:
+        """
+        Flood fill at widget position, or ask for the colour there to be
+        replaced across the spritesheet if `replace`
+        """
+        i, j = self._cell(pos)
+        if not (0 <= i < self.canvas.w and 0 <= j < self.canvas.h):
+            return
+        if replace and not self._collision_mode:
+            self.colour_replaced.emit(
+                int(self.canvas.data[j, i]), self.canvas.get_colour_idx()
+            )
+        else:
+            self.canvas.flood_fill(i, j, self._collision_flag())
+
+    def _draw_shape(self, pos: QPoint, filled: bool) -> None:
+        """
+        Draw line or rectangle from the start of the stroke to widget position
+        """
+        i, j = self._cell(pos)
+        if self._tool == LINE:
+            self.canvas.draw_line(*self._stroke_start, i, j, self._collision_flag())
+        else:
+            self.canvas.draw_rect(
+                *self._stroke_start, i, j, filled, self._collision_flag()
+            )
+
+    def _flush_stroke(self) -> None:
+        """
+        Emit changes of the stroke in progress, once per frame
+        """
+        self.canvas.transaction().flush()
+
+    def _end_stroke(self) -> None:
+        """
+        Close the transaction of the stroke in progress
+        """
+        if self.mouse_clicked:
+            self.mouse_clicked = False
+            self.canvas.transaction().end()
+
     def mousePressEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
         """
         Triggered when mouse pressed
@@ -111,22 +216,25 @@ class QtCanvas(QLabel):
         if ev is None:
             return
 
-        x, y = self.getNormalisedPos(ev.pos())
-
+        self._end_stroke()
         self.mouse_clicked = True
         self.mouse_button = ev.button()
-        if self._collision_mode:
-            self.canvas.draw_collision(
-                x, y, self.mouse_button == Qt.MouseButton.LeftButton
-            )
-        else:
-            self.canvas.draw_pixel(x, y)
+        self._stroke_start = self._cell(ev.pos())
+        self.canvas.transaction().begin()
+        shift = bool(ev.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+        if self._tool == PENCIL:
+            self._draw(ev.pos())
+        elif self._tool == FILL:
+            self._fill(ev.pos(), shift)
 
     def mouseReleaseEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
         """
         Triggered when mouse released
         """
-        self.mouse_clicked = False
+        if ev is not None and self.mouse_clicked and self._tool in [LINE, RECT]:
+            shift = bool(ev.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+            self._draw_shape(ev.pos(), shift)
+        self._end_stroke()
 
     def mouseMoveEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
         """
@@ -135,59 +243,90 @@ class QtCanvas(QLabel):
         if ev is None:
             return
 
-        if self.mouse_clicked:
-            x, y = self.getNormalisedPos(ev.pos())
-            if self._collision_mode:
-                self.canvas.draw_collision(
-                    x, y, self.mouse_button == Qt.MouseButton.LeftButton
-                )
-            else:
-                self.canvas.draw_pixel(x, y)
+        if self.mouse_clicked and self._tool == PENCIL:
+            self._draw(ev.pos())
 
-    def update_image(self) -> None:
+    def _draw_grid(self) -> QImage:
         """
-        Update image using data matrix
+        Grid overlay, drawn once
         """
-        self.qImg = QImage(
-            self.canvas.as_rgb_bytes(self._collision_mode),
-            self.canvas.w,
-            self.canvas.h,
-            self.canvas.w * 3,
-            QImage.Format.Format_RGB888
-        )
-        self.qImg = self.qImg.scaledToHeight(497)
-        self.img = QPixmap.fromImage(self.qImg)
-        painter = QPainter(self.img)
-        painter.setBrush(QBrush(QtGui.QColor("#ff0000"), Qt.BrushStyle.SolidPattern))
-        pen = QtGui.QPen()
+        grid = QImage(CANVAS_PX, CANVAS_PX, QImage.Format.Format_ARGB32_Premultiplied)
+        grid.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(grid)
+        painter.setPen(QtGui.QColor(GRID_COLOUR))
+        for x in range(0, CANVAS_PX, CELL_PX):
+            painter.drawLine(x, 0, x, CANVAS_PX)
+            painter.drawLine(0, x, CANVAS_PX, x)
+        painter.end()
+
+        return grid
+
+    def update_image(self, region: Region | None = None) -> None:
+        """
+        Redraw cells of `region`, or every cell if None
+        """
+        region = self.canvas.region if region is None else region
+        lut = self.canvas.palette.lut
+        if self._collision_mode:
+            lut = lut // 2
+        colours = lut[self.canvas.data[region.y0:region.y1, region.x0:region.x1]].tolist()
+
+        painter = QPainter(self._image)
+        for j in range(region.h):
+            for i in range(region.w):
+                painter.fillRect(
+                    self._cell_rect(region.x0 + i, region.y0 + j),
+                    QtGui.QColor(*colours[j][i])
+                )
+        painter.end()
+
         if self._collision_mode:
-            pen.setColor(QtGui.QColor("#ff0000"))
-            pen.setWidth(2)
-            painter.setPen(pen)
-            for i in range(self.canvas.h):
-                for j in range(self.canvas.w):
-                    if self.canvas.collision_data[j, i] == 1:
-                        painter.drawLine(
-                            62 * i + 6,
-                            62 * j + 6,
-                            62 * i + 56,
-                            62 * j + 56,
-                        )
-                        painter.drawLine(
-                            62 * i + 6,
-                            62 * j + 56,
-                            62 * i + 56,
-                            62 * j + 6,
-                        )
-
-        pen.setColor(QtGui.QColor("#444444"))
-        pen.setWidth(1)
+            self._update_collision(region)
+
+        self.update(QRect(
+            CELL_PX * region.x0,
+            CELL_PX * region.y0,
+            CELL_PX * region.w,
+            CELL_PX * region.h
+        ))
+
+    def _update_collision(self, region: Region) -> None:
+        """
+        Redraw crosses of collision cells in `region`
+        """
+        pen = QtGui.QPen(QtGui.QColor(COLLISION_COLOUR))
+        pen.setWidth(2)
+        painter = QPainter(self._collision)
         painter.setPen(pen)
-        for x in range(0, self.img.width(), self.img.width() // TILE_PX):
-            painter.drawLine(x, 0, x, self.img.height())
-            painter.drawLine(0, x, self.img.width(), x)
+        for j in range(region.y0, region.y1):
+            for i in range(region.x0, region.x1):
+                rect = self._cell_rect(i, j)
+                painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+                painter.fillRect(rect, Qt.GlobalColor.transparent)
+                painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+                if self.canvas.collision_data[j, i] == 1:
+                    inner = rect.adjusted(CROSS_INSET, CROSS_INSET, -CROSS_INSET, -CROSS_INSET)
+                    painter.drawLine(inner.topLeft(), inner.bottomRight())
+                    painter.drawLine(inner.bottomLeft(), inner.topRight())
+        painter.end()
+
+    def _cell_rect(self, i: int, j: int) -> QRect:
+        return QRect(CELL_PX * i, CELL_PX * j, CELL_PX, CELL_PX)
+
+    def paintEvent(self, ev: t.Optional[QtGui.QPaintEvent]) -> None:
+        """
+        Composite image, collision and grid layers over the exposed area
+        """
+        if ev is None:
+            return
+
+        rect = ev.rect().intersected(self._image.rect())
+        painter = QPainter(self)
+        painter.drawImage(rect, self._image, rect)
+        if self._collision_mode:
+            painter.drawImage(rect, self._collision, rect)
+        painter.drawImage(rect, self._grid, rect)
         painter.end()
-        self.setPixmap(self.img)
 
 
 class QtCanvasLabel(QWidget):
@@ -229,7 +368,8 @@ class QtCanvasPreview(QLabel):
         super().__init__()
         self._active = False
         self._canvas = canvas
-        self._canvas.canvasChanged.connect(self.update_image)
+        self._repaint = RepaintScheduler(self.update_image)
+        self._canvas.canvasChanged.connect(self._repaint.request)
         self.setFixedSize(QSize(32, 32))
         self.update_image()
 
@@ -254,7 +394,7 @@ class QtCanvasPreview(QLabel):
         """
         self._canvas.set_palette(palette)
 
-    def update_image(self) -> None:
+    def update_image(self, region: Region | None = None) -> None:
         """
         Update image using data matrix
         """
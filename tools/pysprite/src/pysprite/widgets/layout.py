@@ -4,12 +4,17 @@ from importlib.resources import files
 # Third party imports
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QGridLayout, QToolBar, QToolButton, QWidget
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 
 # Local imports
+from pysprite.canvas.animation import Animation
+from pysprite.canvas.history import History
+from pysprite.canvas.metasprite import Metasprite
 from pysprite.canvas.palette import Colour
+from pysprite.widgets.animation import QtAnimation
 from pysprite.widgets.canvas import QtCanvas, QtCanvasLabel
 from pysprite.widgets.colour_selector import QtColourSelector
+from pysprite.widgets.metasprite import QtMetasprite
 from pysprite.widgets.palette import QtPaletteLabel
 from pysprite.widgets.palette_group import QtPaletteGroup
 from pysprite.widgets.spritesheet import QtSpritesheet
@@ -19,6 +24,8 @@ ASSET_PATH = files("pysprite").joinpath("assets")
 
 
 class QtMainLayout(QWidget):
+    part_rejected = pyqtSignal(str)
+
     def __init__(self) -> None:
         super().__init__()
         self.mainlayout = QGridLayout()
@@ -35,6 +42,23 @@ class QtMainLayout(QWidget):
         self.spritesheet.canvas_selected.connect(self._update_canvas)
         self.canvas.update_canvas(self.spritesheet.get_active_canvas())
 
+        self.history = History()
+        self.spritesheet.spritesheet.history = self.history
+        self.canvas.colour_replaced.connect(
+            self.spritesheet.spritesheet.replace_colour
+        )
+        self.pal.palette_group.history = self.history
+
+        self.metasprite = QtMetasprite(
+            Metasprite(self.spritesheet.spritesheet, self.pal.palette_group)
+        )
+        self.metasprite.metasprite.history = self.history
+        self.metasprite.part_clicked.connect(self._place_part)
+        self.pal.colour_update.connect(self.metasprite.set_colour_idx)
+
+        self.animation = QtAnimation(Animation(self.spritesheet.spritesheet))
+        self.spritesheet.spritesheet.canvases_added.connect(self.animation.update_range)
+
         self.canvas_label = QtCanvasLabel()
         self.canvas_label.changed.connect(self._update_canvas_label)
         self.canvas_label.set_label(self.canvas.get_label())
@@ -54,6 +78,8 @@ class QtMainLayout(QWidget):
         self.mainlayout.addWidget(self.palette_label, 0, 3)
         self.mainlayout.addWidget(self.colour_selector, 1, 4)
         self.mainlayout.addWidget(self.spritesheet, 2, 1)
+        self.mainlayout.addWidget(self.metasprite, 2, 3)
+        self.mainlayout.addWidget(self.animation, 2, 4)
         self.mainlayout.addWidget(self.palette_toolbar, 1, 2)
 
         self.mainlayout.setColumnStretch(3, 1)
@@ -76,6 +102,31 @@ class QtMainLayout(QWidget):
         self.pal.new_palette()
         self.palette_label.set_label(self.pal.get_active_palette().get_label())
 
+    def new_metasprite(self, w: int, h: int) -> None:
+        """
+        Start an empty metasprite of w x h parts
+        """
+        self.metasprite.metasprite.new(w, h)
+
+    def set_tool(self, tool: str) -> None:
+        """
+        Select drawing tool of the canvas and metasprite
+        """
+        self.canvas.set_tool(tool)
+        self.metasprite.set_tool(tool)
+
+    def undo(self) -> None:
+        """
+        Undo latest edit of the spritesheet or palettes
+        """
+        self.history.undo()
+
+    def redo(self) -> None:
+        """
+        Redo latest undone edit
+        """
+        self.history.redo()
+
     def _update_canvas_label(self) -> None:
         """
         Update canvas label
@@ -94,6 +145,8 @@ class QtMainLayout(QWidget):
         """
         self.spritesheet.update_palette(self.canvas.get_active_palette())
         self.palette_label.set_label(self.pal.get_active_palette().get_label())
+        self.metasprite.update_image()
+        self.animation.update_palette()
 
     def _update_canvas(self) -> None:
         """
@@ -104,6 +157,7 @@ class QtMainLayout(QWidget):
         if not self.canvas._collision_mode:
             self.canvas.set_colour_idx(idx)
         self.canvas_label.set_label(self.canvas.get_label())
+        self.animation.update_range()
 
     def _update_colour(self, colour: Colour) -> None:
         """
@@ -111,6 +165,24 @@ class QtMainLayout(QWidget):
         """
         self.canvas.update_colour(colour)
         self.spritesheet.update_palette(self.canvas.get_active_palette())
+        self.metasprite.update_image()
+        self.animation.update_palette()
+
+    def _place_part(self, i: int, j: int) -> None:
+        """
+        Draw the active canvas with the active palette at metasprite part (i, j)
+        """
+        try:
+            self.metasprite.metasprite.set_part(
+                i,
+                j,
+                self.spritesheet.spritesheet.canvases.index(
+                    self.spritesheet.get_active_canvas()
+                ),
+                self.pal.palette_group.palettes.index(self.pal.get_active_palette())
+            )
+        except ValueError as e:
+            self.part_rejected.emit(str(e))
 
     def _select_collision_mode(self) -> None:
         """
@@ -0,0 +1,251 @@
+# Standard library imports
+import typing as t
+
+# Third party imports
+from PyQt6.QtCore import QPoint, QRect, Qt, pyqtSignal
+from PyQt6 import QtGui
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtWidgets import QLabel
+
+# Local imports
+from pysprite.canvas.canvas import TILE_PX
+from pysprite.canvas.metasprite import EMPTY, FLIP_H, FLIP_V, Metasprite
+from pysprite.canvas.tools import FILL, LINE, PENCIL, RECT, TOOLS
+from pysprite.canvas.transaction import Region
+from pysprite.widgets.scheduler import RepaintScheduler
+
+
+METASPRITE_PX = 256
+GRID_COLOUR = "#444444"
+PART_COLOUR = "#aaaaaa"
+
+
+# Editor view of a metasprite. Strokes paint across part boundaries into the
+# canvases behind each part. Ctrl+click asks for the active tile to be placed
+# in a part, ctrl+right click clears it and alt+click cycles its flips.
+class QtMetasprite(QLabel):
+    part_clicked = pyqtSignal(int, int)
+
+    def __init__(self, metasprite: Metasprite) -> None:
+        super().__init__()
+        self.mouse_clicked = False
+        self._tool = PENCIL
+        self._stroke_start = (0, 0)
+        self.setFixedSize(METASPRITE_PX, METASPRITE_PX)
+
+        self._repaint = RepaintScheduler(self.update_image, self._flush_stroke)
+        self.update_metasprite(metasprite)
+
+    def set_tool(self, tool: str) -> None:
+        """
+        Select drawing tool, one of TOOLS
+        """
+        if tool not in TOOLS:
+            raise ValueError(f"Unknown tool {tool}")
+        self._tool = tool
+
+    def set_colour_idx(self, idx: int) -> None:
+        """
+        Set brush colour
+        """
+        self.metasprite.set_colour_idx(idx)
+
+    def update_metasprite(self, metasprite: Metasprite) -> None:
+        """
+        Show and edit `metasprite`
+        """
+        if hasattr(self, "metasprite"):
+            self._end_stroke()
+            self.metasprite.metaspriteChanged.disconnect(self._repaint.request)
+            self.metasprite.metasprite_loaded.disconnect(self._resize)
+        self.metasprite = metasprite
+        self.metasprite.metaspriteChanged.connect(self._repaint.request)
+        self.metasprite.metasprite_loaded.connect(self._resize)
+        self._resize()
+
+    def _resize(self) -> None:
+        """
+        Rebuild layers for the size of the metasprite
+        """
+        self._end_stroke()
+        parts = max(self.metasprite.w, self.metasprite.h)
+        self._pixel_px = METASPRITE_PX // (TILE_PX * parts)
+        w = self._pixel_px * TILE_PX * self.metasprite.w
+        h = self._pixel_px * TILE_PX * self.metasprite.h
+        self._image = QImage(w, h, QImage.Format.Format_RGB32)
+        self._grid = self._draw_grid()
+        self.update_image()
+
+    def _draw_grid(self) -> QImage:
+        """
+        Pixel and part grid overlay, drawn once per size
+        """
+        grid = QImage(self._image.size(), QImage.Format.Format_ARGB32_Premultiplied)
+        grid.fill(Qt.GlobalColor.transparent)
+        w, h = grid.width(), grid.height()
+        part_px = self._pixel_px * TILE_PX
+
+        painter = QPainter(grid)
+        painter.setPen(QtGui.QColor(GRID_COLOUR))
+        for x in range(0, w, self._pixel_px):
+            painter.drawLine(x, 0, x, h)
+        for y in range(0, h, self._pixel_px):
+            painter.drawLine(0, y, w, y)
+        painter.setPen(QtGui.QColor(PART_COLOUR))
+        for x in range(0, w + 1, part_px):
+            painter.drawLine(min(x, w - 1), 0, min(x, w - 1), h)
+        for y in range(0, h + 1, part_px):
+            painter.drawLine(0, min(y, h - 1), w, min(y, h - 1))
+        painter.end()
+
+        return grid
+
+    def update_image(self, region: Region | None = None) -> None:
+        """
+        Redraw pixels of `region`, or every pixel if None
+        """
+        region = self.metasprite.region if region is None else region
+        rgb = self.metasprite.composite()
+        colours = rgb[region.y0:region.y1, region.x0:region.x1].tolist()
+
+        painter = QPainter(self._image)
+        for j in range(region.h):
+            for i in range(region.w):
+                painter.fillRect(
+                    self._pixel_rect(region.x0 + i, region.y0 + j),
+                    QtGui.QColor(*colours[j][i])
+                )
+        painter.end()
+
+        self.update(QRect(
+            self._pixel_px * region.x0,
+            self._pixel_px * region.y0,
+            self._pixel_px * region.w,
+            self._pixel_px * region.h
+        ))
+
+    def _pixel_rect(self, i: int, j: int) -> QRect:
+        return QRect(
+            self._pixel_px * i, self._pixel_px * j, self._pixel_px, self._pixel_px
+        )
+
+    def _pixel(self, pos: QPoint) -> tuple[int, int]:
+        """
+        Composite pixel at widget position
+        """
+        return pos.x() // self._pixel_px, pos.y() // self._pixel_px
+
+    def _inside(self, i: int, j: int) -> bool:
+        region = self.metasprite.region
+        return region.x0 <= i < region.x1 and region.y0 <= j < region.y1
+
+    def _draw(self, pos: QPoint) -> None:
+        """
+        Draw at widget position, showing the change on the next frame
+        """
+        i, j = self._pixel(pos)
+        if self._inside(i, j):
+            region = self.metasprite.region
+            self.metasprite.draw_pixel((i + 0.5) / region.w, (j + 0.5) / region.h)
+        self._repaint.request()
+
+    def _draw_shape(self, pos: QPoint, filled: bool) -> None:
+        """
+        Draw line or rectangle from the start of the stroke to widget position
+        """
+        i, j = self._pixel(pos)
+        if self._tool == LINE:
+            self.metasprite.draw_line(*self._stroke_start, i, j)
+        else:
+            self.metasprite.draw_rect(*self._stroke_start, i, j, filled)
+
+    def _edit_part(self, pos: QPoint, button: Qt.MouseButton, flip: bool) -> None:
+        """
+        Place, clear or flip the part at widget position
+        """
+        i, j = self._pixel(pos)
+        if not self._inside(i, j):
+            return
+        i, j = i // TILE_PX, j // TILE_PX
+        tile, palette, flags = self.metasprite.parts[j, i].tolist()
+        if flip:
+            if tile != EMPTY:
+                flags = (flags + 1) % ((FLIP_H | FLIP_V) + 1)
+                self.metasprite.set_part(
+                    i, j, tile, palette, bool(flags & FLIP_H), bool(flags & FLIP_V)
+                )
+        elif button == Qt.MouseButton.RightButton:
+            self.metasprite.set_part(i, j, EMPTY)
+        else:
+            self.part_clicked.emit(i, j)
+
+    def _flush_stroke(self) -> None:
+        """
+        Emit changes of the stroke in progress, once per frame
+        """
+        self.metasprite.transaction().flush()
+
+    def _end_stroke(self) -> None:
+        """
+        Close the transaction of the stroke in progress
+        """
+        if self.mouse_clicked:
+            self.mouse_clicked = False
+            self.metasprite.transaction().end()
+
+    def mousePressEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
+        """
+        Triggered when mouse pressed
+        """
+        if ev is None:
+            return
+
+        self._end_stroke()
+        modifiers = ev.modifiers()
+        if modifiers & (
+            Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.AltModifier
+        ):
+            self._edit_part(
+                ev.pos(), ev.button(), bool(modifiers & Qt.KeyboardModifier.AltModifier)
+            )
+            return
+
+        self.mouse_clicked = True
+        self._stroke_start = self._pixel(ev.pos())
+        self.metasprite.transaction().begin()
+        if self._tool == PENCIL:
+            self._draw(ev.pos())
+        elif self._tool == FILL and self._inside(*self._stroke_start):
+            self.metasprite.flood_fill(*self._stroke_start)
+
+    def mouseReleaseEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
+        """
+        Triggered when mouse released
+        """
+        if ev is not None and self.mouse_clicked and self._tool in [LINE, RECT]:
+            shift = bool(ev.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+            self._draw_shape(ev.pos(), shift)
+        self._end_stroke()
+
+    def mouseMoveEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
+        """
+        Triggered when mouse moved
+        """
+        if ev is None:
+            return
+
+        if self.mouse_clicked and self._tool == PENCIL:
+            self._draw(ev.pos())
+
+    def paintEvent(self, ev: t.Optional[QtGui.QPaintEvent]) -> None:
+        """
+        Composite image and grid layers over the exposed area
+        """
+        if ev is None:
+            return
+
+        rect = ev.rect().intersected(self._image.rect())
+        painter = QPainter(self)
+        painter.drawImage(rect, self._image, rect)
+        painter.drawImage(rect, self._grid, rect)
+        painter.end()
@@ -1,5 +1,6 @@
 # Standard library imports
 import typing as t
+from pathlib import Path
 
 # Third party imports
 from PyQt6.QtCore import pyqtSignal
@@ -8,8 +9,9 @@ from PyQt6.QtWidgets import QGridLayout, QWidget
 
 # Local imports
 from pysprite.canvas.palette import Colour, Palette
-from pysprite.canvas.palette_group import PaletteGroup
+from pysprite.canvas.palette_group import PaletteGroup, read_palettes
 from pysprite.widgets.palette import QtPalette
+from pysprite.widgets.worker import Task
 
 
 class QtPaletteGroup(QWidget):
@@ -22,6 +24,7 @@ class QtPaletteGroup(QWidget):
         self._palette_group = PaletteGroup()
         self._palette_group.loaded.connect(self._palette_group_loaded)
         self.glayout = QGridLayout()
+        self._open_task: Task | None = None
 
         self._palettes: list[QtPalette] = []
         self._update_palettes()
@@ -66,17 +69,37 @@ class QtPaletteGroup(QWidget):
                 self.collision_selected.emit
             )
 
-    def open_file(self, filename: str) -> None:
+    def open_file(self, filename: str) -> Task:
         """
-        Open and load an existing `.pal` file
+        Task opening an existing `.pal` file. Cancels the open in progress,
+        if any
         """
-        self._palette_group.open(filename)
+        if self._open_task is not None:
+            self._open_task.cancel()
+        task = Task(
+            lambda progress: read_palettes(filename, progress),
+            f"Opening {Path(filename).name}"
+        )
+        task.signals.finished.connect(
+            lambda palettes, x=task: self._load(x, palettes)
+        )
+        self._open_task = task
+        return task
 
-    def save_file(self, filename: str) -> None:
+    def _load(self, task: Task, palettes: list[Palette]) -> None:
         """
-        Save to `.pal` file
+        Show palettes read by an open task that is still wanted
         """
-        self._palette_group.save(filename)
+        if not task.is_cancelled:
+            self._palette_group.load(palettes)
+
+    def save_file(self, filename: str) -> Task:
+        """
+        Task saving a snapshot of the palettes to `.pal` file
+        """
+        return Task(
+            self._palette_group.writer(filename), f"Saving {Path(filename).name}"
+        )
 
     def new_palette(self) -> None:
         """
@@ -0,0 +1,70 @@
+# Standard library imports
+import typing as t
+
+# Third party imports
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QGuiApplication
+
+# Local imports
+from pysprite.canvas.transaction import Region
+
+
+# Constants
+FRAME_MS = 16
+
+
+def frame_interval() -> int:
+    """
+    Milliseconds per frame of the primary screen
+    """
+    screen = QGuiApplication.primaryScreen()
+    if screen is None or screen.refreshRate() <= 0:
+        return FRAME_MS
+    return max(1, int(1000 / screen.refreshRate()))
+
+
+# Coalesces repaint requests so `callback` runs at most once per display
+# frame, with the union of the regions requested since the last call
+class RepaintScheduler(QObject):
+    def __init__(
+        self,
+        callback: t.Callable[[Region | None], None],
+        prepare: t.Callable[[], None] | None = None
+    ) -> None:
+        super().__init__()
+        self._callback = callback
+        self._prepare = prepare
+        self._pending: Region | None = None
+        self._requested = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(frame_interval())
+        self._timer.timeout.connect(self._dispatch)
+
+    def request(self, region: Region | None = None) -> None:
+        """
+        Repaint `region` on the next frame, or only run `prepare` if None
+        """
+        if region is not None:
+            self._pending = region.union(self._pending)
+        self._requested = True
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        """
+        Repaint now if a request is pending
+        """
+        if self._requested:
+            self._timer.stop()
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        # Requests made by prepare belong to this frame
+        if self._prepare is not None:
+            self._prepare()
+        self._timer.stop()
+        region, self._pending = self._pending, None
+        self._requested = False
+        if region is not None:
+            self._callback(region)
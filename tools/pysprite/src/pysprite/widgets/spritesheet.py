@@ -1,5 +1,6 @@
 # Standard library imports
 import typing as t
+from pathlib import Path
 
 # Third party imports
 from PyQt6.QtCore import pyqtSignal
@@ -9,8 +10,9 @@ from PyQt6.QtWidgets import QGridLayout, QWidget
 # Local imports
 from pysprite.canvas.canvas import Canvas
 from pysprite.canvas.palette import Palette
-from pysprite.canvas.spritesheet import Spritesheet
+from pysprite.canvas.spritesheet import Page, Spritesheet, read_spritesheet
 from pysprite.widgets.canvas import QtCanvasPreview
+from pysprite.widgets.worker import Task
 
 
 SPRITESHEET_COLUMN = 12
@@ -24,7 +26,9 @@ class QtSpritesheet(QWidget):
         self.spritesheet = Spritesheet()
         self.spritesheet.spritesheet_changed.connect(self._update_previews)
         self.spritesheet.spritesheet_loaded.connect(self._spritesheet_loaded)
+        self.spritesheet.canvases_added.connect(self._canvases_added)
         self.glayout = QGridLayout()
+        self._open_task: Task | None = None
 
         self._previews: list[QtCanvasPreview] = []
         self._update_previews()
@@ -46,20 +50,36 @@ class QtSpritesheet(QWidget):
 
     def _update_previews(self) -> None:
         """
-        Update previews from spritesheet
+        Update previews from spritesheet, keeping the active canvas selected
         """
+        active = [preview.canvas for preview in self._previews if preview.active]
         for preview in self._previews:
             self.glayout.removeWidget(preview)
         self._previews: list[QtCanvasPreview] = []
-        for idx, canvas in enumerate(self.spritesheet.canvases):
-            self._previews.append(QtCanvasPreview(canvas))
-            self.glayout.addWidget(
-                self._previews[-1],
-                idx // SPRITESHEET_COLUMN,
-                idx % SPRITESHEET_COLUMN
-            )
-            self._previews[-1].selected.connect(lambda x=idx: self._canvas_selected(x))
-            self._previews[-1].update_image()
+        for canvas in self.spritesheet.canvases:
+            self._add_preview(canvas)
+            self._previews[-1].select(canvas in active)
+
+    def _canvases_added(self) -> None:
+        """
+        Add previews of canvases appended while a spritesheet is read
+        """
+        for canvas in self.spritesheet.canvases[len(self._previews):]:
+            self._add_preview(canvas)
+        self._update_layout()
+
+    def _add_preview(self, canvas: Canvas) -> None:
+        """
+        Add preview of `canvas` after the last one
+        """
+        idx = len(self._previews)
+        self._previews.append(QtCanvasPreview(canvas))
+        self.glayout.addWidget(
+            self._previews[-1],
+            idx // SPRITESHEET_COLUMN,
+            idx % SPRITESHEET_COLUMN
+        )
+        self._previews[-1].selected.connect(lambda x=idx: self._canvas_selected(x))
 
     def _canvas_selected(self, idx: int) -> None:
         """
@@ -77,35 +97,47 @@ class QtSpritesheet(QWidget):
             self.glayout.setRowStretch(row, 0)
         self.glayout.setRowStretch(self.glayout.rowCount() + 1, 1)
 
-    def open(self, filename: str) -> None:
+    def open(self, filename: str) -> Task:
         """
-        Open spritesheet from `.4bpp` file
+        Task opening spritesheet from `.4bpp` file, showing each page of
+        canvases as soon as it is read. Cancels the open in progress, if any
         """
-        self.spritesheet.open(filename)
+        if self._open_task is not None:
+            self._open_task.cancel()
+        task = Task(
+            lambda progress: read_spritesheet(filename, progress=progress),
+            f"Opening {Path(filename).name}"
+        )
+        task.signals.yielded.connect(
+            lambda page, x=task: self._load_page(x, filename, page)
+        )
+        self._open_task = task
+        return task
 
-    def save(self, filename: str) -> None:
+    def _load_page(self, task: Task, filename: str, page: Page) -> None:
         """
-        Save data to `.4bpp` file
+        Show a page read by an open task that is still wanted
         """
-        self.spritesheet.save(filename)
+        if task.is_cancelled:
+            return
+        self.spritesheet.load_page(*page)
+        if page[0] == 0:
+            self.spritesheet.name = Path(filename).stem
+
+    def save(self, filename: str) -> Task:
+        """
+        Task saving a snapshot of the data to `.4bpp` file
+        """
+        return Task(self.spritesheet.writer(filename), f"Saving {Path(filename).name}")
 
     def new_canvas(self) -> None:
         """
         Create new canvas
         """
         self.spritesheet.new_canvas()
-        self._previews.append(
-            QtCanvasPreview(self.spritesheet.canvases[-1])
-        )
-        idx = len(self._previews) - 1
-        self.glayout.addWidget(
-            self._previews[-1],
-            idx // SPRITESHEET_COLUMN,
-            idx % SPRITESHEET_COLUMN
-        )
-        self._previews[-1].selected.connect(lambda x=idx: self._canvas_selected(x))
+        self._add_preview(self.spritesheet.canvases[-1])
         self._update_layout()
-        self._canvas_selected(idx)
+        self._canvas_selected(len(self._previews) - 1)
 
     def get_active_canvas(self) -> Canvas:
         """
@@ -178,7 +210,6 @@ class QtSpritesheet(QWidget):
                     # insert before it.
                     target_idx = max(n - 1, 0)
                     self.spritesheet.swap_canvas(source_idx, target_idx)
-                    self._update_previews()
                     self._canvas_selected(target_idx)
                     break
 
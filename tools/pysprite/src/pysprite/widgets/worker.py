@@ -0,0 +1,165 @@
+# Standard library imports
+import inspect
+import threading
+import typing as t
+
+# Third party imports
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtWidgets import (
+    QHBoxLayout, QLabel, QMessageBox, QProgressBar, QToolButton, QWidget
+)
+
+# Local imports
+from pysprite.canvas.files import Progress
+
+
+# Raised inside a task from its next progress report once it is cancelled
+class Cancelled(Exception):
+    pass
+
+
+# Signals of a task. They are created on the GUI thread, so slots run there.
+class TaskSignals(QObject):
+    progressed = pyqtSignal(int, int)
+    yielded = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+
+# Runs `fn(progress)` on a worker thread. If `fn` returns a generator, each
+# item is passed to `yielded` as soon as it is produced.
+class Task(QRunnable):
+    def __init__(self, fn: t.Callable[[Progress], t.Any], label: str) -> None:
+        super().__init__()
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.label = label
+        self.signals = TaskSignals()
+        self._cancel = threading.Event()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        """
+        Stop the task at its next progress report or item
+        """
+        self._cancel.set()
+
+    def _progress(self, done: int, total: int) -> None:
+        if self._cancel.is_set():
+            raise Cancelled()
+        self.signals.progressed.emit(done, total)
+
+    def run(self) -> None:
+        """
+        Called on a worker thread
+        """
+        try:
+            if self._cancel.is_set():
+                raise Cancelled()
+            result = self.fn(self._progress)
+            if inspect.isgenerator(result):
+                for item in result:
+                    if self._cancel.is_set():
+                        raise Cancelled()
+                    self.signals.yielded.emit(item)
+                result = None
+        except Cancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
+
+
+# Status bar widget running tasks one at a time, in the order started, so a
+# file is never opened while it is still being saved. Hidden while idle.
+class QtTaskProgress(QWidget):
+    def __init__(self) -> None:
+        super().__init__()
+        self._tasks: list[Task] = []
+        self._shown: Task | None = None
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+        self.label = QLabel()
+        self.bar = QProgressBar()
+        self.cancel_button = QToolButton()
+        self.cancel_button.setText("Cancel")
+        self.cancel_button.clicked.connect(lambda: self.cancel())
+
+        self.hlayout = QHBoxLayout()
+        self.hlayout.setContentsMargins(0, 0, 0, 0)
+        self.hlayout.addWidget(self.label)
+        self.hlayout.addWidget(self.bar)
+        self.hlayout.addWidget(self.cancel_button)
+        self.setLayout(self.hlayout)
+        self.hide()
+
+    @property
+    def tasks(self) -> list[Task]:
+        """Tasks running or waiting to run"""
+        return self._tasks
+
+    def start(self, task: Task) -> Task:
+        """
+        Run `task` once the tasks before it are done
+        """
+        signals = task.signals
+        signals.progressed.connect(
+            lambda done, total, x=task: self._progressed(x, done, total)
+        )
+        signals.failed.connect(lambda error, x=task: self._failed(x, error))
+        signals.finished.connect(lambda _, x=task: self._done(x))
+        signals.failed.connect(lambda _, x=task: self._done(x))
+        signals.cancelled.connect(lambda x=task: self._done(x))
+
+        self._tasks.append(task)
+        self._pool.start(task)
+        self._update()
+        return task
+
+    def cancel(self, label: str | None = None) -> None:
+        """
+        Cancel tasks named `label`, or every task if None
+        """
+        for task in self._tasks:
+            if label is None or task.label == label:
+                task.cancel()
+
+    def wait(self) -> None:
+        """
+        Block until every task is done
+        """
+        self._pool.waitForDone()
+
+    def _progressed(self, task: Task, done: int, total: int) -> None:
+        if self._tasks and task is self._tasks[0]:
+            self.bar.setRange(0, total)
+            self.bar.setValue(done)
+
+    def _failed(self, task: Task, error: Exception) -> None:
+        QMessageBox.warning(self, "Error", f"{task.label} failed: {error}")
+
+    def _done(self, task: Task) -> None:
+        if task in self._tasks:
+            self._tasks.remove(task)
+        self._update()
+
+    def _update(self) -> None:
+        """
+        Show the task running, if any
+        """
+        if not self._tasks:
+            self._shown = None
+            self.hide()
+            return
+
+        if self._tasks[0] is not self._shown:
+            self._shown = self._tasks[0]
+            self.label.setText(self._shown.label)
+            self.bar.setRange(0, 0)
+        self.show()
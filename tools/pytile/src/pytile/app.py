@@ -1,16 +1,24 @@
 # Standard library imports
 import math
+import typing as t
 
 # Third party imports
 from PyQt6.QtWidgets import QApplication, QFileDialog, QMainWindow, QMenu
-from PyQt6.QtGui import QAction, QScreen
+from PyQt6.QtGui import QAction, QActionGroup, QCloseEvent, QKeySequence, QScreen
 
 # Local imports
+from pysprite.canvas.files import with_extension
+from pysprite.canvas.tools import PENCIL, TOOLS
+from pysprite.widgets.autosave import QtAutosave
+from pysprite.widgets.worker import QtTaskProgress
+
+from pytile.map.journal import MapJournal
 from pytile.widgets.layout import QtMainLayout
 
 
 WIN_WIDTH = 640
 WIN_HEIGHT = 480
+MESSAGE_MS = 5000
 
 
 class MainWindow(QMainWindow):
@@ -28,11 +36,17 @@ class MainWindow(QMainWindow):
         )
 
         self.mainlayout = QtMainLayout()
+        self.progress = QtTaskProgress()
+        self.autosave = QtAutosave()
+        self.autosave.failed.connect(self._show_message)
+        self.mainlayout.history.changed.connect(self.autosave.sync)
 
         self._create_actions()
         self._create_menu_bar()
+        self._create_status_bar()
 
         self.setCentralWidget(self.mainlayout)
+        self._journal_map(self.autosave.untitled("untitled.map"))
 
     def _create_actions(self):
         """
@@ -62,6 +76,25 @@ class MainWindow(QMainWindow):
         self.exitAction.triggered.connect(self.close)
 
         # Edit...
+        self.undo_action = QAction("&Undo", self)
+        self.undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        self.undo_action.triggered.connect(self.mainlayout.undo)
+        self.redo_action = QAction("&Redo", self)
+        self.redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+        self.redo_action.triggered.connect(self.mainlayout.redo)
+
+        # Tool... (shift with fill replaces across the map, with rect fills)
+        self.tool_menu = QMenu("&Tool", self)
+        self.tool_group = QActionGroup(self)
+        for tool in TOOLS:
+            action = QAction(f"&{tool.capitalize()}", self)
+            action.setCheckable(True)
+            action.setChecked(tool == PENCIL)
+            action.triggered.connect(
+                lambda _, x=tool: self.mainlayout.map.set_tool(x)
+            )
+            self.tool_group.addAction(action)
+            self.tool_menu.addAction(action)
 
         # Help...
         self.helpAction = QAction("&Help...", self)
@@ -87,6 +120,9 @@ class MainWindow(QMainWindow):
         editMenu = menuBar.addMenu("&Edit")
         if editMenu is None:
             raise RuntimeError("Unable to add menu bar entry")
+        editMenu.addAction(self.undo_action)
+        editMenu.addAction(self.redo_action)
+        editMenu.addMenu(self.tool_menu)
 
         helpMenu = menuBar.addMenu("&Help")
         if helpMenu is None:
@@ -96,6 +132,39 @@ class MainWindow(QMainWindow):
 
         self.setMenuBar(menuBar)
 
+    def _create_status_bar(self):
+        """
+        Create status bar showing file progress
+        """
+        statusBar = self.statusBar()
+        if statusBar is None:
+            raise RuntimeError("Unable to create status bar")
+
+        statusBar.addPermanentWidget(self.progress)
+
+    def _show_message(self, message: str) -> None:
+        """
+        Show message in the status bar for a while
+        """
+        statusBar = self.statusBar()
+        if statusBar is not None:
+            statusBar.showMessage(message, MESSAGE_MS)
+
+    def _journal_map(self, filename: str) -> None:
+        """
+        Journal the map beside `filename`, recovering changes an earlier
+        session left unsaved
+        """
+        if self.autosave.track("map", MapJournal(self.mainlayout.map.map, filename)):
+            self._show_message("Recovered unsaved map changes")
+
+    def closeEvent(self, a0: t.Optional[QCloseEvent]) -> None:
+        """
+        Journal the last changes before closing
+        """
+        self.autosave.close()
+        super().closeEvent(a0)
+
     def _open_spritesheet(self) -> None:
         """
         Open and load an existing `.4bpp` file.
@@ -109,8 +178,10 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.tiles.open(filename)
             self.mainlayout.tiles.update_palette(self.mainlayout.pal.get_active_palette())
+            task = self.mainlayout.tiles.open(filename)
+            task.signals.finished.connect(lambda _: self.mainlayout.map.redraw_map())
+            self.progress.start(task)
 
     def _open_palette(self) -> None:
         """
@@ -125,8 +196,9 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.pal.open_file(filename)
-            self.mainlayout.map.redraw_map()
+            task = self.mainlayout.pal.open_file(filename)
+            task.signals.finished.connect(lambda _: self.mainlayout.map.redraw_map())
+            self.progress.start(task)
 
     def _open_map(self) -> None:
         """
@@ -141,8 +213,11 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.map.open(filename)
-            self.mainlayout.map.redraw_map()
+            self.autosave.close("map")
+            task = self.mainlayout.map.open(filename)
+            task.signals.finished.connect(lambda _: self._journal_map(filename))
+            task.signals.finished.connect(lambda _: self.mainlayout.map.redraw_map())
+            self.progress.start(task)
 
     def _save_map(self) -> None:
         """
@@ -157,7 +232,12 @@ class MainWindow(QMainWindow):
         )
 
         if filename:
-            self.mainlayout.map.save(filename)
+            journal = self.autosave.mark("map")
+            task = self.mainlayout.map.save(filename)
+            task.signals.finished.connect(lambda _: self.autosave.saved(
+                "map", journal, with_extension(filename, ".map")
+            ))
+            self.progress.start(task)
 
 
 def run() -> None:
@@ -165,6 +245,7 @@ def run() -> None:
     Run the application
     """
     app = QApplication([])
+    app.setApplicationName("pytile")
     screen = app.primaryScreen()
     if screen is None:
         raise RuntimeError("Could not read screen information")
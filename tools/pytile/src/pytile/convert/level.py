@@ -0,0 +1,313 @@
+# Standard library imports
+import argparse
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.palette import PALETTE, Colour, Palette, hex_to_rgb
+from pysprite.canvas.palette_group import PaletteGroup
+from pysprite.canvas.spritesheet import (
+    SPRITE_PIXELS,
+    TILE_PX,
+    pack_tiles,
+    write_spritesheet
+)
+from pysprite.convert.png import (
+    ALPHA_THRESHOLD,
+    MASK_SUFFIX,
+    TRANSPARENT_IDX,
+    nearest_colours,
+    read_collision,
+    read_rgba,
+    slice_tiles
+)
+
+from pytile.map.chunks import CHUNK_TILES, index_size, write_chunked
+
+
+# Constants
+PALETTE_RGB = np.array([hex_to_rgb(c) for c in PALETTE], dtype=np.uint8)
+N_TABLE_COLOURS = len(PALETTE)
+N_CELL_COLOURS = 7
+HASH_PRIME = np.uint64(0x100000001b3)
+POPCOUNT = np.array([bin(i).count("1") for i in range(2**8)], dtype=np.uint8)
+
+
+class Level():
+    def __init__(
+        self,
+        tiles: np.ndarray,
+        collision_data: np.ndarray,
+        palettes: list[list[int]],
+        data: np.ndarray,
+        palette_data: np.ndarray,
+        mirrored: int
+    ) -> None:
+        self.tiles = tiles
+        self.collision_data = collision_data
+        self.palettes = palettes
+        self.data = data
+        self.palette_data = palette_data
+        self.mirrored = mirrored
+
+    @property
+    def w(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def h(self) -> int:
+        return self.data.shape[0]
+
+    def save(self, directory: str, stem: str, chunk_tiles: int = CHUNK_TILES) -> None:
+        """
+        Write `<stem>.4bpp`, `<stem>.pal` and `<stem>.map` to `directory`
+        """
+        path = Path(directory)
+        write_spritesheet(
+            str(path / f"{stem}.4bpp"),
+            [f"{stem}_{idx}" for idx in range(len(self.tiles))],
+            self.tiles,
+            self.collision_data
+        )
+
+        palettes = []
+        for idx, colours in enumerate(self.palettes):
+            colours = [TRANSPARENT_IDX, *colours]
+            colours += [TRANSPARENT_IDX] * (N_CELL_COLOURS + 1 - len(colours))
+            palettes.append(Palette(
+                [Colour.from_hex(PALETTE[c]) for c in colours],
+                f"{stem}_{idx}"
+            ))
+        PaletteGroup(palettes).save(str(path / f"{stem}.pal"))
+
+        pad_h = -self.h % chunk_tiles
+        pad_w = -self.w % chunk_tiles
+        world = np.pad(
+            np.stack([self.data, self.palette_data]),
+            ((0, 0), (0, pad_h), (0, pad_w))
+        )
+
+        def get_chunk(cx: int, cy: int) -> np.ndarray:
+            return world[
+                :,
+                cy * chunk_tiles:(cy + 1) * chunk_tiles,
+                cx * chunk_tiles:(cx + 1) * chunk_tiles
+            ]
+
+        write_chunked(
+            str(path / f"{stem}.map"),
+            self.w,
+            self.h,
+            chunk_tiles,
+            index_size(world),
+            get_chunk
+        )
+
+
+def unique_rows(rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    First index of each distinct row of a (n, k) uint8 array, and the
+    distinct row of every row, numbered in order of first appearance.
+
+    Rows are hashed to one u64 each, which sorts far faster than the rows
+    themselves. The rare hash collision is caught and resolved exactly.
+    """
+    pad = -rows.shape[1] % 8
+    lanes = np.ascontiguousarray(np.pad(rows, ((0, 0), (0, pad)))).view(np.uint64)
+    hashes = np.zeros(len(rows), dtype=np.uint64)
+    for lane in lanes.T:
+        hashes = (hashes ^ lane) * HASH_PRIME
+
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    if not np.array_equal(rows[first][inverse], rows):
+        _, first, inverse = np.unique(
+            rows, axis=0, return_index=True, return_inverse=True
+        )
+
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()]
+
+
+def cell_colours(cells: np.ndarray, opaque: np.ndarray) -> np.ndarray:
+    """
+    (n, 32) bitsets, as from `np.packbits`, of the `PALETTE` colours used by
+    the opaque pixels of each cell, at most 7
+
+    Cells with more colours keep their most used ones and the rest are
+    matched to the nearest later.
+    """
+    n, k = cells.shape
+    # Colours are offset by one so code 0 can stand for transparent
+    codes = np.where(opaque, cells.astype(np.uint16) + 1, np.uint16(0))
+    ordered = np.sort(codes, axis=1)
+
+    # Each run of equal colours in a sorted cell is one colour and its count
+    starts = np.ones((n, k), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    cols = np.where(starts, np.arange(k, dtype=np.uint8), np.uint8(k))
+    ends = np.minimum.accumulate(cols[:, ::-1], axis=1)[:, ::-1]
+    next_start = np.full((n, k), k, dtype=np.uint8)
+    next_start[:, :-1] = ends[:, 1:]
+    counts = np.where(
+        starts & (ordered != 0),
+        next_start - np.arange(k, dtype=np.uint8),
+        0
+    ).astype(np.uint16)
+
+    # Most used colours first, as count and code packed in one key
+    keys = np.sort((counts << 9) | ordered, axis=1)[:, :-N_CELL_COLOURS - 1:-1]
+    present = keys >> 9 > 0
+    colours = np.where(present, (keys & 0x1ff) - 1, 0).astype(np.uint8)
+    bits = np.where(present, np.uint8(0x80) >> (colours & 7), 0).astype(np.uint8)
+
+    used = np.zeros((n, N_TABLE_COLOURS // 8), dtype=np.uint8)
+    rows = np.arange(n)
+    for col in range(colours.shape[1]):
+        used[rows, colours[:, col] >> 3] |= bits[:, col]
+    return used
+
+
+def pack_palettes(sets: np.ndarray) -> tuple[list[list[int]], np.ndarray]:
+    """
+    Greedily pack colour bitsets (s, 32) into palettes of up to 7 colours.
+
+    Largest sets are placed first, each into the palette it grows least.
+    Returns the palettes and the palette index of every set.
+    """
+    sizes = POPCOUNT[sets].sum(axis=1, dtype=np.intp)
+    palettes = np.zeros_like(sets)
+    palette_sizes = np.zeros(len(sets), dtype=np.intp)
+    n_palettes = 0
+    assigned = np.zeros(len(sets), dtype=np.intp)
+    for idx in np.argsort(-sizes, kind="stable"):
+        union = POPCOUNT[palettes[:n_palettes] | sets[idx]].sum(axis=1, dtype=np.intp)
+        growth = np.where(
+            union <= N_CELL_COLOURS,
+            union - palette_sizes[:n_palettes],
+            N_TABLE_COLOURS
+        )
+        if n_palettes and growth.min() < N_TABLE_COLOURS:
+            target = int(growth.argmin())
+            palettes[target] |= sets[idx]
+            palette_sizes[target] = union[target]
+        else:
+            target = n_palettes
+            palettes[target] = sets[idx]
+            palette_sizes[target] = sizes[idx]
+            n_palettes += 1
+        assigned[idx] = target
+
+    colours = np.unpackbits(palettes[:n_palettes], axis=1).astype(bool)
+    return [list(np.flatnonzero(p)) for p in colours], assigned
+
+
+def palette_lut(palettes: list[list[int]]) -> np.ndarray:
+    """
+    (p, 256) lookup from `PALETTE` index to colour index in each palette.
+    Colour indexes start at 1, index 0 is left to transparent pixels
+    """
+    lut = np.zeros((len(palettes), N_TABLE_COLOURS), dtype=np.uint8)
+    for idx, colours in enumerate(palettes):
+        if colours:
+            lut[idx] = nearest_colours(PALETTE_RGB, PALETTE_RGB[colours]) + 1
+
+    return lut
+
+
+def count_mirrored(tiles: np.ndarray, collision_data: np.ndarray) -> int:
+    """
+    Number of unique tiles whose horizontal mirror is another unique tile
+    """
+    def as_rows(packed: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(packed).view(f"V{packed.shape[1]}").ravel()
+
+    rows = as_rows(pack_tiles(tiles, collision_data))
+    mirrored = as_rows(pack_tiles(tiles[..., ::-1], collision_data[..., ::-1]))
+    return int((np.isin(mirrored, rows) & (mirrored != rows)).sum())
+
+
+def convert_level(filename: str, mask: str | None = None) -> Level:
+    """
+    Cut a level image into deduplicated 8x8 tiles, palettes and a map
+    """
+    rgba = read_rgba(filename)
+    h, w = -(-rgba.shape[0] // TILE_PX), -(-rgba.shape[1] // TILE_PX)
+
+    colours = nearest_colours(rgba[..., :3], PALETTE_RGB).astype(np.uint8)
+    cells = slice_tiles(colours).reshape(-1, SPRITE_PIXELS)
+    # `PALETTE` has black at index 0, so transparency is tracked apart
+    opaque = slice_tiles(rgba[..., 3] >= ALPHA_THRESHOLD).reshape(-1, SPRITE_PIXELS)
+
+    if mask is not None:
+        collision = slice_tiles(read_collision(mask, rgba.shape[:2]))
+    else:
+        collision = np.zeros((len(cells), TILE_PX, TILE_PX), dtype=np.uint8)
+
+    used = cell_colours(cells, opaque)
+    first_set, set_idx = unique_rows(used)
+    palettes, set_palette = pack_palettes(used[first_set])
+    palette_data = set_palette[set_idx]
+
+    lut = palette_lut(palettes)
+    indexes = np.where(
+        opaque, lut[palette_data[:, None], cells], TRANSPARENT_IDX
+    ).reshape(-1, TILE_PX, TILE_PX)
+
+    # Identical pixels and collision give identical packed bytes
+    first, tile_idx = unique_rows(pack_tiles(indexes, collision))
+    tiles, tile_collision = indexes[first], collision[first]
+
+    return Level(
+        tiles,
+        tile_collision,
+        palettes,
+        tile_idx.reshape(h, w).astype(np.uint16),
+        palette_data.reshape(h, w).astype(np.uint16),
+        count_mirrored(tiles, tile_collision)
+    )
+
+
+def run() -> None:
+    """
+    Convert level images into `.4bpp`, `.pal` and `.map` files
+    """
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument("images", nargs="+", help="level images to convert")
+    parser.add_argument(
+        "-o", "--output-dir",
+        help="directory for output files, defaults to next to each image"
+    )
+    parser.add_argument(
+        "--mask-suffix",
+        default=MASK_SUFFIX,
+        help=f"collision mask is read from <image><suffix>.png (default {MASK_SUFFIX})"
+    )
+    parser.add_argument(
+        "--chunk-tiles",
+        type=int,
+        default=CHUNK_TILES,
+        help=f"chunk size of the written `.map` (default {CHUNK_TILES})"
+    )
+    args = parser.parse_args()
+
+    for image in args.images:
+        path = Path(image)
+        out_dir = Path(args.output_dir) if args.output_dir else path.parent
+        mask = path.with_name(f"{path.stem}{args.mask_suffix}{path.suffix}")
+
+        level = convert_level(image, str(mask) if mask.exists() else None)
+        if len(level.tiles) > 2**16:
+            raise ValueError(f"{image} has more than {2**16} unique tiles")
+        level.save(str(out_dir), path.stem, args.chunk_tiles)
+        print(
+            f"{image}: {level.w}x{level.h} cells, {len(level.tiles)} tiles, "
+            f"{len(level.palettes)} palettes, {level.mirrored} mirrored tiles"
+        )
+
+
+if __name__ == "__main__":
+    run()
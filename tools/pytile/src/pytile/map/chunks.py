@@ -0,0 +1,217 @@
+# Standard library imports
+import os
+import struct
+import threading
+import typing as t
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.files import Progress, atomic_write, report
+
+
+# Constants
+VERSION_CHUNKED = [0, 0, 3]
+CHUNK_HEADER_FORMAT = "<HHBB"
+CHUNK_HEADER_SIZE = struct.calcsize(CHUNK_HEADER_FORMAT)
+CHUNK_INDEX_DTYPE = np.dtype("<u4")
+CHUNK_TILES = 16
+EMPTY_CHUNK = 0
+INDEX_DTYPES = {1: np.dtype("<u1"), 2: np.dtype("<u2")}
+
+
+def n_chunks(n_tiles: int, chunk_tiles: int) -> int:
+    """
+    Number of chunks needed to cover `n_tiles`
+    """
+    return -(-n_tiles // chunk_tiles)
+
+
+def index_size(chunk: np.ndarray) -> int:
+    """
+    Bytes needed to store the largest index in `chunk`
+    """
+    return 1 if int(chunk.max()) < 2**8 else 2
+
+
+class ChunkFile():
+    """
+    Chunked `.map` file, read one chunk at a time.
+
+    Layout after the 3 version bytes:
+        header          width, height, chunk size (tiles) and index size (bytes)
+        chunk index     one u32 payload offset per chunk, row-major, 0 if empty
+        payloads        tile indexes then palette indexes, padded to a full chunk
+
+    Saves append changed chunks and then rewrite the index, so payloads no
+    longer indexed build up until the map is written whole again.
+
+    The file stays open, so chunks are still read from it after a save moves
+    a new file into its place. Reads may come from any thread. Each holder
+    takes its own reference with `share` and the file is closed once every
+    reference has been passed to `close`.
+    """
+    def __init__(self, filename: str) -> None:
+        self._path = Path(filename)
+        self._lock = threading.Lock()
+        self._references = 1
+        self._file = open(self._path, "rb", buffering=0)
+        try:
+            self._read_index(self._file)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _read_index(self, f: t.BinaryIO) -> None:
+        """
+        Read header and chunk index
+        """
+        version = list(f.read(3))
+        if version != VERSION_CHUNKED:
+            raise AttributeError(".map file is not chunked")
+        self.w, self.h, self.chunk_tiles, self.index_size = struct.unpack(
+            CHUNK_HEADER_FORMAT, f.read(CHUNK_HEADER_SIZE)
+        )
+        if self.index_size not in INDEX_DTYPES:
+            raise AttributeError(
+                f".map file has unsupported index size {self.index_size}"
+            )
+        self.offsets = np.fromfile(
+            f,
+            dtype=CHUNK_INDEX_DTYPE,
+            count=self.chunks_x * self.chunks_y
+        ).reshape(self.chunks_y, self.chunks_x)
+        self._size = os.fstat(f.fileno()).st_size
+
+    def share(self) -> "ChunkFile":
+        """
+        Take another reference to the file, released with `close`
+        """
+        with self._lock:
+            self._references += 1
+        return self
+
+    def close(self) -> None:
+        """
+        Release a reference, closing the file once none are left
+        """
+        with self._lock:
+            self._references -= 1
+            if self._references == 0:
+                self._file.close()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def chunks_x(self) -> int:
+        return n_chunks(self.w, self.chunk_tiles)
+
+    @property
+    def chunks_y(self) -> int:
+        return n_chunks(self.h, self.chunk_tiles)
+
+    @property
+    def chunk_size(self) -> int:
+        """Size of a chunk payload in bytes"""
+        return 2 * self.chunk_tiles**2 * self.index_size
+
+    @property
+    def size(self) -> int:
+        """Size of the file in bytes"""
+        return self._size
+
+    @property
+    def unused_bytes(self) -> int:
+        """Size of payloads replaced by `update` and no longer indexed"""
+        used = 3 + CHUNK_HEADER_SIZE + self.offsets.nbytes
+        used += np.count_nonzero(self.offsets) * self.chunk_size
+        return self._size - used
+
+    def read_chunk(self, cx: int, cy: int) -> np.ndarray | None:
+        """
+        Read tile and palette indexes of chunk (cx, cy), or None if empty
+        """
+        offset = int(self.offsets[cy, cx])
+        if offset == EMPTY_CHUNK:
+            return None
+
+        with self._lock:
+            self._file.seek(offset)
+            chunk = np.fromfile(
+                self._file,
+                dtype=INDEX_DTYPES[self.index_size],
+                count=2 * self.chunk_tiles**2
+            )
+
+        return chunk.astype(np.uint16).reshape(2, self.chunk_tiles, self.chunk_tiles)
+
+    def update(self, chunks: dict[tuple[int, int], np.ndarray]) -> None:
+        """
+        Append changed chunks to the end of the file, then point the chunk
+        index at them. Payloads they replace are left untouched, so the file
+        stays readable as either the old or the new map if writing stops
+        part way
+        """
+        dtype = INDEX_DTYPES[self.index_size]
+        offsets = self.offsets.copy()
+        with self._lock, open(self._path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            for (cx, cy), chunk in chunks.items():
+                if index_size(chunk) > self.index_size:
+                    raise ValueError("Chunk indexes do not fit in .map index size")
+
+                if not chunk.any():
+                    offsets[cy, cx] = EMPTY_CHUNK
+                    continue
+                offsets[cy, cx] = f.tell()
+                f.write(chunk.astype(dtype).tobytes())
+
+            # Payloads must reach the disk before the index points at them
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(3 + CHUNK_HEADER_SIZE)
+            f.write(offsets.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            self.offsets = offsets
+            self._size = f.seek(0, os.SEEK_END)
+
+
+def write_chunked(
+    filename: str,
+    w: int,
+    h: int,
+    chunk_tiles: int,
+    size: int,
+    get_chunk: t.Callable[[int, int], np.ndarray | None],
+    progress: Progress | None = None
+) -> None:
+    """
+    Stream chunks returned by `get_chunk` into a new chunked `.map` file.
+
+    The file is written next to `filename` and then moved into place, so
+    `get_chunk` may still read from an existing file at the same path.
+    """
+    chunks_x, chunks_y = n_chunks(w, chunk_tiles), n_chunks(h, chunk_tiles)
+    offsets = np.full((chunks_y, chunks_x), EMPTY_CHUNK, dtype=CHUNK_INDEX_DTYPE)
+    dtype = INDEX_DTYPES[size]
+
+    with atomic_write(filename) as f:
+        f.write(bytes(VERSION_CHUNKED))
+        f.write(struct.pack(CHUNK_HEADER_FORMAT, w, h, chunk_tiles, size))
+        f.write(offsets.tobytes())
+        for cy in range(chunks_y):
+            for cx in range(chunks_x):
+                chunk = get_chunk(cx, cy)
+                if chunk is None or not chunk.any():
+                    continue
+                offsets[cy, cx] = f.tell()
+                f.write(chunk.astype(dtype).tobytes())
+            report(progress, cy + 1, chunks_y)
+
+        f.seek(3 + CHUNK_HEADER_SIZE)
+        f.write(offsets.tobytes())
@@ -0,0 +1,80 @@
+# Standard library imports
+import struct
+
+# Third party imports
+import numpy as np
+
+# Local imports
+from pysprite.canvas.journal import DocumentJournal, Record
+
+from pytile.map.map import Map
+
+
+# Constants
+CHUNKS = 1
+CHUNKS_HEADER_FORMAT = "<HHB"
+CHUNKS_HEADER_SIZE = struct.calcsize(CHUNKS_HEADER_FORMAT)
+CHUNK_KEY_FORMAT = "<HH"
+CHUNK_KEY_SIZE = struct.calcsize(CHUNK_KEY_FORMAT)
+CHUNK_DTYPE = np.dtype("<u2")
+
+
+# Journals chunks of a map as they are edited. Records hold whole chunks
+# relative to the file the map was opened from, so a snapshot is only the
+# chunks with unsaved edits.
+class MapJournal(DocumentJournal):
+    def __init__(self, map: Map, filename: str) -> None:
+        self._map = map
+        super().__init__(filename)
+
+    def _track(self) -> None:
+        self._map.take_edited()
+
+    def _encode(self, keys: set[tuple[int, int]]) -> list[Record]:
+        """
+        Chunks record of map size followed by the key and data of each chunk
+        """
+        if not keys:
+            return []
+
+        header = struct.pack(
+            CHUNKS_HEADER_FORMAT,
+            self._map.world_w,
+            self._map.world_h,
+            self._map.chunk_tiles
+        )
+        chunks = [
+            struct.pack(CHUNK_KEY_FORMAT, *key)
+            + self._map.chunk(*key).astype(CHUNK_DTYPE).tobytes()
+            for key in sorted(keys)
+        ]
+        return [(CHUNKS, header + b"".join(chunks))]
+
+    def _changes(self) -> list[Record]:
+        return self._encode(self._map.take_edited())
+
+    def _snapshot(self) -> list[Record]:
+        return self._encode(self._map.dirty_chunks)
+
+    def _replay(self, records: list[Record]) -> None:
+        chunks = {}
+        cs = self._map.chunk_tiles
+        size = CHUNK_KEY_SIZE + 2 * cs**2 * CHUNK_DTYPE.itemsize
+        for kind, payload in records:
+            if kind != CHUNKS:
+                raise ValueError(f"Unknown map journal record {kind}")
+            if struct.unpack_from(CHUNKS_HEADER_FORMAT, payload) != (
+                self._map.world_w, self._map.world_h, cs
+            ):
+                raise ValueError("Map journal was recorded for a different map")
+
+            for offset in range(CHUNKS_HEADER_SIZE, len(payload), size):
+                key = struct.unpack_from(CHUNK_KEY_FORMAT, payload, offset)
+                chunks[key] = np.frombuffer(
+                    payload,
+                    dtype=CHUNK_DTYPE,
+                    count=2 * cs**2,
+                    offset=offset + CHUNK_KEY_SIZE
+                ).astype(np.uint16).reshape(2, cs, cs)
+
+        self._map.restore(chunks)
@@ -1,36 +1,90 @@
+# Standard library imports
+import struct
+import typing as t
+
 # Third party imports
 import numpy as np
 from pathlib import Path
-from PyQt6.QtCore import QObject, pyqtSignal
 
 # Local imports
 from pysprite.canvas.canvas import TILE_PX
+from pysprite.canvas.files import Progress, report, with_extension
+from pysprite.canvas.history import History
+from pysprite.canvas.observer import Signal
 from pysprite.canvas.palette_group import PaletteGroup
 from pysprite.canvas.spritesheet import Spritesheet
+from pysprite.canvas.tools import flood_mask, line_mask, rect_mask
+from pysprite.canvas.transaction import Region, Transaction
+
+from pytile.map.chunks import (
+    CHUNK_TILES,
+    INDEX_DTYPES,
+    VERSION_CHUNKED,
+    ChunkFile,
+    index_size,
+    n_chunks,
+    write_chunked
+)
 
 
 # Constants
-VERSION = [0, 0, 1]
+VERSION_NIBBLE = [0, 0, 1]
+VERSION = [0, 0, 2]
+HEADER_FORMAT = "<HHB"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
 W_TILES = 40
 H_TILES = 25
+TILE_BAND = 32
+
+# Map file read by `Map.read`, chunked files are read lazily
+MapSource = ChunkFile | tuple[np.ndarray, np.ndarray]
+# (map generation, file now backing the map, chunks that were written). The
+# result holds its own reference to the file, released by `Map.saved`
+SaveResult = tuple[int, ChunkFile, dict[tuple[int, int], np.ndarray]]
 
 
-class Map(QObject):
-    mapChanged = pyqtSignal()
+class Map():
+    mapChanged = Signal()
 
     def __init__(
         self,
         spritesheet: Spritesheet,
-        palette_group: PaletteGroup
+        palette_group: PaletteGroup,
+        w: int = W_TILES,
+        h: int = H_TILES,
+        chunk_tiles: int = CHUNK_TILES
     ) -> None:
-        super().__init__()
-        self.data = np.full((H_TILES, W_TILES), 0, dtype=np.uint8)
-        self.data_rgb = np.full((H_TILES * TILE_PX, W_TILES * TILE_PX, 3), 0, dtype=np.uint8)
-        self.palette_data = np.full((H_TILES, W_TILES), 0, dtype=np.uint8)
         self._spritesheet = spritesheet
         self._palette_group = palette_group
         self._tile_idx = 0
         self._palette_idx = 0
+        self._chunk_tiles = chunk_tiles
+        self._view_w = W_TILES
+        self._view_h = H_TILES
+        self._transaction = Transaction(self.mapChanged)
+        self._generation = 0
+        self._chunk_file: ChunkFile | None = None
+        self._reset(w, h)
+
+    def _reset(self, w: int, h: int, chunk_file: ChunkFile | None = None) -> None:
+        """
+        Drop all chunks and show the top left of a `w` x `h` world
+        """
+        self.world_w = w
+        self.world_h = h
+        self._generation += 1
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+        self._chunk_file = chunk_file
+        if chunk_file is not None:
+            self._chunk_tiles = chunk_file.chunk_tiles
+        self._chunks: dict[tuple[int, int], np.ndarray] = {}
+        self._dirty: set[tuple[int, int]] = set()
+        # Chunks edited since `take_edited` was last called
+        self._edited: set[tuple[int, int]] = set()
+        self.view_x = 0
+        self.view_y = 0
+        self._load_view()
 
     @property
     def w(self) -> int:
@@ -42,12 +96,183 @@ class Map(QObject):
         """Height of image"""
         return self.data.shape[0]
 
+    @property
+    def region(self) -> Region:
+        """Region covering the whole viewport"""
+        return Region(0, 0, self.w, self.h)
+
+    @property
+    def history(self) -> History | None:
+        """History recording tile edits, if any"""
+        return self._transaction.history
+
+    @history.setter
+    def history(self, history: History | None) -> None:
+        self._transaction.history = history
+
+    @property
+    def chunk_tiles(self) -> int:
+        """Width/height of a chunk in tiles"""
+        return self._chunk_tiles
+
+    @property
+    def loaded_chunks(self) -> int:
+        """Number of chunks held in memory"""
+        return len(self._chunks)
+
+    def _get_chunk(self, cx: int, cy: int) -> np.ndarray:
+        """
+        Return chunk (cx, cy), reading it from the backing file if needed
+        """
+        key = (cx, cy)
+        if key not in self._chunks:
+            chunk = None
+            if self._chunk_file is not None:
+                chunk = self._chunk_file.read_chunk(cx, cy)
+            if chunk is None:
+                chunk = np.full(
+                    (2, self._chunk_tiles, self._chunk_tiles), 0, dtype=np.uint16
+                )
+            self._chunks[key] = chunk
+
+        return self._chunks[key]
+
+    def _mark_dirty(self, key: tuple[int, int]) -> None:
+        """
+        Keep chunk `key` in memory until saved
+        """
+        self._dirty.add(key)
+        self._edited.add(key)
+
+    @property
+    def dirty_chunks(self) -> set[tuple[int, int]]:
+        """Chunks with unsaved edits"""
+        return self._dirty
+
+    def chunk(self, cx: int, cy: int) -> np.ndarray:
+        """
+        (2, chunk_tiles, chunk_tiles) tile and palette indexes of chunk (cx, cy)
+        """
+        return self._get_chunk(cx, cy)
+
+    def take_edited(self) -> set[tuple[int, int]]:
+        """
+        Chunks edited since the last call
+        """
+        edited, self._edited = self._edited, set()
+        return edited
+
+    def restore(self, chunks: dict[tuple[int, int], np.ndarray]) -> None:
+        """
+        Install chunks as unsaved edits, e.g. ones recovered after a crash.
+        Like `load`, leaves redrawing to the caller
+        """
+        for key, chunk in chunks.items():
+            self._chunks[key] = chunk
+            self._mark_dirty(key)
+        self._load_view()
+
+    def _view_chunks(self) -> list[tuple[int, int]]:
+        """
+        Chunks overlapping the viewport
+        """
+        cs = self._chunk_tiles
+        x0, y0 = self.view_x, self.view_y
+        x1 = min(x0 + self._view_w, self.world_w)
+        y1 = min(y0 + self._view_h, self.world_h)
+        return [
+            (cx, cy)
+            for cy in range(y0 // cs, n_chunks(y1, cs))
+            for cx in range(x0 // cs, n_chunks(x1, cs))
+        ]
+
+    def _chunk_overlap(self, cx: int, cy: int) -> tuple[slice, slice, slice, slice]:
+        """
+        Slices of the viewport and of chunk (cx, cy) that overlap
+        """
+        cs = self._chunk_tiles
+        x0 = max(cx * cs, self.view_x)
+        y0 = max(cy * cs, self.view_y)
+        x1 = min((cx + 1) * cs, self.view_x + self.w)
+        y1 = min((cy + 1) * cs, self.view_y + self.h)
+
+        return (
+            slice(y0 - self.view_y, y1 - self.view_y),
+            slice(x0 - self.view_x, x1 - self.view_x),
+            slice(y0 - cy * cs, y1 - cy * cs),
+            slice(x0 - cx * cs, x1 - cx * cs),
+        )
+
+    def _load_view(self) -> None:
+        """
+        Copy tile and palette data for the viewport out of the chunks
+        """
+        w = min(self._view_w, self.world_w)
+        h = min(self._view_h, self.world_h)
+        self.data = np.full((h, w), 0, dtype=np.uint16)
+        self.palette_data = np.full((h, w), 0, dtype=np.uint16)
+        self.data_rgb = np.full((h * TILE_PX, w * TILE_PX, 3), 0, dtype=np.uint8)
+
+        for cx, cy in self._view_chunks():
+            chunk = self._get_chunk(cx, cy)
+            vj, vi, cj, ci = self._chunk_overlap(cx, cy)
+            self.data[vj, vi] = chunk[0, cj, ci]
+            self.palette_data[vj, vi] = chunk[1, cj, ci]
+        self._evict_chunks()
+
+    def _evict_chunks(self) -> None:
+        """
+        Drop saved chunks outside the viewport, keeping memory proportional to
+        the viewport plus unsaved edits
+        """
+        keep = self._dirty.union(self._view_chunks())
+        for key in [k for k in self._chunks if k not in keep]:
+            del self._chunks[key]
+
+    def _store_view(self) -> None:
+        """
+        Copy the viewport back into its chunks
+        """
+        for cx, cy in self._view_chunks():
+            chunk = self._get_chunk(cx, cy)
+            vj, vi, cj, ci = self._chunk_overlap(cx, cy)
+            chunk[0, cj, ci] = self.data[vj, vi]
+            chunk[1, cj, ci] = self.palette_data[vj, vi]
+            self._mark_dirty((cx, cy))
+
+    def set_viewport(self, x: int, y: int) -> None:
+        """
+        Move the top left of the viewport to tile (x, y)
+        """
+        x = max(0, min(x, self.world_w - self.w))
+        y = max(0, min(y, self.world_h - self.h))
+        if (x, y) == (self.view_x, self.view_y):
+            return
+
+        self.view_x = x
+        self.view_y = y
+        self._load_view()
+        self.redraw_map()
+
+    def move_viewport(self, dx: int, dy: int) -> None:
+        """
+        Scroll the viewport by (dx, dy) tiles
+        """
+        self.set_viewport(self.view_x + dx, self.view_y + dy)
+
+    def transaction(self) -> Transaction:
+        """
+        Transaction batching changes into one `mapChanged`
+        """
+        return self._transaction
+
     def set_data(self, data: np.ndarray) -> None:
         """
         Set image data
         """
         self.data = data
-        self.mapChanged.emit()
+        self._store_view()
+        self._transaction.changed(self.region)
 
     def as_bytes(self) -> bytes:
         """
@@ -65,14 +290,19 @@ class Map(QObject):
         """
         Map tiles to colour
         """
-        c = self._spritesheet.canvases
-        for j in range(self.h):
-            for i in range(self.w):
-                self.data_rgb[TILE_PX * j:TILE_PX * (j + 1), TILE_PX * i:TILE_PX * (i + 1), :] = \
-                    c[self.data[j, i]].map_to_colour(
-                        self._palette_group.palettes[self.palette_data[j, i]]
-                    )
-        self.mapChanged.emit()
+        tiles = self._spritesheet.data
+        lut = self._palette_group.lut
+        colours = lut.reshape(-1, 3)
+        n_colours = lut.shape[1]
+
+        # Render in bands of tile rows to bound temporary memory on large maps
+        for j in range(0, self.h, TILE_BAND):
+            data = self.data[j:j + TILE_BAND]
+            idx = tiles[data] + n_colours * self.palette_data[j:j + TILE_BAND, :, None, None]
+            rgb = colours[idx].transpose(0, 2, 1, 3, 4)
+            self.data_rgb[TILE_PX * j:TILE_PX * (j + data.shape[0])] = \
+                rgb.reshape(data.shape[0] * TILE_PX, self.w * TILE_PX, 3)
+        self._transaction.changed(self.region)
 
     def update_tile(self, i: int, j: int) -> None:
         """
@@ -107,12 +337,17 @@ class Map(QObject):
         """
         return self._palette_idx
 
-    def new(self) -> None:
+    def new(self, w: int | None = None, h: int | None = None) -> None:
         """
         Create new map
         """
-        self.data = np.full((H_TILES, W_TILES), 0, dtype=np.uint8)
-        self.mapChanged.emit()
+        self._reset(
+            self.world_w if w is None else w,
+            self.world_h if h is None else h
+        )
+        if self.history is not None:
+            self.history.clear()
+        self._transaction.changed(self.region)
 
     def draw_tile(self, x: float, y: float) -> None:
         """
@@ -125,68 +360,306 @@ class Map(QObject):
             i, j = int(self.w * x), int(self.h * y)
             self.data[j, i] = self._tile_idx
             self.palette_data[j, i] = self._palette_idx
+
+            cs = self._chunk_tiles
+            wx, wy = self.view_x + i, self.view_y + j
+            chunk = self._get_chunk(wx // cs, wy // cs)
+            old = chunk[:, wy % cs, wx % cs].copy()
+            chunk[0, wy % cs, wx % cs] = self._tile_idx
+            chunk[1, wy % cs, wx % cs] = self._palette_idx
+            self._mark_dirty((wx // cs, wy // cs))
+            if self.history is not None:
+                self.history.record(
+                    (self, "tiles"),
+                    self._apply_tiles,
+                    np.array([wy * self.world_w + wx]),
+                    old[None],
+                    chunk[None, :, wy % cs, wx % cs].copy()
+                )
+
             self.update_tile(i, j)
         except Exception:
             print(self.h, y, self.w, x)
-        self.mapChanged.emit()
+        self._transaction.changed(Region.cell(i, j))
 
-    def open(self, filename: str) -> None:
+    def _apply_tiles(self, idx: np.ndarray, values: np.ndarray) -> None:
         """
-        Open map from `.map` file
+        Scatter (tile, palette) values of an undone or redone edit at flat
+        world indexes `idx`
+        """
+        for key, group, cj, ci in self._chunk_groups(idx):
+            self._get_chunk(*key)[:, cj, ci] = values[group].T
+            self._mark_dirty(key)
+
+        self._load_view()
+        self.redraw_map()
+
+    def _chunk_groups(
+        self,
+        idx: np.ndarray
+    ) -> t.Iterator[tuple[tuple[int, int], np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Group flat world indexes by chunk, yielding the chunk, positions in
+        `idx` of the indexes that fall in it and their rows and columns
+        within it
+        """
+        wy, wx = np.divmod(idx, self.world_w)
+        cs = self._chunk_tiles
+        chunks_x = n_chunks(self.world_w, cs)
+        keys = (wy // cs) * chunks_x + wx // cs
+        order = np.argsort(keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, bounds):
+            if len(group) == 0:
+                continue
+            cy, cx = divmod(int(keys[group[0]]), chunks_x)
+            yield (cx, cy), group, wy[group] % cs, wx[group] % cs
+
+    def _read_tiles(self, idx: np.ndarray) -> np.ndarray:
+        """
+        (n, 2) tile and palette indexes at flat world indexes `idx`
+        """
+        values = np.zeros((len(idx), 2), dtype=np.uint16)
+        for key, group, cj, ci in self._chunk_groups(idx):
+            values[group] = self._get_chunk(*key)[:, cj, ci].T
+
+        return values
+
+    def _write_tiles(self, idx: np.ndarray, values: np.ndarray) -> None:
+        """
+        Write (n, 2) tile and palette indexes at flat world indexes `idx` with
+        one change notification, recording the edit in history
+        """
+        if len(idx) == 0:
+            return
+        old = self._read_tiles(idx)
+        self._apply_tiles(idx, values)
+        if self.history is not None:
+            self.history.record((self, "tiles"), self._apply_tiles, idx, old, values)
+
+    def draw_mask(self, mask: np.ndarray) -> None:
+        """
+        Draw brush tile and palette where `mask` of the viewport is set
+        """
+        vj, vi = np.nonzero(mask)
+        idx = (vj + self.view_y) * self.world_w + vi + self.view_x
+        values = np.tile(
+            np.array([self._tile_idx, self._palette_idx], dtype=np.uint16),
+            (len(idx), 1)
+        )
+        self._write_tiles(idx, values)
+
+    def flood_fill(self, i: int, j: int) -> None:
+        """
+        Fill the area of equal tiles with equal palettes around viewport tile
+        (i, j). The fill stops at the edge of the viewport.
+        """
+        cells = self.data.astype(np.uint32) << 16 | self.palette_data
+        self.draw_mask(flood_mask(cells, i, j))
+
+    def draw_line(self, i0: int, j0: int, i1: int, j1: int) -> None:
+        """
+        Draw line from viewport tile (i0, j0) to (i1, j1)
+        """
+        self.draw_mask(line_mask(self.data.shape, i0, j0, i1, j1))
+
+    def draw_rect(
+        self,
+        i0: int,
+        j0: int,
+        i1: int,
+        j1: int,
+        filled: bool = False
+    ) -> None:
+        """
+        Draw rectangle with corner viewport tiles (i0, j0) and (i1, j1)
+        """
+        self.draw_mask(rect_mask(self.data.shape, i0, j0, i1, j1, filled))
+
+    def replace_tile(self, old: int, new: int) -> None:
+        """
+        Replace tile `old` with `new` across the whole map, keeping palettes.
+        Chunks are scanned one row at a time so only matching ones stay loaded.
+        """
+        cs = self._chunk_tiles
+        found = []
+        for cy in range(n_chunks(self.world_h, cs)):
+            for cx in range(n_chunks(self.world_w, cs)):
+                cj, ci = np.nonzero(self._get_chunk(cx, cy)[0] == old)
+                wy, wx = cy * cs + cj, cx * cs + ci
+                inside = (wx < self.world_w) & (wy < self.world_h)
+                found.append(wy[inside] * self.world_w + wx[inside])
+            self._evict_chunks()
+
+        idx = np.concatenate(found)
+        values = self._read_tiles(idx)
+        values[:, 0] = new
+        self._write_tiles(idx, values)
+
+    @staticmethod
+    def read(filename: str, progress: Progress | None = None) -> MapSource:
+        """
+        Read a `.map` file. Only the header and chunk index of chunked files
+        are read, older files are read whole
         """
         path = Path(filename)
+        with open(path, "rb") as f:
+            version = list(f.read(3))
+
+        if version == VERSION_CHUNKED:
+            return ChunkFile(filename)
+
         data_raw = path.read_bytes()
-        version = data_raw[:3]
-        if version != bytes(VERSION):
+        report(progress, 1, 2)
+        if version == VERSION_NIBBLE:
+            source = Map._extract_nibble_map(data_raw)
+        elif version == VERSION:
+            source = Map._extract_indexed_map(data_raw)
+        else:
             raise AttributeError(".map file has outdated version")
-        self._offset = 3
-        data = np.full((H_TILES, W_TILES), 0, dtype=np.uint8)
-        for j in range(H_TILES):
-            for i in range(W_TILES // 2):
-                x = data_raw[i + (W_TILES // 2) * j + self._offset]
-                a = (x & 0b11110000) >> 4
-                b = x & 0b00001111
-
-                data[j, 2 * i] = a
-                data[j, 2 * i + 1] = b
-
-        self._offset += H_TILES * W_TILES // 2
-        palette_data = np.full((H_TILES, W_TILES), 0, dtype=np.uint8)
-        for j in range(H_TILES):
-            for i in range(W_TILES // 2):
-                x = data_raw[i + (W_TILES // 2) * j + self._offset]
-                a = (x & 0b11110000) >> 4
-                b = x & 0b00001111
-
-                palette_data[j, 2 * i] = a
-                palette_data[j, 2 * i + 1] = b
+        report(progress, 2, 2)
 
-        self.data = data
-        self.palette_data = palette_data
-        self.mapChanged.emit()
+        return source
 
-    def save(self, filename: str) -> None:
+    def load(self, source: MapSource) -> None:
         """
-        Save data to `.map` file
+        Replace the map with one read by `read`
         """
-        if not filename.endswith(".map"):
-            path = f"{filename}.map"
+        if isinstance(source, ChunkFile):
+            self._reset(source.w, source.h, source)
         else:
-            path = filename
-
-        with open(path, "wb") as f:
-            f.write(bytes(VERSION))
-            for j in range(self.h):
-                for i in range(0, self.w, 2):
-                    a = self.data[j, i] & 0b00001111
-                    b = self.data[j, i + 1] & 0b00001111
-
-                    d = (a << 4) + b
-                    f.write(d.tobytes())
-            for j in range(self.h):
-                for i in range(0, self.w, 2):
-                    a = self.palette_data[j, i] & 0b00001111
-                    b = self.palette_data[j, i + 1] & 0b00001111
-
-                    d = (a << 4) + b
-                    f.write(d.tobytes())
+            self._load_whole_map(*source)
+
+        if self.history is not None:
+            self.history.clear()
+        self._transaction.changed(self.region)
+
+    def open(self, filename: str) -> None:
+        """
+        Open map from `.map` file
+        """
+        self.load(self.read(filename))
+
+    def _load_whole_map(self, data: np.ndarray, palette_data: np.ndarray) -> None:
+        """
+        Split an unchunked map into unsaved chunks
+        """
+        h, w = data.shape
+        self._reset(w, h)
+        cs = self._chunk_tiles
+        for cy in range(n_chunks(h, cs)):
+            for cx in range(n_chunks(w, cs)):
+                tiles = data[cy * cs:(cy + 1) * cs, cx * cs:(cx + 1) * cs]
+                palettes = palette_data[cy * cs:(cy + 1) * cs, cx * cs:(cx + 1) * cs]
+                chunk = self._get_chunk(cx, cy)
+                chunk[0, :tiles.shape[0], :tiles.shape[1]] = tiles
+                chunk[1, :palettes.shape[0], :palettes.shape[1]] = palettes
+                self._mark_dirty((cx, cy))
+        self._load_view()
+
+    @staticmethod
+    def _extract_nibble_map(data_raw: bytes) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Extract fixed size map with indexes packed into nibbles
+        """
+        n = H_TILES * W_TILES // 2
+        packed = np.frombuffer(data_raw, dtype=np.uint8, count=2 * n, offset=3)
+        indexes = np.stack([packed >> 4, packed & 0b00001111], axis=-1).astype(np.uint16)
+        data = indexes[:n].reshape(H_TILES, W_TILES)
+        palette_data = indexes[n:].reshape(H_TILES, W_TILES)
+
+        return data, palette_data
+
+    @staticmethod
+    def _extract_indexed_map(data_raw: bytes) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Extract map with stored dimensions and byte or word wide indexes
+        """
+        w, h, size = struct.unpack_from(HEADER_FORMAT, data_raw, 3)
+        if size not in INDEX_DTYPES:
+            raise AttributeError(f".map file has unsupported index size {size}")
+
+        offset = 3 + HEADER_SIZE
+        indexes = np.frombuffer(
+            data_raw, dtype=INDEX_DTYPES[size], count=2 * w * h, offset=offset
+        ).astype(np.uint16)
+        data = indexes[:w * h].reshape(h, w)
+        palette_data = indexes[w * h:].reshape(h, w)
+
+        return data, palette_data
+
+    def writer(self, filename: str) -> t.Callable[[Progress | None], SaveResult]:
+        """
+        Snapshot unsaved chunks, returning a function that saves the map to a
+        chunked `.map` file. The function is safe to run on another thread,
+        its result is passed to `saved` once it returns
+        """
+        path = with_extension(filename, ".map")
+        dirty = {key: self._chunks[key].copy() for key in self._dirty}
+        size = max([index_size(chunk) for chunk in dirty.values()], default=1)
+        generation = self._generation
+        backing = None if self._chunk_file is None else self._chunk_file.share()
+        w, h, chunk_tiles = self.world_w, self.world_h, self._chunk_tiles
+
+        def write(progress: Progress | None) -> SaveResult:
+            try:
+                return write_file(progress)
+            finally:
+                if backing is not None:
+                    backing.close()
+
+        def write_file(progress: Progress | None) -> SaveResult:
+            if (
+                backing is not None
+                and backing.path.resolve() == Path(path).resolve()
+                and size <= backing.index_size
+                and 2 * backing.unused_bytes <= backing.size
+            ):
+                # Only append the chunks that changed, until replaced chunks
+                # make up half the file and it is worth compacting
+                backing.update(dirty)
+                return generation, backing.share(), dirty
+
+            def get_chunk(cx: int, cy: int) -> np.ndarray | None:
+                if (cx, cy) in dirty:
+                    return dirty[(cx, cy)]
+                elif backing is not None:
+                    return backing.read_chunk(cx, cy)
+                return None
+
+            write_chunked(
+                path,
+                w,
+                h,
+                chunk_tiles,
+                size if backing is None else max(size, backing.index_size),
+                get_chunk,
+                progress
+            )
+            return generation, ChunkFile(path), dirty
+
+        return write
+
+    def saved(self, result: SaveResult) -> None:
+        """
+        Back the map with the file written by `writer`. Chunks edited since
+        the snapshot stay unsaved
+        """
+        generation, chunk_file, chunks = result
+        if generation != self._generation:
+            chunk_file.close()
+            return
+
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+        self._chunk_file = chunk_file
+        for key, chunk in chunks.items():
+            if key in self._chunks and np.array_equal(self._chunks[key], chunk):
+                self._dirty.discard(key)
+        self._evict_chunks()
+
+    def save(self, filename: str) -> None:
+        """
+        Save data to chunked `.map` file
+        """
+        self.saved(self.writer(filename)(None))
@@ -7,6 +7,7 @@ from PyQt6.QtWidgets import QGridLayout, QToolBar, QToolButton, QWidget
 from PyQt6.QtCore import Qt
 
 # Local imports
+from pysprite.canvas.history import History
 from pysprite.widgets.palette_group import QtPaletteGroup
 from pysprite.widgets.palette import QtPaletteLabel
 
@@ -31,6 +32,10 @@ class QtMainLayout(QWidget):
         self.tiles = QtTiles()
         self.map = QtMap(self.tiles, self.pal)
 
+        self.history = History()
+        self.map.map.history = self.history
+        self.pal.palette_group.history = self.history
+
         self.palette_label = QtPaletteLabel()
         self.palette_label.changed.connect(self._update_palette_label)
         self.palette_label.set_label(self.pal.get_active_palette().get_label())
@@ -55,6 +60,18 @@ class QtMainLayout(QWidget):
         self.pal.new_palette()
         self.palette_label.set_label(self.pal.get_active_palette().get_label())
 
+    def undo(self) -> None:
+        """
+        Undo latest edit of the map or palettes
+        """
+        self.history.undo()
+
+    def redo(self) -> None:
+        """
+        Redo latest undone edit
+        """
+        self.history.redo()
+
     def _update_palette(self) -> None:
         """
         Update palette in map/tiles
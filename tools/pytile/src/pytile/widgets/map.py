@@ -1,29 +1,43 @@
 # Standard library imports
 import typing as t
+from pathlib import Path
 
 # Third party imports
-from PyQt6.QtCore import QPoint
+from PyQt6.QtCore import QPoint, Qt
 from PyQt6 import QtGui
 from PyQt6.QtGui import QImage, QPainter, QPixmap
 from PyQt6.QtWidgets import QLabel
 from pysprite.canvas.canvas import TILE_PX
+from pysprite.canvas.tools import FILL, LINE, PENCIL, RECT, TOOLS
+from pysprite.canvas.transaction import Region
 from pysprite.widgets.palette_group import QtPaletteGroup
+from pysprite.widgets.scheduler import RepaintScheduler
+from pysprite.widgets.worker import Task
 
 # Local imports
-from pytile.map.map import Map
+from pytile.map.chunks import ChunkFile
+from pytile.map.map import Map, MapSource
 from pytile.widgets.tiles import QtTiles
 
 
 # Constants
 BORDER_COLOUR = [255, 255, 0]
+MIN_GRID_PX = 4
+WHEEL_STEP = 120
 
 
 class QtMap(QLabel):
     def __init__(self, tiles: QtTiles, palette_group: QtPaletteGroup):
         super().__init__()
         self.mouse_clicked = False
+        self._tool = PENCIL
+        self._stroke_start = (0, 0)
+        self._wheel_delta = 0
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         self.tiles = tiles
         self.tiles.tile_selected.connect(self.set_tile_idx)
+        self._open_task: Task | None = None
+        self._repaint = RepaintScheduler(self.update_image, self._flush_stroke)
         self.update_map(Map(tiles.spritesheet, palette_group.palette_group))
         self.update_image()
 
@@ -31,8 +45,11 @@ class QtMap(QLabel):
         """
         Update map
         """
+        if hasattr(self, "map"):
+            self._end_stroke()
+            self.map.mapChanged.disconnect(self._repaint.request)
         self.map = map
-        self.map.mapChanged.connect(self.update_image)
+        self.map.mapChanged.connect(self._repaint.request)
         self.update_image()
 
     def getNormalisedPos(self, pos: QPoint) -> tuple[float, float]:
@@ -70,6 +87,14 @@ class QtMap(QLabel):
         """
         return self.map.get_palette_idx()
 
+    def set_tool(self, tool: str) -> None:
+        """
+        Select drawing tool, one of TOOLS
+        """
+        if tool not in TOOLS:
+            raise ValueError(f"Unknown tool {tool}")
+        self._tool = tool
+
     def redraw_map(self) -> None:
         """
         Redraw map
@@ -82,6 +107,58 @@ class QtMap(QLabel):
         """
         self.map.new()
 
+    def _draw(self, pos: QPoint) -> None:
+        """
+        Draw at widget position, showing the change on the next frame
+        """
+        x, y = self.getNormalisedPos(pos)
+        self.map.draw_tile(x, y)
+        self._repaint.request()
+
+    def _cell(self, pos: QPoint) -> tuple[int, int]:
+        """
+        Viewport tile at widget position
+        """
+        x, y = self.getNormalisedPos(pos)
+        return int(self.map.w * x), int(self.map.h * y)
+
+    def _fill(self, pos: QPoint, replace: bool) -> None:
+        """
+        Flood fill at widget position, or replace the tile there across the
+        whole map if `replace`
+        """
+        i, j = self._cell(pos)
+        if not (0 <= i < self.map.w and 0 <= j < self.map.h):
+            return
+        if replace:
+            self.map.replace_tile(int(self.map.data[j, i]), self.map.get_tile_idx())
+        else:
+            self.map.flood_fill(i, j)
+
+    def _draw_shape(self, pos: QPoint, filled: bool) -> None:
+        """
+        Draw line or rectangle from the start of the stroke to widget position
+        """
+        i, j = self._cell(pos)
+        if self._tool == LINE:
+            self.map.draw_line(*self._stroke_start, i, j)
+        else:
+            self.map.draw_rect(*self._stroke_start, i, j, filled)
+
+    def _flush_stroke(self) -> None:
+        """
+        Emit changes of the stroke in progress, once per frame
+        """
+        self.map.transaction().flush()
+
+    def _end_stroke(self) -> None:
+        """
+        Close the transaction of the stroke in progress
+        """
+        if self.mouse_clicked:
+            self.mouse_clicked = False
+            self.map.transaction().end()
+
     def mousePressEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
         """
         Triggered when mouse pressed
@@ -89,16 +166,24 @@ class QtMap(QLabel):
         if ev is None:
             return
 
-        x, y = self.getNormalisedPos(ev.pos())
-
+        self._end_stroke()
         self.mouse_clicked = True
-        self.map.draw_tile(x, y)
+        self._stroke_start = self._cell(ev.pos())
+        self.map.transaction().begin()
+        shift = bool(ev.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+        if self._tool == PENCIL:
+            self._draw(ev.pos())
+        elif self._tool == FILL:
+            self._fill(ev.pos(), shift)
 
     def mouseReleaseEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
         """
         Triggered when mouse released
         """
-        self.mouse_clicked = False
+        if ev is not None and self.mouse_clicked and self._tool in [LINE, RECT]:
+            shift = bool(ev.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+            self._draw_shape(ev.pos(), shift)
+        self._end_stroke()
 
     def mouseMoveEvent(self, ev: t.Optional[QtGui.QMouseEvent]) -> None:
         """
@@ -107,11 +192,47 @@ class QtMap(QLabel):
         if ev is None:
             return
 
-        if self.mouse_clicked:
-            x, y = self.getNormalisedPos(ev.pos())
-            self.map.draw_tile(x, y)
+        if self.mouse_clicked and self._tool == PENCIL:
+            self._draw(ev.pos())
 
-    def update_image(self) -> None:
+    def wheelEvent(self, ev: t.Optional[QtGui.QWheelEvent]) -> None:
+        """
+        Scroll viewport, horizontally if shift is held. Small trackpad deltas
+        add up until they make a whole step
+        """
+        if ev is None:
+            return
+
+        self._wheel_delta -= ev.angleDelta().y()
+        steps = int(self._wheel_delta / WHEEL_STEP)
+        self._wheel_delta -= steps * WHEEL_STEP
+        if steps == 0:
+            return
+
+        if ev.modifiers() & Qt.KeyboardModifier.ShiftModifier:
+            self.map.move_viewport(steps, 0)
+        else:
+            self.map.move_viewport(0, steps)
+
+    def keyPressEvent(self, ev: t.Optional[QtGui.QKeyEvent]) -> None:
+        """
+        Scroll viewport with the arrow keys
+        """
+        if ev is None:
+            return
+
+        moves = {
+            Qt.Key.Key_Left: (-1, 0),
+            Qt.Key.Key_Right: (1, 0),
+            Qt.Key.Key_Up: (0, -1),
+            Qt.Key.Key_Down: (0, 1),
+        }
+        if ev.key() in moves:
+            self.map.move_viewport(*moves[ev.key()])
+        else:
+            super().keyPressEvent(ev)
+
+    def update_image(self, region: Region | None = None) -> None:
         """
         Update image using data matrix
         """
@@ -128,20 +249,43 @@ class QtMap(QLabel):
         pen = QtGui.QPen()
         pen.setColor(QtGui.QColor("#444444"))
         painter.setPen(pen)
-        for x in range(0, self.img.width(), self.img.width() // 39):
-            painter.drawLine(x, 0, x, self.img.height())
-            painter.drawLine(0, x, self.img.width(), x)
+        step = self.img.width() // self.map.w
+        if step >= MIN_GRID_PX:
+            for x in range(0, self.img.width(), step):
+                painter.drawLine(x, 0, x, self.img.height())
+            for y in range(0, self.img.height(), step):
+                painter.drawLine(0, y, self.img.width(), y)
         painter.end()
         self.setPixmap(self.img)
 
-    def open(self, filename: str) -> None:
+    def open(self, filename: str) -> Task:
+        """
+        Task opening map from `.map` file. Cancels the open in progress, if
+        any
+        """
+        if self._open_task is not None:
+            self._open_task.cancel()
+        task = Task(
+            lambda progress: Map.read(filename, progress),
+            f"Opening {Path(filename).name}"
+        )
+        task.signals.finished.connect(lambda source, x=task: self._load(x, source))
+        self._open_task = task
+        return task
+
+    def _load(self, task: Task, source: MapSource) -> None:
         """
-        Open map from `.map` file
+        Show a map read by an open task that is still wanted
         """
-        self.map.open(filename)
+        if not task.is_cancelled:
+            self.map.load(source)
+        elif isinstance(source, ChunkFile):
+            source.close()
 
-    def save(self, filename: str) -> None:
+    def save(self, filename: str) -> Task:
         """
-        Save map to `.map` file
+        Task saving the unsaved chunks of the map to `.map` file
         """
-        self.map.save(filename)
+        task = Task(self.map.writer(filename), f"Saving {Path(filename).name}")
+        task.signals.finished.connect(self.map.saved)
+        return task
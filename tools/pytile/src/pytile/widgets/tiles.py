@@ -1,3 +1,6 @@
+# Standard library imports
+from pathlib import Path
+
 # Third party imports
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QGridLayout, QWidget
@@ -5,8 +8,9 @@ from PyQt6.QtWidgets import QGridLayout, QWidget
 # Local imports
 from pysprite.canvas.canvas import Canvas
 from pysprite.canvas.palette import Palette
-from pysprite.canvas.spritesheet import Spritesheet
+from pysprite.canvas.spritesheet import Page, Spritesheet, read_spritesheet
 from pysprite.widgets.canvas import QtCanvasPreview
+from pysprite.widgets.worker import Task
 
 
 SPRITESHEET_COLUMN = 12
@@ -20,7 +24,10 @@ class QtTiles(QWidget):
         self.spritesheet = Spritesheet()
         self.spritesheet.spritesheet_changed.connect(self._update_previews)
         self.spritesheet.spritesheet_loaded.connect(self._spritesheet_loaded)
+        self.spritesheet.canvases_added.connect(self._tiles_added)
         self.glayout = QGridLayout()
+        self._open_task: Task | None = None
+        self._palette: Palette | None = None
 
         self._previews: list[QtCanvasPreview] = []
         self._update_previews()
@@ -38,7 +45,7 @@ class QtTiles(QWidget):
         """
         self._update_previews()
         self._previews[0].select(True)
-        self.tile_selected.emit(self.get_active_canvas())
+        self.tile_selected.emit(0)
 
     def _update_previews(self) -> None:
         """
@@ -47,15 +54,32 @@ class QtTiles(QWidget):
         for preview in self._previews:
             self.glayout.removeWidget(preview)
         self._previews: list[QtCanvasPreview] = []
-        for idx, canvas in enumerate(self.spritesheet.canvases):
-            self._previews.append(QtCanvasPreview(canvas))
-            self.glayout.addWidget(
-                self._previews[-1],
-                idx // SPRITESHEET_COLUMN,
-                idx % SPRITESHEET_COLUMN
-            )
-            self._previews[-1].selected.connect(lambda x=idx: self._tile_selected(x))
-            self._previews[-1].update_image()
+        for canvas in self.spritesheet.canvases:
+            self._add_preview(canvas)
+
+    def _tiles_added(self) -> None:
+        """
+        Add previews of tiles appended while a spritesheet is read
+        """
+        for canvas in self.spritesheet.canvases[len(self._previews):]:
+            self._add_preview(canvas)
+        self._update_layout()
+
+    def _add_preview(self, canvas: Canvas) -> None:
+        """
+        Add preview of `canvas` after the last one
+        """
+        idx = len(self._previews)
+        self._previews.append(QtCanvasPreview(canvas))
+        self.glayout.addWidget(
+            self._previews[-1],
+            idx // SPRITESHEET_COLUMN,
+            idx % SPRITESHEET_COLUMN
+        )
+        self._previews[-1].selected.connect(lambda x=idx: self._tile_selected(x))
+        if self._palette is not None:
+            self._previews[-1].update_palette(self._palette)
+        self._previews[-1].update_image()
 
     def _tile_selected(self, idx: int) -> None:
         """
@@ -73,11 +97,27 @@ class QtTiles(QWidget):
             self.glayout.setRowStretch(row, 0)
         self.glayout.setRowStretch(self.glayout.rowCount() + 1, 1)
 
-    def open(self, filename: str) -> None:
+    def open(self, filename: str) -> Task:
+        """
+        Task opening spritesheet from `.4bpp` file, showing each page of tiles
+        as soon as it is read. Cancels the open in progress, if any
+        """
+        if self._open_task is not None:
+            self._open_task.cancel()
+        task = Task(
+            lambda progress: read_spritesheet(filename, progress=progress),
+            f"Opening {Path(filename).name}"
+        )
+        task.signals.yielded.connect(lambda page, x=task: self._load_page(x, page))
+        self._open_task = task
+        return task
+
+    def _load_page(self, task: Task, page: Page) -> None:
         """
-        Open spritesheet from `.4bpp` file
+        Show a page read by an open task that is still wanted
         """
-        self.spritesheet.open(filename)
+        if not task.is_cancelled:
+            self.spritesheet.load_page(*page)
 
     def get_active_canvas(self) -> Canvas:
         """
@@ -93,6 +133,7 @@ class QtTiles(QWidget):
         """
         Update palette for each canvas
         """
+        self._palette = palette
         for preview in self._previews:
             preview.update_palette(palette)
             preview.update_image()